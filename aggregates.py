@@ -0,0 +1,130 @@
+import math
+import threading
+
+MEASURES = {
+    "total_allocated": "Allocated_Budget",
+    "total_spent": "Spent_Amount",
+    "total_remaining": "Remaining_Budget",
+}
+
+# Columns a utilization() group is made of, per level
+UTILIZATION_LEVELS = {"group": ("Subsidiary", "Sector"), "subsidiary": ("Subsidiary",), "sector": ("Sector",)}
+
+
+class BudgetAggregates:
+    """Running budget totals per (Subsidiary, Sector), maintained incrementally on every write."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = {}  # (subsidiary, sector) -> {"count": n, "total_allocated": ..., ...}
+
+    @staticmethod
+    def _apply(groups, record, sign):
+        """Adds (sign=1) or subtracts (sign=-1) one transaction from the group totals."""
+        if not isinstance(record, dict):
+            return  # Ignore invalid entries
+
+        key = (record.get("Subsidiary", "Unknown"), record.get("Sector", "Unknown"))
+        group = groups.get(key)
+        if group is None:
+            if sign < 0:
+                return
+            group = groups[key] = {"count": 0, **{name: 0 for name in MEASURES}}
+
+        group["count"] += sign
+        for name, field in MEASURES.items():
+            group[name] += sign * (record.get(field) or 0)
+
+        # Drop emptied groups so lookups keep returning 404 for unknown subsidiaries/sectors
+        if group["count"] <= 0:
+            del groups[key]
+
+    def load_totals(self, totals):
+        """Rebuilds every group from {(subsidiary, sector): {"count": n, <amount column>: sum}} totals."""
+        groups = {}
+        for (sub, sec), group in totals.items():
+            if group["count"] > 0:
+                key = ("Unknown" if sub is None else sub, "Unknown" if sec is None else sec)
+                groups[key] = {"count": group["count"], **{name: group[field] for name, field in MEASURES.items()}}
+        with self._lock:
+            self._groups = groups
+
+    def totals(self):
+        """Current groups in the format load_totals() takes."""
+        with self._lock:
+            return {key: {"count": group["count"], **{field: group[name] for name, field in MEASURES.items()}}
+                    for key, group in self._groups.items()}
+
+    def add(self, record):
+        with self._lock:
+            self._apply(self._groups, record, 1)
+
+    def remove(self, record):
+        with self._lock:
+            self._apply(self._groups, record, -1)
+
+    def replace(self, old, new):
+        """Moves a transaction's amounts from its old values to its new ones (possibly a different group)."""
+        with self._lock:
+            self._apply(self._groups, old, -1)
+            self._apply(self._groups, new, 1)
+
+    def add_many(self, records):
+        """Adds a batch of transactions under a single lock acquisition."""
+        with self._lock:
+            for record in records:
+                self._apply(self._groups, record, 1)
+
+    def _snapshot(self):
+        with self._lock:
+            return [(key, {name: group[name] for name in MEASURES}) for key, group in self._groups.items()]
+
+    def summary(self):
+        """Totals for every (Subsidiary, Sector) pair."""
+        return [{"Subsidiary": sub, "Sector": sec, **vals} for (sub, sec), vals in self._snapshot()]
+
+    def by_subsidiary(self, subsidiary):
+        """Per-sector totals for one subsidiary."""
+        return [{"Sector": sec, **vals} for (sub, sec), vals in self._snapshot() if sub == subsidiary]
+
+    def panels(self, subsidiary=None, sector=None):
+        """Summary plus the subsidiary and sector breakdowns from one consistent pass over the groups."""
+        summary, by_subsidiary, by_sector = [], [], []
+        for (sub, sec), vals in self._snapshot():
+            summary.append({"Subsidiary": sub, "Sector": sec, **vals})
+            if sub == subsidiary:
+                by_subsidiary.append({"Sector": sec, **vals})
+            if sec == sector:
+                by_sector.append({"Subsidiary": sub, **vals})
+        return summary, by_subsidiary, by_sector
+
+    def by_sector(self, sector):
+        """Per-subsidiary totals for one sector."""
+        return [{"Subsidiary": sub, **vals} for (sub, sec), vals in self._snapshot() if sec == sector]
+
+    def utilization(self, minimum=0.0, level="group", subsidiary=None, sector=None):
+        """
+        Groups whose total spent / total allocated is at least `minimum`, highest first, at the
+        (Subsidiary, Sector) "group" level or summed per "subsidiary" or per "sector".
+        Works on the running totals, so the cost depends on the number of groups, not of transactions.
+        """
+        columns = UTILIZATION_LEVELS[level]
+        combined = {}
+        for (sub, sec), vals in self._snapshot():
+            if (subsidiary is not None and sub != subsidiary) or (sector is not None and sec != sector):
+                continue
+            labels = dict(zip(("Subsidiary", "Sector"), (sub, sec)))
+            key = tuple(labels[column] for column in columns)
+            totals = combined.setdefault(key, dict.fromkeys(MEASURES, 0))
+            for name in MEASURES:
+                totals[name] += vals[name]
+
+        results = []
+        for key, totals in combined.items():
+            allocated, spent = totals["total_allocated"], totals["total_spent"]
+            ratio = spent / allocated if allocated else (math.inf if spent > 0 else 0.0)
+            if ratio >= minimum:
+                results.append({**dict(zip(columns, key)), **totals,
+                                "utilization": round(ratio, 4) if math.isfinite(ratio) else None})
+        results.sort(key=lambda row: math.inf if row["utilization"] is None else row["utilization"], reverse=True)
+        return results
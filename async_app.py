@@ -0,0 +1,380 @@
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Literal
+
+from fastapi import FastAPI, HTTPException, Depends, Request
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.concurrency import run_in_threadpool
+
+import app as sync_app
+from bulk import BulkReport, bulk_format, read_batches, row_error
+from formats import FastJSONResponse, response_format, rows_response
+from http_cache import ConditionalGetMiddleware
+from metrics import MetricsMiddleware, instrument_engine, metrics_response, watch_cache
+from pagination import ndjson_response, page_params, page_response, transaction_filters
+from query import budget_query
+from reports import report_params
+from singleflight import SingleFlight
+from sql_store import DATABASE_URL, dialect_family, pool_options, read_data_version
+from timeseries import bucket_length, burn_sql, cumulative_sql, first_negative_sql, rolling_sql, rolling_window, \
+    timeseries_params
+
+# Async variant of app.py: the same SQL routes (plus /pool/stats), but requests wait on the event loop instead
+# of FastAPI's threadpool. The per-sector and exception routes only exist in the Firebase-backed backend.py.
+# Run with e.g. `uvicorn async_app:app --workers 4`.
+
+ASYNC_DRIVERS = {"mysql+pymysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url):
+    """Maps a sync DATABASE_URL to its async driver (mysql+pymysql -> mysql+aiomysql)."""
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_url(DATABASE_URL))
+engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+instrument_engine(engine.sync_engine)
+
+# Built once at import: SQLAlchemy caches the compiled form, so per-request cost is bind + execute only
+SUMMARY_STATEMENT = text(sync_app.SUMMARY_QUERY)
+SUBSIDIARY_STATEMENT = text(sync_app.SUBSIDIARY_QUERY)
+
+
+class PoolStats:
+    """How long requests wait for a pooled connection, and how often the pool runs dry."""
+
+    def __init__(self, window=1000):
+        self.waits = deque(maxlen=window)  # Seconds, most recent checkouts only
+        self.checkouts = 0
+        self.timeouts = 0
+
+    def snapshot(self, pool):
+        waits = sorted(self.waits)
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        return {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(1000 * sum(waits) / len(waits), 3) if waits else 0.0,
+            "wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+            "wait_ms_max": round(1000 * waits[-1], 3) if waits else 0.0,
+        }
+
+
+pool_stats = PoolStats()
+
+
+@asynccontextmanager
+async def connection(begin=False):
+    """Checks out a pooled connection (optionally in a transaction), recording the time spent waiting for it."""
+    started = time.perf_counter()
+    try:
+        conn = await engine.connect()
+    except exc.TimeoutError:
+        pool_stats.timeouts += 1
+        raise HTTPException(status_code=503, detail="Database busy, please retry")
+    pool_stats.checkouts += 1
+    pool_stats.waits.append(time.perf_counter() - started)
+
+    try:
+        if begin:
+            async with conn.begin():
+                yield conn
+        else:
+            yield conn
+    finally:
+        await conn.close()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+
+async def current_data_version():
+    """Data version for ETag / 304 responses; None (serve normally) when the pool is exhausted."""
+    try:
+        async with connection() as conn:
+            return await conn.run_sync(read_data_version)
+    except HTTPException:
+        return None
+
+
+app.add_middleware(ConditionalGetMiddleware, get_version=current_data_version,
+                   exclude=("/pool/stats", "/reads/stats", "/metrics"), exclude_prefixes=("/reports/",))
+app.add_middleware(MetricsMiddleware, name="async_app", routes=app.router.routes)
+
+# Concurrent identical reads at the same data version share one query (and one pooled connection)
+reads = SingleFlight()
+watch_cache("async_reads", lambda: {"executed": reads.executions, "coalesced": reads.coalesced, "cached": reads.cached})
+
+
+def request_version(request: Request):
+    """Data version ConditionalGetMiddleware already read for this request (None if it didn't)."""
+    return getattr(request.state, "data_version", None)
+
+
+async def fetch_rows(statement, params=None, version=None):
+    """
+    Runs a read statement (or SQL string) once per concurrent caller with the same parameters and data version.
+
+    `version` is the request's (see request_version); without it, it is read on the query's own connection.
+    """
+    statement = text(statement) if isinstance(statement, str) else statement
+    params = params or {}
+    if version is None:
+        async with connection() as conn:
+            version = await conn.run_sync(read_data_version)
+            key = (str(statement), tuple(sorted(params.items())), version)
+            return await reads.do_async(key, run_rows, statement, params, conn)
+    return await reads.do_async((str(statement), tuple(sorted(params.items())), version), run_rows, statement, params)
+
+
+async def run_rows(statement, params, conn=None):
+    """Runs on `conn`, or on a connection checked out just for this statement."""
+    if conn is None:
+        async with connection() as conn:
+            return await run_rows(statement, params, conn)
+    return [dict(row) for row in (await conn.execute(statement, params)).mappings()]
+
+
+async def run_budget_query(query, conn=None):
+    if conn is None:
+        async with connection() as conn:
+            return await run_budget_query(query, conn)
+    return await conn.run_sync(sync_app.run_budget_query, query)
+
+
+@app.get("/")
+async def home():
+    return {"message": "Welcome to the Budget Dashboard API"}
+
+
+@app.get("/pool/stats")
+async def get_pool_stats():
+    return pool_stats.snapshot(engine.sync_engine.pool)
+
+
+@app.get("/reads/stats")
+async def get_read_stats():
+    return reads.stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics_response()
+
+
+@app.get("/budget/summary")
+async def get_budget_summary(format: str = Depends(response_format), version=Depends(request_version)):
+    return rows_response(await fetch_rows(SUMMARY_STATEMENT, version=version), format)
+
+
+@app.get("/budget/query")
+async def query_budget(query=Depends(budget_query), version=Depends(request_version)):
+    if version is None:
+        async with connection() as conn:
+            return await cached_budget_query(query, await conn.run_sync(read_data_version), conn)
+    return await cached_budget_query(query, version)
+
+
+async def cached_budget_query(query, version, conn=None):
+    key = (query.key, version)
+    result = sync_app.query_cache.get(key)
+    if result is None:
+        result = await reads.do_async(("query", key), run_budget_query, query, conn)
+        sync_app.query_cache.put(key, result)
+    return result
+
+
+# Time series per (Subsidiary, Sector), read from the budget_daily rollup
+
+@app.get("/budget/timeseries/burn")
+async def get_burn_rate(bucket: Literal["week", "month"] = "month", params: dict = Depends(timeseries_params),
+                        version=Depends(request_version)):
+    rows = await fetch_rows(*burn_sql(dialect_family(engine), bucket, params), version)
+    # New dicts: the fetched rows may be shared with concurrent callers
+    return [{**row, "burn_per_day": row["spent"] / bucket_length(row["period"], bucket)} for row in rows]
+
+
+@app.get("/budget/timeseries/cumulative")
+async def get_cumulative_spend(params: dict = Depends(timeseries_params), version=Depends(request_version)):
+    return await fetch_rows(*cumulative_sql(params), version)
+
+
+@app.get("/budget/timeseries/rolling")
+async def get_rolling_spend(window: int = Depends(rolling_window), params: dict = Depends(timeseries_params),
+                            version=Depends(request_version)):
+    return await fetch_rows(*rolling_sql(dialect_family(engine), window, params), version)
+
+
+@app.get("/budget/timeseries/negative")
+async def get_first_negative(subsidiary: str = None, sector: str = None, version=Depends(request_version)):
+    return await fetch_rows(*first_negative_sql({"subsidiary": subsidiary, "sector": sector}), version)
+
+
+@app.get("/budget/{subsidiary}")
+async def get_budget_by_subsidiary(subsidiary: str, format: str = Depends(response_format),
+                                   version=Depends(request_version)):
+    result = await fetch_rows(SUBSIDIARY_STATEMENT, {"subsidiary": subsidiary}, version)
+    if not result:
+        raise HTTPException(status_code=404, detail="Subsidiary not found")
+    return rows_response(result, format)
+
+
+@app.get("/transactions")
+async def get_all_transactions(filters=Depends(transaction_filters), page: dict = Depends(page_params)):
+    query, params = sync_app.transactions_query(filters, page["after"], page["fields"])
+
+    if page["format"] == "ndjson":
+        async def rows():
+            # Server-side cursor: rows are sent as they arrive instead of being buffered
+            async with connection() as conn:
+                result = await conn.stream(text(query), params)
+                async for row in result.mappings():
+                    yield dict(row)
+
+        return ndjson_response(rows(), page["fields"])
+
+    async with connection() as conn:
+        result = await conn.execute(text(query + " LIMIT :limit"), {**params, "limit": page["limit"] + 1})
+        rows = result.mappings().all()
+    if not rows and page["after"] is None:
+        raise HTTPException(status_code=404, detail="No transactions found")
+    return page_response(rows, page["limit"], page["fields"], page["format"])
+
+
+# Reports share app.py's queue; its job files are read in the threadpool
+
+@app.post("/reports", status_code=202)
+async def create_report(spec: dict = Depends(report_params)):
+    async with connection() as conn:
+        version = await conn.run_sync(read_data_version)
+    return await run_in_threadpool(sync_app.report_queue.submit, spec, version, ("sql", DATABASE_URL))
+
+
+@app.get("/reports/{report_id}")
+def get_report(report_id: str):
+    return sync_app.get_report(report_id)
+
+
+@app.get("/reports/{report_id}/download")
+def download_report(report_id: str):
+    return sync_app.download_report(report_id)
+
+
+# Writes reuse app.py's transactional helpers (row + rollup in one transaction) through run_sync
+
+@app.post("/transactions/add")
+async def add_transaction(
+    Transaction_ID: str,
+    Date: str,
+    Subsidiary: str,
+    Sector: str,
+    User_ID: str,
+    Allocated_Budget: float,
+    Spent_Amount: float,
+    Remaining_Budget: float,
+    Revenue_Generated: float,
+    Transaction_Type: str,
+    user_role: dict = Depends(lambda: sync_app.get_user_role("admin"))  # Only Admin can edit
+):
+    if not user_role["can_edit"]:
+        raise HTTPException(status_code=403, detail="Permission denied")
+
+    new_transaction = {
+        "Transaction_ID": Transaction_ID,
+        "Date": Date,
+        "Subsidiary": Subsidiary,
+        "Sector": Sector,
+        "User_ID": User_ID,
+        "Allocated_Budget": Allocated_Budget,
+        "Spent_Amount": Spent_Amount,
+        "Remaining_Budget": Remaining_Budget,
+        "Revenue_Generated": Revenue_Generated,
+        "Transaction_Type": Transaction_Type
+    }
+    async with connection(begin=True) as conn:
+        await conn.run_sync(sync_app.insert_transaction, new_transaction)
+    return {"message": "Transaction added successfully"}
+
+
+@app.post("/transactions/bulk")
+async def bulk_add_transactions(
+    request: Request,
+    format: Literal["ndjson", "csv"] = None,
+    user_role: dict = Depends(lambda: sync_app.get_user_role("admin"))  # Only Admin can edit
+):
+    if not user_role["can_edit"]:
+        raise HTTPException(status_code=403, detail="Permission denied")
+
+    report = BulkReport()
+    async for valid, errors in read_batches(request, bulk_format(request, format)):
+        inserted, duplicates = 0, []
+        if valid:
+            try:
+                async with connection(begin=True) as conn:  # One transaction per batch
+                    inserted, duplicates = await conn.run_sync(sync_app.insert_transactions_batch, valid)
+            except exc.SQLAlchemyError as error:
+                duplicates = [row_error(number, row, f"Batch rejected by the database: {error.__class__.__name__}")
+                              for number, row in valid]
+        report.add(inserted, sorted(errors + duplicates, key=lambda error: error["row"]), len(valid) + len(errors))
+    return report.as_dict()
+
+
+@app.put("/transactions/update/{transaction_id}")
+async def update_transaction(
+    transaction_id: str,
+    Date: str = None,
+    Subsidiary: str = None,
+    Sector: str = None,
+    User_ID: str = None,
+    Allocated_Budget: float = None,
+    Spent_Amount: float = None,
+    Remaining_Budget: float = None,
+    Revenue_Generated: float = None,
+    Transaction_Type: str = None,
+    user_role: dict = Depends(lambda: sync_app.get_user_role("admin"))  # Only Admin can edit
+):
+    if not user_role["can_edit"]:
+        raise HTTPException(status_code=403, detail="Permission denied")
+
+    fields = {
+        "Date": Date,
+        "Subsidiary": Subsidiary,
+        "Sector": Sector,
+        "User_ID": User_ID,
+        "Allocated_Budget": Allocated_Budget,
+        "Spent_Amount": Spent_Amount,
+        "Remaining_Budget": Remaining_Budget,
+        "Revenue_Generated": Revenue_Generated,
+        "Transaction_Type": Transaction_Type
+    }
+    changes = {key: value for key, value in fields.items() if value is not None}
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields provided for update")
+
+    async with connection(begin=True) as conn:
+        await conn.run_sync(sync_app.update_transaction_fields, transaction_id, changes)
+    return {"message": f"Transaction {transaction_id} updated successfully"}
+
+
+@app.delete("/transactions/delete/{transaction_id}")
+async def delete_transaction(transaction_id: str, user_role: dict = Depends(lambda: sync_app.get_user_role("admin"))):
+    if not user_role["can_edit"]:
+        raise HTTPException(status_code=403, detail="Permission denied")
+
+    async with connection(begin=True) as conn:
+        await conn.run_sync(sync_app.delete_transaction_row, transaction_id)
+    return {"message": f"Transaction {transaction_id} deleted successfully"}
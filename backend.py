@@ -1,15 +1,335 @@
-from fastapi import FastAPI, HTTPException, Depends
+import math
+import os
+import threading
+import time
+
+IMPORT_STARTED = time.perf_counter()  # Cold-start timing starts before the heavy imports below
+
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from starlette.concurrency import run_in_threadpool
 from typing import Literal
-import firebase_admin
-from firebase_admin import credentials, db
 
-app = FastAPI()
+from aggregates import BudgetAggregates
+from bulk import BulkReport, bulk_format, read_batches, row_error, split_duplicates
+from changelog import ChangeLog, replay
+from columnar import ColumnarTransactions
+from formats import TABLE_FORMATS, FastJSONResponse, response_format, rows_response
+from firebase_store import TRANSACTIONS_PATH, iter_keyed_transactions, transaction_key
+from http_cache import ConditionalGetMiddleware, DataVersion
+from metrics import AGGREGATION_SECONDS, MetricsMiddleware, metrics_response, timed, upstream, watch_cache
+from pagination import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, TransactionFilter, encode_cursor, ndjson_response, page_params,
+                        page_response, project, table_page_response, transaction_filters)
+from query import QueryCache, budget_query
+from reports import ReportQueue, report_params
+from schema import parse_transaction
+from singleflight import SingleFlight
+from snapshot import SnapshotStore
+from timeseries import TimeSeriesIndex, rolling_window, timeseries_params
+
+# 🔹 Firebase is imported and initialized on first use, so a cold start can serve from the snapshot right away
+FIREBASE_CREDENTIALS = os.getenv("FIREBASE_CREDENTIALS", "firebase-adminsdk.json")  # Ensure this file is in your project folder
+FIREBASE_URL = os.getenv("FIREBASE_URL", "https://budgetdb-7d811-default-rtdb.firebaseio.com/")
+db = None  # firebase_admin.db once initialized
+firebase_lock = threading.Lock()
+
+
+def firebase():
+    """Returns firebase_admin.db, initializing the app the first time it is needed."""
+    global db
+    if db is None:
+        with firebase_lock:
+            if db is None:
+                import firebase_admin
+                from firebase_admin import credentials, db as firebase_db
+
+                firebase_admin.initialize_app(credentials.Certificate(FIREBASE_CREDENTIALS), {"databaseURL": FIREBASE_URL})
+                db = firebase_db
+    return db
+
+
+# 🔹 In-process (Subsidiary, Sector) totals, built once at startup and kept in sync by the write endpoints
+aggregates = BudgetAggregates()
+
+# 🔹 Columnar copy of the rows in (Date, Transaction_ID) order, so /transactions can page and stream without Firebase
+transactions = ColumnarTransactions()
+
+# 🔹 Firebase child keys that differ from transaction_key(Transaction_ID), i.e. rows still in the legacy array
+#    layout (see migrate_firebase_keys.py); every other row's key is derived from its ID, so writes touch one node
+legacy_keys = {}
+
+# 🔹 Published columnar snapshots: every worker process maps the same files instead of holding its own copy
+snapshots = SnapshotStore()
+change_log = ChangeLog(snapshots.directory)  # Adds, updates and deletes for /transactions/changes
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", "60"))  # Skip the startup refresh if synced this recently
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "0"))  # Periodic re-sync, 0 = startup only
+# Writes are logged, not republished: the full snapshot is rewritten after this many changes, or once writes pause
+SNAPSHOT_PUBLISH_CHANGES = min(int(os.getenv("SNAPSHOT_PUBLISH_CHANGES", "1000")), change_log.retain // 2)
+SNAPSHOT_PUBLISH_DELAY = float(os.getenv("SNAPSHOT_PUBLISH_DELAY", "5"))
+attach_lock = threading.RLock()
+mapped = {"version": None, "seq": 0}  # Snapshot version this worker has mapped, and the change-log seq it includes
+publish_timer = None
+publish_timer_lock = threading.Lock()
+
+# 🔹 Cold-start and background-refresh timings, reported by /health
+startup = {}
+refresh_status = {"running": False, "last_success": None, "last_error": None, "seconds": None, "changed": None}
+
+# 🔹 Follows (snapshot lineage, change-log seq); read endpoints send it as an ETag and answer 304 until it moves
+data_version = DataVersion()
+
+# 🔹 /budget/query results by (normalized query, data version); a write simply makes old entries unreachable
+query_cache = QueryCache()
+
+# 🔹 Per-(Subsidiary, Sector) day trees: any date-range sum or first-negative lookup is O(log n)
+timeseries = TimeSeriesIndex()
+
+# 🔹 Concurrent identical reads (keyed by data version) and tree downloads run once and share the result
+reads = SingleFlight()
+loads = SingleFlight(ttl=0)
+
+# 🔹 Report jobs, built in a process pool from the shared snapshot (see reports.py)
+report_queue = ReportQueue()
+
+
+def child_key(transaction_id):
+    return legacy_keys.get(transaction_id) or transaction_key(transaction_id)
+
+
+def load_transactions():
+    """Re-downloads the transaction tree now and publishes it if it differs from the current snapshot."""
+    return refresh_snapshot(max_age=0)
+
+
+def download_transactions():
+    """Downloads the whole transaction tree into a new columnar store; returns (store, legacy child keys)."""
+    records, legacy = [], {}
+    with upstream("firebase", "get") as measure:
+        tree = measure(firebase().reference(TRANSACTIONS_PATH).get())
+    for key, record in iter_keyed_transactions(tree):
+        if key != transaction_key(record.get("Transaction_ID")):
+            legacy[record.get("Transaction_ID")] = key
+        records.append(record)
+    downloaded = ColumnarTransactions()
+    downloaded.load(records)
+    return downloaded, legacy
+
+
+def install(downloaded, legacy):
+    """Replaces the in-memory state with a downloaded store and publishes it (call inside snapshots.writer())."""
+    legacy_keys.clear()
+    legacy_keys.update(legacy)
+    with timed("aggregate", AGGREGATION_SECONDS, operation="rebuild"):
+        aggregates.load_totals(downloaded.group_totals(("Subsidiary", "Sector")))  # Vectorized, no per-record loop
+        timeseries.load(downloaded.aggregate(
+            ("Subsidiary", "Sector", "day"),
+            (("count", "", ""), ("sum", "Allocated_Budget", ""), ("sum", "Spent_Amount", ""), ("sum", "Remaining_Budget", "")),
+        ))
+    transactions.attach(*downloaded.export())
+    change_log.reset()  # Clients (and other workers) can't tell what changed remotely, so they reload
+    publish_snapshot()
+
+
+def refresh_snapshot(max_age=SNAPSHOT_MAX_AGE):
+    """
+    Reconciles the snapshot with Firebase: downloads the tree and publishes it only if the rows changed,
+    so an unchanged remote store doesn't invalidate every client's ETag.
+
+    One worker refreshes at a time (the others skip), and nothing happens if a refresh finished
+    less than `max_age` seconds ago. Returns True if a new snapshot was published.
+    """
+    with snapshots.exclusive("refresh", blocking=False) as claimed:
+        if not claimed or time.time() - snapshots.synced_at() < max_age:
+            return False
+        for attempt in range(3):
+            before = (snapshots.current(), change_log.last_seq())
+            # The download runs outside the writer lock; it is discarded if a write was logged meanwhile
+            downloaded, legacy = loads.do("transactions", download_transactions)
+            with snapshot_write():
+                if (snapshots.current(), change_log.last_seq()) != before and attempt < 2:
+                    continue
+                if (snapshots.current(), change_log.last_seq()) != before:
+                    downloaded, legacy = download_transactions()  # Busy writers: download under the lock
+                changed = snapshots.current() is None or legacy != legacy_keys or \
+                    downloaded.fingerprint() != transactions.fingerprint()
+                if changed:
+                    install(downloaded, legacy)
+                snapshots.mark_synced()
+                return changed
+
+
+def refresh_in_background():
+    while True:
+        started = time.perf_counter()
+        refresh_status["running"] = True
+        try:
+            refresh_status["changed"] = refresh_snapshot()
+            refresh_status.update(last_success=time.time(), last_error=None)
+        except Exception as error:  # Keep serving the snapshot; the next refresh may succeed
+            refresh_status["last_error"] = f"{error.__class__.__name__}: {error}"
+        refresh_status.update(running=False, seconds=round(time.perf_counter() - started, 3))
+        if SNAPSHOT_REFRESH_SECONDS <= 0:
+            return
+        time.sleep(SNAPSHOT_REFRESH_SECONDS)
+
+
+def publish_snapshot():
+    """Publishes this worker's state as the next snapshot version (call inside snapshot_write()) and maps it."""
+    arrays, dictionaries = transactions.export()
+    snapshots.publish(arrays, {
+        "dictionaries": dictionaries,
+        "group_totals": [[sub, sec, totals] for (sub, sec), totals in aggregates.totals().items()],
+        "daily_totals": timeseries.export(),
+        "legacy_keys": legacy_keys,
+        "seq": change_log.last_seq(),  # Caught up under the writer lock: every logged change is included
+    })
+    attach_snapshot(derived=False)  # Swap the private arrays for the shared mapping; the rest is already current
+
+
+def attach_snapshot(derived=True):
+    """
+    Maps the latest snapshot into this worker, then replays the change-log entries logged after it.
+    Only the small derived state (totals, day trees) is rebuilt.
+    """
+    lineage, version, arrays, meta = snapshots.open()
+    transactions.attach(arrays, meta["dictionaries"])
+    if derived:
+        aggregates.load_totals({(sub, sec): totals for sub, sec, totals in meta["group_totals"]})
+        timeseries.load(meta["daily_totals"])
+        legacy_keys.clear()
+        legacy_keys.update(meta["legacy_keys"])
+    seq = meta.get("seq", change_log.last_seq())  # Older snapshots were republished on every write
+    mapped.update(version=version, seq=seq)
+    data_version.follow(lineage, seq)
+    catch_up()
+
+
+def apply_logged(entries):
+    """Replays changes logged by other workers onto this worker's store, totals and day trees."""
+    for entry, previous in replay(transactions, entries):
+        record = entry["record"]
+        if entry["op"] == "delete":
+            legacy_keys.pop(entry["Transaction_ID"], None)
+            aggregates.remove(previous)
+            timeseries.apply(previous, sign=-1)
+        elif previous is None:
+            aggregates.add(record)
+            timeseries.apply(record)
+        else:
+            aggregates.replace(previous, record)
+            timeseries.replace(previous, record)
+
+
+def catch_up():
+    """Brings this worker up to the latest snapshot and change-log entry (call with attach_lock held)."""
+    current = snapshots.current()
+    if current is None:
+        return
+    if current[:2] != (data_version.epoch, mapped["version"]):
+        attach_snapshot()  # Republished (or replaced) elsewhere: map it, sharing its pages again
+        return
+    pending = change_log.since(data_version.current, limit=2 ** 62)
+    if pending["reset"]:
+        return  # The data was replaced wholesale; its new snapshot is published under the same lock
+    apply_logged(pending["changes"])
+    data_version.follow(current[0], pending["seq"])
+
+
+def sync_snapshot():
+    """Catches up when another worker has logged or published since this one looked (two stat() calls otherwise)."""
+    current = snapshots.current()
+    if current is None or (current[:2] == (data_version.epoch, mapped["version"])
+                           and change_log.last_seq() == data_version.current):
+        return
+    with attach_lock:
+        catch_up()
+
+
+@contextmanager
+def snapshot_write():
+    """
+    Serializes a write across threads and workers, starting from the latest state. Call log_write() after:
+    holding attach_lock too keeps this worker's readers from replaying its own write from the log.
+    """
+    with snapshots.writer(), attach_lock:
+        catch_up()
+        yield
+
+
+def log_write(changes):
+    """
+    Logs a write this worker has applied (call inside snapshot_write()); other workers replay it from the log.
+    The full snapshot is only rewritten every SNAPSHOT_PUBLISH_CHANGES changes, or SNAPSHOT_PUBLISH_DELAY
+    seconds after writes stop, so a single-row write costs an append, not a copy of the store.
+    """
+    seq = change_log.append(changes)
+    data_version.follow(data_version.epoch, seq)
+    if seq - mapped["seq"] >= SNAPSHOT_PUBLISH_CHANGES:
+        publish_snapshot()
+    else:
+        schedule_publish()
+
+
+def schedule_publish(delay=None):
+    """(Re)starts the debounce timer for publishing the logged writes as a full snapshot."""
+    global publish_timer
+    with publish_timer_lock:
+        if publish_timer is not None:
+            publish_timer.cancel()
+        publish_timer = threading.Timer(SNAPSHOT_PUBLISH_DELAY if delay is None else delay, publish_pending)
+        publish_timer.daemon = True
+        publish_timer.start()
+
 
-# 🔹 Initialize Firebase
-cred = credentials.Certificate("firebase-adminsdk.json")  # Ensure this file is in your project folder
-firebase_admin.initialize_app(cred, {
-    'databaseURL': 'https://budgetdb-7d811-default-rtdb.firebaseio.com/'  # Replace with your actual URL
-})
+def publish_pending():
+    """Publishes a snapshot if changes were logged since the mapped one (another worker may have done it already)."""
+    with snapshot_write():
+        if snapshots.current() is not None and change_log.last_seq() > mapped["seq"]:
+            publish_snapshot()
+
+
+def start_worker():
+    """
+    Serves from the latest on-disk snapshot when there is one; only a host with no snapshot
+    waits for a full download (workers starting alongside it wait for that one download).
+    """
+    with snapshots.writer(), attach_lock:
+        if snapshots.current() is not None:
+            attach_snapshot()
+            return "snapshot"
+        install(*download_transactions())
+        snapshots.mark_synced()
+        return "firebase"
+
+
+@asynccontextmanager
+async def lifespan(app):
+    source = start_worker()
+    startup.update(source=source, rows=len(transactions), ready_seconds=round(time.perf_counter() - IMPORT_STARTED, 3))
+    if source == "snapshot":
+        threading.Thread(target=refresh_in_background, name="snapshot-refresh", daemon=True).start()
+    yield
+    with publish_timer_lock:
+        if publish_timer is not None:
+            publish_timer.cancel()
+    publish_pending()  # Leave a current snapshot behind for the next cold start
+    report_queue.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+
+async def current_data_version():
+    sync_snapshot()
+    return data_version.tag()
+
+
+app.add_middleware(ConditionalGetMiddleware, get_version=current_data_version,
+                   exclude=("/reads/stats", "/health", "/metrics"), exclude_prefixes=("/reports/",))
+app.add_middleware(MetricsMiddleware, name="backend", routes=app.router.routes)  # Outermost: also times 304s
+watch_cache("query_cache", lambda: {"hit": query_cache.hits, "miss": query_cache.misses})
+watch_cache("reads", lambda: {"executed": reads.executions, "coalesced": reads.coalesced, "cached": reads.cached})
+watch_cache("loads", lambda: {"executed": loads.executions, "coalesced": loads.coalesced})
 
 # 🔹 Define User Roles
 USER_ROLES = {
@@ -30,99 +350,267 @@ def home():
     return {"message": "Welcome to the Budget Dashboard API"}
 
 
+# 🔹 **Liveness plus cold-start and refresh timings**
+@app.get("/health")
+def health():
+    return {"status": "ok", "data_version": data_version.tag(), "rows": len(transactions),
+            "startup": startup, "refresh": refresh_status}
+
+
+# 🔹 **Latency, upstream, aggregation and cache metrics in the Prometheus text format**
+@app.get("/metrics")
+def get_metrics():
+    return metrics_response()
+
+
 # 1️⃣ **Fetch total budget summary (Admin & Viewer)**
 @app.get("/budget/summary")
-def get_budget_summary(user_role: dict = Depends(lambda: get_user_role("viewer"))):
-    ref = db.reference("/budget_transactions")
-    transactions = ref.get()
+def get_budget_summary(format: str = Depends(response_format), user_role: dict = Depends(lambda: get_user_role("viewer"))):
+    with timed("aggregate", AGGREGATION_SECONDS, operation="summary"):
+        summary = aggregates.summary()
 
-    if not transactions:
+    if not summary:
         raise HTTPException(status_code=404, detail="No budget data available")
 
-    summary = {}
+    return rows_response(summary, format)
 
-    # 🔹 Iterate over the list instead of using `.items()`
-    for record in transactions:
-        if not isinstance(record, dict):
-            continue  # Ignore invalid entries
 
-        subsidiary = record.get("Subsidiary", "Unknown")
-        sector = record.get("Sector", "Unknown")
+# 2️⃣ **Fetch budget by subsidiary (Admin & Viewer)**
+@app.get("/budget/subsidiary/{subsidiary}")
+def get_budget_by_subsidiary(
+        subsidiary: str,
+        format: str = Depends(response_format),
+        user_role: dict = Depends(lambda: get_user_role("viewer"))
+):
+    with timed("aggregate", AGGREGATION_SECONDS, operation="by_subsidiary"):
+        summary = aggregates.by_subsidiary(subsidiary)
 
-        if (subsidiary, sector) not in summary:
-            summary[(subsidiary, sector)] = {"total_allocated": 0, "total_spent": 0, "total_remaining": 0}
+    if not summary:
+        raise HTTPException(status_code=404, detail=f"No budget data found for subsidiary: {subsidiary}")
 
-        summary[(subsidiary, sector)]["total_allocated"] += record.get("Allocated_Budget", 0)
-        summary[(subsidiary, sector)]["total_spent"] += record.get("Spent_Amount", 0)
-        summary[(subsidiary, sector)]["total_remaining"] += record.get("Remaining_Budget", 0)
+    return rows_response(summary, format)
 
-    return [{"Subsidiary": sub, "Sector": sec, **vals} for (sub, sec), vals in summary.items()]
 
+# 3️⃣ **Fetch budget by sector (Admin & Viewer)**
+@app.get("/budget/sector/{sector}")
+def get_budget_by_sector(
+        sector: str,
+        format: str = Depends(response_format),
+        user_role: dict = Depends(lambda: get_user_role("viewer"))
+):
+    with timed("aggregate", AGGREGATION_SECONDS, operation="by_sector"):
+        summary = aggregates.by_sector(sector)
 
-# 2️⃣ **Fetch budget by subsidiary (Admin & Viewer)**
-@app.get("/budget/subsidiary/{subsidiary}")
-def get_budget_by_subsidiary(subsidiary: str, user_role: dict = Depends(lambda: get_user_role("viewer"))):
-    ref = db.reference("/budget_transactions")
-    transactions = ref.get()
+    if not summary:
+        raise HTTPException(status_code=404, detail=f"No budget data found for sector: {sector}")
 
-    if not transactions:
-        raise HTTPException(status_code=404, detail="No budget data available")
+    return rows_response(summary, format)
 
-    summary = {}
 
-    for record in transactions:
-        if isinstance(record, dict) and record.get("Subsidiary") == subsidiary:
-            sector = record.get("Sector", "Unknown")
-            if sector not in summary:
-                summary[sector] = {"total_allocated": 0, "total_spent": 0, "total_remaining": 0}
+# 🔹 **Generic group-by over any dimensions, measures and filters (Admin & Viewer)**
+@app.get("/budget/query")
+def query_budget(query=Depends(budget_query), user_role: dict = Depends(lambda: get_user_role("viewer"))):
+    key = (query.key, data_version.tag())
+    result = query_cache.get(key)
+    if result is None:
+        result = reads.do(("query", key), aggregate_query, query)
+        query_cache.put(key, result)
+    return result
 
-            summary[sector]["total_allocated"] += record.get("Allocated_Budget", 0)
-            summary[sector]["total_spent"] += record.get("Spent_Amount", 0)
-            summary[sector]["total_remaining"] += record.get("Remaining_Budget", 0)
 
-    if not summary:
-        raise HTTPException(status_code=404, detail=f"No budget data found for subsidiary: {subsidiary}")
+def aggregate_query(query):
+    with timed("aggregate", AGGREGATION_SECONDS, operation="query"):
+        return transactions.aggregate(query.dimensions, query.measures, query.filters)
 
-    return [{"Sector": sec, **vals} for sec, vals in summary.items()]
 
+# 🔹 **Time series per (Subsidiary, Sector) (Admin & Viewer)**
+@app.get("/budget/timeseries/burn")
+def get_burn_rate(
+        bucket: Literal["week", "month"] = "month",
+        params: dict = Depends(timeseries_params),
+        user_role: dict = Depends(lambda: get_user_role("viewer"))
+):
+    with timed("aggregate", AGGREGATION_SECONDS, operation="burn"):
+        return reads.do(("burn", bucket, *params.items(), data_version.tag()), timeseries.burn, bucket, **params)
 
-# 3️⃣ **Fetch budget by sector (Admin & Viewer)**
-@app.get("/budget/sector/{sector}")
-def get_budget_by_sector(sector: str, user_role: dict = Depends(lambda: get_user_role("viewer"))):
-    ref = db.reference("/budget_transactions")
-    transactions = ref.get()
 
-    if not transactions:
-        raise HTTPException(status_code=404, detail="No budget data available")
+@app.get("/budget/timeseries/cumulative")
+def get_cumulative_spend(params: dict = Depends(timeseries_params),
+                         user_role: dict = Depends(lambda: get_user_role("viewer"))):
+    with timed("aggregate", AGGREGATION_SECONDS, operation="cumulative"):
+        return reads.do(("cumulative", *params.items(), data_version.tag()), timeseries.cumulative, **params)
 
-    summary = {}
 
-    for record in transactions:
-        if isinstance(record, dict) and record.get("Sector") == sector:
-            subsidiary = record.get("Subsidiary", "Unknown")
-            if subsidiary not in summary:
-                summary[subsidiary] = {"total_allocated": 0, "total_spent": 0, "total_remaining": 0}
+@app.get("/budget/timeseries/rolling")
+def get_rolling_spend(
+        window: int = Depends(rolling_window),
+        params: dict = Depends(timeseries_params),
+        user_role: dict = Depends(lambda: get_user_role("viewer"))
+):
+    with timed("aggregate", AGGREGATION_SECONDS, operation="rolling"):
+        return reads.do(("rolling", window, *params.items(), data_version.tag()), timeseries.rolling, window, **params)
 
-            summary[subsidiary]["total_allocated"] += record.get("Allocated_Budget", 0)
-            summary[subsidiary]["total_spent"] += record.get("Spent_Amount", 0)
-            summary[subsidiary]["total_remaining"] += record.get("Remaining_Budget", 0)
 
-    if not summary:
-        raise HTTPException(status_code=404, detail=f"No budget data found for sector: {sector}")
+@app.get("/budget/timeseries/negative")
+def get_first_negative(subsidiary: str = None, sector: str = None,
+                       user_role: dict = Depends(lambda: get_user_role("viewer"))):
+    with timed("aggregate", AGGREGATION_SECONDS, operation="first_negative"):
+        return timeseries.first_negative(subsidiary, sector)
 
-    return [{"Subsidiary": sub, **vals} for sub, vals in summary.items()]
 
+# 🔹 **Exception queries: top-K reads from the rank indexes kept by the columnar store, never a full scan (Admin & Viewer)**
+MAX_EXCEPTIONS = 1000
 
-# 4️⃣ **Fetch all transactions (Admin & Viewer)**
+
+@app.get("/budget/exceptions/overspent")
+def get_overspent_transactions(
+        subsidiary: str = None,
+        sector: str = None,
+        limit: int = Query(10, ge=1, le=MAX_EXCEPTIONS),
+        format: str = Depends(response_format),
+        user_role: dict = Depends(lambda: get_user_role("viewer"))
+):
+    # Most negative Remaining_Budget first; only rows below zero
+    with timed("aggregate", AGGREGATION_SECONDS, operation="overspent"):
+        rows = transactions.ranked("remaining", {"Subsidiary": subsidiary, "Sector": sector}, limit,
+                                   maximum=math.nextafter(0.0, -math.inf))
+    return rows_response(rows, format)
+
+
+@app.get("/budget/exceptions/utilization")
+def get_high_utilization(
+        min_ratio: float = Query(1.0, ge=0, description="Spent / allocated, e.g. 0.9 for 90% utilization"),
+        level: Literal["group", "subsidiary", "sector", "transaction"] = "group",
+        subsidiary: str = None,
+        sector: str = None,
+        limit: int = Query(10, ge=1, le=MAX_EXCEPTIONS),
+        format: str = Depends(response_format),
+        user_role: dict = Depends(lambda: get_user_role("viewer"))
+):
+    with timed("aggregate", AGGREGATION_SECONDS, operation="utilization"):
+        if level == "transaction":
+            rows = transactions.ranked("utilization", {"Subsidiary": subsidiary, "Sector": sector}, limit,
+                                       largest=True, minimum=min_ratio)
+        else:
+            rows = aggregates.utilization(min_ratio, level, subsidiary, sector)[:limit]
+    return rows_response(rows, format)
+
+
+@app.get("/budget/exceptions/spends")
+def get_largest_spends(
+        user_id: str = None,
+        subsidiary: str = None,
+        sector: str = None,
+        limit: int = Query(10, ge=1, le=MAX_EXCEPTIONS),
+        format: str = Depends(response_format),
+        user_role: dict = Depends(lambda: get_user_role("viewer"))
+):
+    if user_id is not None and (subsidiary is not None or sector is not None):
+        raise HTTPException(status_code=400, detail="Filter by user_id or by subsidiary/sector, not both")
+    with timed("aggregate", AGGREGATION_SECONDS, operation="spends"):
+        if user_id is not None:
+            rows = transactions.ranked("user_spent", {"User_ID": user_id}, limit, largest=True)
+        else:
+            rows = transactions.ranked("spent", {"Subsidiary": subsidiary, "Sector": sector}, limit, largest=True)
+    return rows_response(rows, format)
+
+
+# 🔹 **How many reads were coalesced or served from the short-lived result cache**
+@app.get("/reads/stats")
+def get_read_stats(user_role: dict = Depends(lambda: get_user_role("viewer"))):
+    return {"reads": reads.stats(), "loads": loads.stats(),
+            "query_cache": {"hits": query_cache.hits, "misses": query_cache.misses}}
+
+
+# 4️⃣ **Fetch transactions: filtered, cursor-paginated (JSON, Arrow or Parquet), or streamed as NDJSON (Admin & Viewer)**
 @app.get("/transactions")
-def get_all_transactions(user_role: dict = Depends(lambda: get_user_role("viewer"))):
-    ref = db.reference("/budget_transactions")
-    transactions = ref.get()
+def get_all_transactions(
+        filters=Depends(transaction_filters),
+        page: dict = Depends(page_params),
+        user_role: dict = Depends(lambda: get_user_role("viewer"))
+):
+    if page["format"] == "ndjson":
+        return ndjson_response(transactions.stream(filters, page["after"]), page["fields"])
 
-    if not transactions:
+    if page["format"] in TABLE_FORMATS:
+        # Built from the column arrays directly; no per-row dicts
+        table = transactions.page_table(filters, page["after"], page["limit"])
+        if not table.num_rows and page["after"] is None:
+            raise HTTPException(status_code=404, detail="No transactions found")
+        return table_page_response(table, page["limit"], page["fields"], page["format"])
+
+    rows = transactions.page(filters, page["after"], page["limit"])
+
+    if not rows and page["after"] is None:
         raise HTTPException(status_code=404, detail="No transactions found")
 
-    return transactions  # No need to use `.items()`, return list directly
+    return page_response(rows, page["limit"], page["fields"])
+
+
+# 🔹 **Adds, updates and deletes after sequence number `since`, oldest first (Admin & Viewer)**
+@app.get("/transactions/changes")
+def get_transaction_changes(
+        since: int = Query(None, ge=0, description="Last seq the client applied; omit to just get the current seq"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        user_role: dict = Depends(lambda: get_user_role("viewer"))
+):
+    if since is None:
+        # Read the seq *before* loading the full data: replaying changes a full load already has is harmless
+        changes = {"seq": change_log.last_seq(), "reset": False, "changes": [], "has_more": False}
+    else:
+        changes = change_log.since(since, limit)
+    return {"lineage": data_version.epoch, **changes}
+
+
+# 🔹 **Everything one dashboard render needs, in a single request (Admin & Viewer)**
+@app.get("/dashboard/bundle")
+def get_dashboard_bundle(
+        subsidiary: str = None,
+        sector: str = None,
+        page: dict = Depends(page_params),
+        user_role: dict = Depends(lambda: get_user_role("viewer"))
+):
+    # Summary and both breakdowns come from the same pass over the aggregates, so the panels always agree
+    with timed("aggregate", AGGREGATION_SECONDS, operation="panels"):
+        summary, by_subsidiary, by_sector = aggregates.panels(subsidiary, sector)
+    rows = transactions.page(TransactionFilter(), page["after"], page["limit"])
+
+    next_cursor = None
+    if len(rows) > page["limit"]:
+        rows = rows[:page["limit"]]
+        next_cursor = encode_cursor(rows[-1])
+
+    return {
+        "summary": summary,
+        "subsidiary": by_subsidiary if subsidiary else None,
+        "sector": by_sector if sector else None,
+        "transactions": [project(row, page["fields"]) for row in rows],
+        "next_cursor": next_cursor,
+    }
+
+
+# 🔹 **Queue a budget report (summary, time series, overspends) as CSV, XLSX or PDF (Admin & Viewer)**
+@app.post("/reports", status_code=202)
+def create_report(spec: dict = Depends(report_params), user_role: dict = Depends(lambda: get_user_role("viewer"))):
+    sync_snapshot()
+    if data_version.current > mapped["seq"]:
+        publish_pending()  # The job maps a snapshot file, so logged writes it must include are published first
+    # The job reads the snapshot version current now; identical requests until the next write share it
+    return report_queue.submit(spec, data_version.tag(), ("snapshot", snapshots.directory, mapped["version"]))
+
+
+# 🔹 **Report status, then download once it is done (Admin & Viewer)**
+@app.get("/reports/{report_id}")
+def get_report(report_id: str, user_role: dict = Depends(lambda: get_user_role("viewer"))):
+    job = report_queue.status(report_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Report {report_id} not found")
+    return report_queue.describe(job)
+
+
+@app.get("/reports/{report_id}/download")
+def download_report(report_id: str, user_role: dict = Depends(lambda: get_user_role("viewer"))):
+    return report_queue.download(report_id)
 
 
 # 5️⃣ **Add a new transaction (Admin Only)**
@@ -143,8 +631,6 @@ def add_transaction(
     if not user_role["can_edit"]:
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    ref = db.reference("/budget_transactions")
-    transactions = ref.get() or []  # Get existing transactions or an empty list
     new_transaction = {
         "Transaction_ID": Transaction_ID,
         "Date": Date,
@@ -157,32 +643,144 @@ def add_transaction(
         "Revenue_Generated": Revenue_Generated,
         "Transaction_Type": Transaction_Type
     }
-
-    transactions.append(new_transaction)
-    ref.set(transactions)  # Save updated list back to Firebase
+    try:
+        new_transaction = parse_transaction(new_transaction)  # Firebase has no schema: reject bad dates before writing
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    # The check and the write happen under the writer lock, so two admins adding the same ID can't both succeed
+    with snapshot_write():
+        if Transaction_ID in transactions:
+            raise HTTPException(status_code=409, detail=f"Transaction {Transaction_ID} already exists")
+        with upstream("firebase", "set") as measure:  # Only the new node
+            firebase().reference(TRANSACTIONS_PATH).child(transaction_key(Transaction_ID)).set(measure(new_transaction))
+
+        transactions.add(new_transaction)
+        aggregates.add(new_transaction)
+        timeseries.apply(new_transaction)
+        log_write([("add", Transaction_ID, new_transaction)])
 
     return {"message": "Transaction added successfully"}
 
 
-# 6️⃣ **Delete a transaction (Admin Only)**
-@app.delete("/transactions/delete/{transaction_id}")
-def delete_transaction(transaction_id: str, user_role: dict = Depends(lambda: get_user_role("admin"))):
+def write_bulk_batch(valid):
+    """
+    Writes one validated bulk batch [(row_number, transaction)] as a single multi-path Firebase update,
+    then applies it to the columnar store, aggregates and time series once and logs it as one change-log append.
+
+    Rows whose Transaction_ID already exists (or repeats within the batch) are returned as errors, not written.
+    """
+    with snapshot_write():
+        fresh, errors = split_duplicates(valid, transactions)
+        if not fresh:
+            return 0, errors
+
+        rows = [transaction for _, transaction in fresh]
+        try:
+            with upstream("firebase", "update") as measure:
+                firebase().reference(TRANSACTIONS_PATH).update(measure({transaction_key(row["Transaction_ID"]): row for row in rows}))
+        except Exception as error:
+            return 0, errors + [row_error(number, transaction, f"Batch rejected by Firebase: {error.__class__.__name__}")
+                                for number, transaction in fresh]
+
+        transactions.extend(rows)
+        aggregates.add_many(rows)
+        timeseries.apply_many(rows)
+        log_write([("add", row["Transaction_ID"], row) for row in rows])
+    return len(rows), errors
+
+
+# 🔹 **Bulk-add transactions from a streamed NDJSON or CSV body (Admin Only)**
+@app.post("/transactions/bulk")
+async def bulk_add_transactions(
+        request: Request,
+        format: Literal["ndjson", "csv"] = None,
+        user_role: dict = Depends(lambda: get_user_role("admin"))
+):
     if not user_role["can_edit"]:
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    ref = db.reference("/budget_transactions")
-    transactions = ref.get()
+    report = BulkReport()
+    async for valid, errors in read_batches(request, bulk_format(request, format)):
+        inserted, duplicates = await run_in_threadpool(write_bulk_batch, valid) if valid else (0, [])
+        report.add(inserted, sorted(errors + duplicates, key=lambda error: error["row"]), len(valid) + len(errors))
+    return report.as_dict()
 
-    if not transactions:
-        raise HTTPException(status_code=404, detail="No transactions found")
 
-    # Filter out the transaction with the given ID
-    updated_transactions = [t for t in transactions if t.get("Transaction_ID") != transaction_id]
+# 6️⃣ **Update an existing transaction (Admin Only)**
+@app.put("/transactions/update/{transaction_id}")
+def update_transaction(
+        transaction_id: str,
+        Date: str = None,
+        Subsidiary: str = None,
+        Sector: str = None,
+        User_ID: str = None,
+        Allocated_Budget: float = None,
+        Spent_Amount: float = None,
+        Remaining_Budget: float = None,
+        Revenue_Generated: float = None,
+        Transaction_Type: str = None,
+        user_role: dict = Depends(lambda: get_user_role("admin"))
+):
+    if not user_role["can_edit"]:
+        raise HTTPException(status_code=403, detail="Permission denied")
 
-    if len(updated_transactions) == len(transactions):
-        raise HTTPException(status_code=404, detail=f"Transaction {transaction_id} not found")
+    fields = {
+        "Date": Date,
+        "Subsidiary": Subsidiary,
+        "Sector": Sector,
+        "User_ID": User_ID,
+        "Allocated_Budget": Allocated_Budget,
+        "Spent_Amount": Spent_Amount,
+        "Remaining_Budget": Remaining_Budget,
+        "Revenue_Generated": Revenue_Generated,
+        "Transaction_Type": Transaction_Type
+    }
+    changes = {key: value for key, value in fields.items() if value is not None}
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields provided for update")
+
+    with snapshot_write():
+        # Old values come from the in-memory copy (found through the ID index), not from a Firebase read
+        old = transactions.get(transaction_id)
+        if old is None:
+            raise HTTPException(status_code=404, detail=f"Transaction {transaction_id} not found")
+
+        try:
+            new = parse_transaction({**old, **changes})
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+
+        # Patches only the changed fields of this one node
+        with upstream("firebase", "update") as measure:
+            firebase().reference(TRANSACTIONS_PATH).child(child_key(transaction_id)).update(measure({column: new[column] for column in changes}))
+
+        # Old values out, new values in: handles rows moving to another (Subsidiary, Sector) group or day
+        transactions.add(new)
+        aggregates.replace(old, new)
+        timeseries.replace(old, new)
+        log_write([("update", transaction_id, new)])
+
+    return {"message": f"Transaction {transaction_id} updated successfully"}
+
+
+# 7️⃣ **Delete a transaction (Admin Only)**
+@app.delete("/transactions/delete/{transaction_id}")
+def delete_transaction(transaction_id: str, user_role: dict = Depends(lambda: get_user_role("admin"))):
+    if not user_role["can_edit"]:
+        raise HTTPException(status_code=403, detail="Permission denied")
 
-    ref.set(updated_transactions)  # Save updated list to Firebase
+    with snapshot_write():
+        if transaction_id not in transactions:
+            raise HTTPException(status_code=404, detail=f"Transaction {transaction_id} not found")
+        with upstream("firebase", "delete"):
+            firebase().reference(TRANSACTIONS_PATH).child(child_key(transaction_id)).delete()
+
+        record = transactions.remove(transaction_id)  # The in-memory copy is what the aggregates were built from
+        legacy_keys.pop(transaction_id, None)
+        aggregates.remove(record)
+        timeseries.apply(record, sign=-1)
+        log_write([("delete", transaction_id, None)])
 
     return {"message": f"Transaction {transaction_id} deleted successfully"}
 
@@ -0,0 +1,525 @@
+import argparse
+import functools
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from schema import TRANSACTION_COLUMNS
+
+# Backups of either store as compressed Parquet, replacing budget_backup.sql-style dumps:
+# a full snapshot split into parts, then incremental segments holding only the transactions
+# written since the previous backup. manifest.json lists every file with its SHA-256.
+#
+#   python backup.py backup --source sql|snapshot     # incremental when possible, full otherwise
+#   python backup.py restore --target sql|firebase    # parts loaded in parallel, then segments in order
+#   python backup.py verify | list
+
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_COMPRESSION = os.getenv("BACKUP_COMPRESSION", "zstd")
+PART_ROWS = 250_000         # Rows per file of a full snapshot; restore loads the files in parallel
+ROW_GROUP_ROWS = 50_000
+KEEP_FULL = 2               # Full snapshots kept (each with the segments taken after it)
+RESTORE_BATCH_SIZE = 1_000  # Rows per Firebase multi-path update, IDs per DELETE when restoring
+UPSERT_BATCH_SIZE = 10_000  # Rows per executemany when restoring into SQL
+FETCH_BATCH_SIZE = 1_000    # Transaction_IDs per IN (...) lookup when reading changed rows
+
+FIREBASE_CREDENTIALS = os.getenv("FIREBASE_CREDENTIALS", "firebase-adminsdk.json")
+FIREBASE_URL = os.getenv("FIREBASE_URL", "https://budgetdb-7d811-default-rtdb.firebaseio.com/")
+
+SCHEMA = pa.schema([
+    ("Transaction_ID", pa.string()),
+    ("Date", pa.date32()),
+    ("Subsidiary", pa.string()),
+    ("Sector", pa.string()),
+    ("User_ID", pa.string()),
+    ("Allocated_Budget", pa.float64()),
+    ("Spent_Amount", pa.float64()),
+    ("Remaining_Budget", pa.float64()),
+    ("Revenue_Generated", pa.float64()),
+    ("Transaction_Type", pa.string()),
+])
+# One row per changed Transaction_ID: its state after the segment's last version (columns null when deleted)
+SEGMENT_SCHEMA = pa.schema([("version", pa.int64()), ("deleted", pa.bool_()), *SCHEMA])
+
+
+def columns_batch(columns, schema=SCHEMA):
+    """RecordBatch from {column: list of values}; Date values may be dates or ISO strings."""
+    dates = pa.array([None if day is None else str(day)[:10] for day in columns["Date"]], pa.string())
+    return pa.RecordBatch.from_pydict({**columns, "Date": dates.cast(pa.date32())}, schema=schema)
+
+
+def records_batch(records, schema=SCHEMA):
+    return columns_batch({column: [record.get(column) for record in records] for column in schema.names}, schema)
+
+
+def table_columns(table):
+    """Transaction columns of a backup table as lists, with Date as "YYYY-MM-DD" like every other loader writes it."""
+    return [pc.cast(table[column], pa.string()).to_pylist() if column == "Date" else table[column].to_pylist()
+            for column in TRANSACTION_COLUMNS]
+
+
+def table_rows(table):
+    """Transaction dicts from a backup table."""
+    return [dict(zip(TRANSACTION_COLUMNS, values)) for values in zip(*table_columns(table))]
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# 🔹 Sources: each backup reads a version number plus the rows (or changed rows) as of that version
+
+class SqlSource:
+    """
+    budget_transactions in the SQL database. Versions are data_version; incremental segments read the
+    Transaction_IDs logged in budget_changes (migrations/0006) and fetch just those rows.
+    """
+
+    kind = "sql"
+
+    def __init__(self, url):
+        from sqlalchemy import create_engine
+        from sqlalchemy.engine import make_url
+
+        self.engine = create_engine(url)
+        self.lineage = make_url(url).render_as_string(hide_password=True)
+
+    @contextmanager
+    def full(self):
+        """Yields (version, RecordBatches of every row). Rows are at least as new as the version."""
+        from sqlalchemy import text
+        from sql_store import read_data_version
+
+        query = text(f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM budget_transactions ORDER BY Transaction_ID")
+        with self.engine.connect() as conn, conn.begin():  # One transaction: a consistent read on MySQL
+            version = read_data_version(conn)
+            result = conn.execution_options(stream_results=True, yield_per=ROW_GROUP_ROWS).execute(query)
+            yield version, (columns_batch(dict(zip(TRANSACTION_COLUMNS, zip(*part))))
+                            for part in result.partitions(ROW_GROUP_ROWS))
+
+    def changes(self, since):
+        """(version, segment table) of the rows changed after `since`, or None if the change log doesn't reach back that far."""
+        from sqlalchemy import bindparam, text
+
+        with self.engine.connect() as conn, conn.begin():
+            version, start = conn.exec_driver_sql("SELECT version, changes_start FROM data_version WHERE id = 1").one()
+            if since < start or since > version:
+                return None
+            changed = dict(conn.execute(text(
+                "SELECT Transaction_ID, MAX(version) FROM budget_changes "
+                "WHERE version > :since AND version <= :version GROUP BY Transaction_ID"
+            ), {"since": since, "version": version}).all())
+            query = text(f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM budget_transactions "
+                         "WHERE Transaction_ID IN :ids").bindparams(bindparam("ids", expanding=True))
+            ids = list(changed)
+            rows = {}
+            for offset in range(0, len(ids), FETCH_BATCH_SIZE):
+                for row in conn.execute(query, {"ids": ids[offset:offset + FETCH_BATCH_SIZE]}).mappings():
+                    rows[row["Transaction_ID"]] = dict(row)
+        segment = [{**rows.get(transaction_id, {"Transaction_ID": transaction_id}), "version": changed_at,
+                    "deleted": transaction_id not in rows} for transaction_id, changed_at in changed.items()]
+        return version, pa.Table.from_batches([records_batch(segment, SEGMENT_SCHEMA)])
+
+    def backed_up(self, version):
+        """Drops change-log entries up to a full snapshot's version; older segments can't be taken from them anymore."""
+        from sqlalchemy import text
+
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM budget_changes WHERE version <= :version"), {"version": version})
+            conn.execute(text("UPDATE data_version SET changes_start = :version WHERE id = 1 AND changes_start < :version"),
+                         {"version": version})
+
+
+class SnapshotSource:
+    """
+    The Firebase data as mirrored by backend.py: its published columnar snapshot plus the change log
+    next to it (changes.ndjson). Versions are change-log sequence numbers, so a segment is just the
+    log entries since the last backup; Firebase itself is never downloaded.
+    """
+
+    kind = "snapshot"
+
+    def __init__(self, directory):
+        from changelog import ChangeLog
+        from snapshot import SnapshotStore
+
+        self.store = SnapshotStore(directory)
+        self.log = ChangeLog(directory)
+        current = self.store.current()
+        if current is None:
+            raise SystemExit(f"❌ No snapshot published in {directory}: start backend.py once so it mirrors Firebase there.")
+        self.lineage = current[0]
+
+    @contextmanager
+    def full(self):
+        from changelog import replay
+        from columnar import ColumnarTransactions
+        from pagination import TransactionFilter
+
+        with self.store.writer():  # Nothing is logged or published meanwhile
+            version = self.log.last_seq()
+            _, _, arrays, meta = self.store.open()
+            pending = self.log.since(meta.get("seq", version), limit=2 ** 62)
+        if pending["reset"]:
+            raise SystemExit("❌ The change log no longer reaches the published snapshot; retry after the next publish.")
+        transactions = ColumnarTransactions()
+        transactions.attach(arrays, meta["dictionaries"])  # Shared pages, no copy
+        replay(transactions, [entry for entry in pending["changes"] if entry["seq"] <= version])  # Writes since it
+        yield version, (pa.Table.from_batches([batch]).cast(SCHEMA).to_batches()[0]
+                        for batch in transactions.table_batches(TransactionFilter(), ROW_GROUP_ROWS)
+                        if batch.num_rows)
+
+    def changes(self, since):
+        pending = self.log.since(since, limit=2 ** 62)
+        if pending["reset"]:  # Replaced by a download from Firebase, or further behind than the log keeps
+            return None
+        latest = {}
+        for entry in pending["changes"]:
+            latest[entry["Transaction_ID"]] = {**(entry["record"] or {"Transaction_ID": entry["Transaction_ID"]}),
+                                               "version": entry["seq"], "deleted": entry["op"] == "delete"}
+        return pending["seq"], pa.Table.from_batches([records_batch(list(latest.values()), SEGMENT_SCHEMA)])
+
+    def backed_up(self, version):
+        pass  # The log trims itself (CHANGELOG_RETAIN); a backup that falls behind it takes a full snapshot
+
+
+# 🔹 Backup directory: Parquet files plus manifest.json
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"source": None, "lineage": None, "backups": []}
+
+
+def write_manifest(directory, manifest):
+    tmp_path = os.path.join(directory, "manifest.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(tmp_path, os.path.join(directory, "manifest.json"))  # Files are in place before they are listed
+
+
+def file_entry(directory, path, rows):
+    full_path = os.path.join(directory, path)
+    return {"path": path, "rows": rows, "bytes": os.path.getsize(full_path), "sha256": file_digest(full_path)}
+
+
+def write_full(directory, name, batches):
+    """Writes batches as parts of PART_ROWS rows under directory/name; returns their file entries."""
+    staging = os.path.join(directory, f".{name}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    parts, writer, rows = [], None, 0
+    for batch in batches:
+        if writer is None:
+            writer = pq.ParquetWriter(os.path.join(staging, f"part-{len(parts):05d}.parquet"), SCHEMA,
+                                      compression=BACKUP_COMPRESSION)
+        writer.write_batch(batch, row_group_size=ROW_GROUP_ROWS)
+        rows += batch.num_rows
+        if rows >= PART_ROWS:
+            writer.close()
+            parts.append(rows)
+            writer, rows = None, 0
+    if writer is not None:
+        writer.close()
+        parts.append(rows)
+    shutil.rmtree(os.path.join(directory, name), ignore_errors=True)  # Same version of another lineage
+    os.replace(staging, os.path.join(directory, name))
+    return [file_entry(directory, f"{name}/part-{number:05d}.parquet", rows) for number, rows in enumerate(parts)]
+
+
+def prune(directory, manifest, keep_full=KEEP_FULL):
+    """Keeps the last `keep_full` full snapshots and the segments taken after the oldest one kept."""
+    fulls = [index for index, backup in enumerate(manifest["backups"]) if backup["kind"] == "full"]
+    if len(fulls) <= keep_full:
+        return
+    dropped, manifest["backups"] = manifest["backups"][:fulls[-keep_full]], manifest["backups"][fulls[-keep_full]:]
+    write_manifest(directory, manifest)
+    remove_files(directory, dropped)
+
+
+def remove_files(directory, backups):
+    for backup in backups:
+        if backup["kind"] == "full":
+            shutil.rmtree(os.path.join(directory, backup["name"]), ignore_errors=True)
+        else:
+            for entry in backup["files"]:
+                os.remove(os.path.join(directory, entry["path"]))
+
+
+def backup(source, directory=BACKUP_DIR, full=False, keep_full=KEEP_FULL):
+    """
+    Appends an incremental segment (the rows changed since the last backup) to the backup chain, or
+    writes a full snapshot when asked, when there is none yet, or when the source can't tell what
+    changed since then. Returns the manifest entry, or None if nothing changed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory)
+    if manifest["source"] not in (None, source.kind):
+        raise SystemExit(f"❌ {directory} holds {manifest['source']} backups; use another --dir for {source.kind}.")
+    last = manifest["backups"][-1] if manifest["backups"] and manifest["lineage"] == source.lineage else None
+
+    started = time.perf_counter()
+    changes = None if full or last is None else source.changes(last["version"])
+    if changes is not None:
+        version, segment = changes
+        if version == last["version"]:
+            return None
+        name = f"incr-{last['version']:012d}-{version:012d}"
+        pq.write_table(segment, os.path.join(directory, f"{name}.parquet"), compression=BACKUP_COMPRESSION)
+        entry = {"name": name, "kind": "incremental", "since": last["version"], "version": version,
+                 "rows": segment.num_rows, "deleted": pc.sum(segment["deleted"]).as_py() or 0,
+                 "files": [file_entry(directory, f"{name}.parquet", segment.num_rows)]}
+    else:
+        with source.full() as (version, batches):
+            name = f"full-{version:012d}"
+            if last is not None and last["kind"] == "full" and last["version"] == version:
+                return None
+            files = write_full(directory, name, batches)
+        entry = {"name": name, "kind": "full", "version": version, "rows": sum(f["rows"] for f in files), "files": files}
+
+    entry.update(created_at=time.time(), seconds=round(time.perf_counter() - started, 3))
+    replaced = []
+    if manifest["lineage"] != source.lineage:  # A different database, or a wiped snapshot directory: start over
+        replaced = [backup for backup in manifest["backups"] if backup["name"] != name]
+        manifest = {"source": source.kind, "lineage": source.lineage, "backups": []}
+    manifest["backups"].append(entry)
+    write_manifest(directory, manifest)
+    remove_files(directory, replaced)
+    if entry["kind"] == "full":
+        source.backed_up(version)
+        prune(directory, manifest, keep_full)
+    return entry
+
+
+def restore_chain(manifest, version=None):
+    """The latest full snapshot at or before `version` (default: the newest) and the segments that follow it."""
+    backups = [backup for backup in manifest["backups"] if version is None or backup["version"] <= version]
+    starts = [index for index, backup in enumerate(backups) if backup["kind"] == "full"]
+    if not starts:
+        raise SystemExit("❌ No full snapshot to restore from" + (f" at or before version {version}." if version else "."))
+    return backups[starts[-1]:]
+
+
+def verify(directory, backups):
+    """Checks every file's row count and SHA-256 against the manifest; returns the problems found."""
+    problems = []
+    for backup in backups:
+        for entry in backup["files"]:
+            path = os.path.join(directory, entry["path"])
+            if not os.path.exists(path):
+                problems.append(f"{entry['path']}: missing")
+            elif file_digest(path) != entry["sha256"]:
+                problems.append(f"{entry['path']}: checksum mismatch")
+            elif pq.read_metadata(path).num_rows != entry["rows"]:
+                problems.append(f"{entry['path']}: expected {entry['rows']} rows")
+    return problems
+
+
+# 🔹 Targets: the full snapshot's parts load in parallel, then each segment is applied in order
+
+def run_parallel(tasks, workers):
+    """Runs zero-argument callables on a thread pool, at most 2 * workers queued; returns the sum of their results."""
+    total, pending = 0, set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for task in tasks:
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    total += sum(future.result() for future in done)
+                pending.add(pool.submit(task))
+            total += sum(future.result() for future in pending)  # Re-raises the first failure
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+    return total
+
+
+def segment_changes(directory, entry):
+    """(live rows, Transaction_IDs to delete) from one segment file; rows as a table."""
+    segment = pq.read_table(os.path.join(directory, entry["path"]))
+    return segment.filter(pc.invert(segment["deleted"])), segment.filter(segment["deleted"])["Transaction_ID"].to_pylist()
+
+
+@contextmanager
+def without_secondary_indexes(engine):
+    """
+    Drops budget_transactions' secondary indexes for the block and recreates them after it, like
+    mysqldump's DISABLE KEYS: building an index once over loaded rows beats updating it per row.
+    """
+    from sqlalchemy import inspect
+
+    from sql_store import dialect_family
+
+    with engine.begin() as conn:
+        indexes = inspect(conn).get_indexes("budget_transactions")
+        for index in indexes:
+            on_table = " ON budget_transactions" if dialect_family(conn) == "mysql" else ""
+            conn.exec_driver_sql(f"DROP INDEX {index['name']}{on_table}")
+    try:
+        yield
+    finally:
+        with engine.begin() as conn:
+            for index in indexes:
+                unique = "UNIQUE " if index["unique"] else ""
+                conn.exec_driver_sql(f"CREATE {unique}INDEX {index['name']} ON budget_transactions "
+                                     f"({', '.join(index['column_names'])})")
+
+
+def restore_sql(directory, chain, url, workers=8, replace=False):
+    """
+    Loads the chain into budget_transactions, then rebuilds the rollups. Parts are read and
+    upserted concurrently (on SQLite, which takes one writer at a time, only the reading overlaps);
+    loading into an empty table drops the secondary indexes until the rows are in.
+    """
+    from sqlalchemy import bindparam, create_engine, text
+
+    from migrate import migrate
+    from rollup import rebuild_rollup
+    from sql_store import dialect_family, pool_options, read_data_version, upsert_rows
+
+    engine = create_engine(url, **pool_options(url))
+    migrate(engine)
+    with engine.begin() as conn:
+        if replace:
+            conn.execute(text("DELETE FROM budget_transactions"))
+        empty = conn.execute(text("SELECT 1 FROM budget_transactions LIMIT 1")).first() is None
+    write_lock = threading.Lock() if dialect_family(engine) == "sqlite" else nullcontext()
+    delete = text("DELETE FROM budget_transactions WHERE Transaction_ID IN :ids").bindparams(bindparam("ids", expanding=True))
+
+    def write(table, removed=()):
+        rows = list(zip(*table_columns(table)))
+        with write_lock, engine.begin() as conn:
+            for start in range(0, len(removed), RESTORE_BATCH_SIZE):
+                conn.execute(delete, {"ids": removed[start:start + RESTORE_BATCH_SIZE]})
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                upsert_rows(conn, rows[start:start + UPSERT_BATCH_SIZE])
+        return len(rows)
+
+    def load_part(path):
+        return write(pq.read_table(os.path.join(directory, path)))
+
+    with without_secondary_indexes(engine) if empty else nullcontext():
+        loaded = run_parallel((functools.partial(load_part, entry["path"]) for entry in chain[0]["files"]), workers)
+    for backup in chain[1:]:
+        for entry in backup["files"]:
+            loaded += write(*segment_changes(directory, entry))  # One transaction per segment, in order
+
+    with engine.begin() as conn:
+        rebuild_rollup(conn)
+        # Restored rows aren't in budget_changes: the next backup of this database starts with a full snapshot
+        version = read_data_version(conn)
+        conn.execute(text("DELETE FROM budget_changes"))
+        conn.execute(text("UPDATE data_version SET changes_start = :version WHERE id = 1"), {"version": version})
+    engine.dispose()
+    return loaded
+
+
+def restore_firebase(directory, chain, ref, workers=8, replace=False, retries=5):
+    """
+    Writes the chain under `ref` as concurrent multi-path updates keyed by Transaction_ID (deletes
+    are null values), so a restore can be retried safely. backend.py picks it up on its next refresh.
+    """
+    from firebase_store import transaction_key
+    from upload_to_firebase import upload_batch
+
+    if replace:
+        ref.delete()
+
+    def batches(rows, removed=()):
+        updates = [(transaction_key(transaction_id), None) for transaction_id in removed]
+        updates += [(transaction_key(row["Transaction_ID"]), row) for row in rows]
+        for start in range(0, len(updates), RESTORE_BATCH_SIZE):
+            yield functools.partial(upload_batch, ref, dict(updates[start:start + RESTORE_BATCH_SIZE]), retries)
+
+    def part_batches():
+        for entry in chain[0]["files"]:
+            yield from batches(table_rows(pq.read_table(os.path.join(directory, entry["path"]))))
+
+    loaded = run_parallel(part_batches(), workers)
+    for backup in chain[1:]:
+        for entry in backup["files"]:
+            rows, removed = segment_changes(directory, entry)
+            loaded += run_parallel(batches(table_rows(rows), removed), workers)  # A key appears once per segment
+    return loaded
+
+
+def describe(backup):
+    kind = "full       " if backup["kind"] == "full" else f"incr {backup['since']:>6} →"
+    deleted = f", {backup['deleted']} deleted" if backup.get("deleted") else ""
+    size = sum(entry["bytes"] for entry in backup["files"])
+    return f"{kind} v{backup['version']:<8} {backup['rows']:>10,} rows{deleted}  {size / 1e6:8.1f} MB  " \
+           f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(backup['created_at']))}  ({backup['seconds']}s)"
+
+
+if __name__ == "__main__":
+    from snapshot import SNAPSHOT_DIR
+    from sql_store import DATABASE_URL
+
+    parser = argparse.ArgumentParser(description="Incremental Parquet backups of the budget data, and parallel restores.")
+    parser.add_argument("command", choices=["backup", "restore", "verify", "list"])
+    parser.add_argument("--dir", default=BACKUP_DIR, help="backup directory (one source per directory)")
+    parser.add_argument("--source", choices=["sql", "snapshot"], default="sql",
+                        help="backup: the SQL database, or the Firebase data mirrored in backend.py's snapshot")
+    parser.add_argument("--target", choices=["sql", "firebase"], help="restore: where to load (default: the backup's source)")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--full", action="store_true", help="backup: write a full snapshot even if a segment would do")
+    parser.add_argument("--keep-full", type=int, default=KEEP_FULL, help="backup: full snapshots to keep")
+    parser.add_argument("--version", type=int, help="restore: the state as of this backup version (default: latest)")
+    parser.add_argument("--workers", type=int, default=8, help="restore: concurrent loaders")
+    parser.add_argument("--replace", action="store_true", help="restore: delete the target's transactions first")
+    args = parser.parse_args()
+
+    manifest = read_manifest(args.dir)
+
+    if args.command == "backup":
+        source = SqlSource(args.database_url) if args.source == "sql" else SnapshotSource(args.snapshot_dir)
+        entry = backup(source, args.dir, args.full, args.keep_full)
+        print("✅ Up to date, nothing changed since the last backup." if entry is None else f"✅ {describe(entry)}")
+
+    elif args.command == "list":
+        for backup_entry in manifest["backups"]:
+            print(describe(backup_entry))
+
+    elif args.command == "verify":
+        problems = verify(args.dir, manifest["backups"])
+        for problem in problems:
+            print(f"❌ {problem}")
+        print(f"{'❌' if problems else '✅'} Checked {sum(len(b['files']) for b in manifest['backups'])} files.")
+        raise SystemExit(1 if problems else 0)
+
+    else:
+        chain = restore_chain(manifest, args.version)
+        problems = verify(args.dir, chain)  # Nothing is written unless every file checks out
+        if problems:
+            raise SystemExit("❌ " + "; ".join(problems))
+        started = time.perf_counter()
+        target = args.target or ("sql" if manifest["source"] == "sql" else "firebase")
+        if target == "sql":
+            rows = restore_sql(args.dir, chain, args.database_url, args.workers, args.replace)
+        else:
+            import firebase_admin
+            from firebase_admin import credentials, db
+
+            from firebase_store import TRANSACTIONS_PATH
+
+            firebase_admin.initialize_app(credentials.Certificate(FIREBASE_CREDENTIALS), {"databaseURL": FIREBASE_URL})
+            rows = restore_firebase(args.dir, chain, db.reference(TRANSACTIONS_PATH), args.workers, args.replace)
+        print(f"✅ Restored version {chain[-1]['version']} ({rows:,} rows written, {len(chain) - 1} segments) "
+              f"into {target} in {time.perf_counter() - started:.1f}s.")
@@ -0,0 +1,321 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+# End-to-end benchmarks of backend.py (against fake_firebase) and app.py (against a SQLite stand-in)
+# on synthetic data. Each (backend, size) runs in its own process, so peak RSS and caches don't leak
+# between runs; requests go through the full ASGI stack in-process (no network).
+#
+#   python benchmark.py --sizes 10000,100000,1000000
+#   python benchmark.py --compare benchmark_results/<older>.json
+
+RESULTS_DIR = "benchmark_results"
+
+# (name, path, params) timed for each backend; params may be a function of the request number (to bypass caches)
+READS = {
+    "firebase": [
+        ("GET /budget/summary", "/budget/summary", {}),
+        ("GET /budget/subsidiary/{subsidiary}", "/budget/subsidiary/Branch A", {}),
+        ("GET /budget/sector/{sector}", "/budget/sector/HR", {}),
+        ("GET /budget/query (User_ID x month, cached)", "/budget/query", {"dimensions": "User_ID,month", "measures": "count,sum:Spent_Amount"}),
+        ("GET /budget/query (Sector x month, new filter each time)", "/budget/query", lambda i: {"dimensions": "Sector,month", "spent_min": i}),
+        ("GET /budget/timeseries/burn", "/budget/timeseries/burn", {}),
+        ("GET /transactions (1000 rows)", "/transactions", {"limit": 1000}),
+        ("GET /transactions (1000 rows, Arrow)", "/transactions", {"limit": 1000, "format": "arrow"}),
+        ("GET /transactions (filtered, 100 rows)", "/transactions", {"sector": "HR", "spent_min": 30000, "limit": 100}),
+        ("GET /dashboard/bundle", "/dashboard/bundle", {"limit": 1000}),
+    ],
+    "sql": [
+        ("GET /budget/summary", "/budget/summary", {}),
+        ("GET /budget/{subsidiary}", "/budget/Branch A", {}),
+        ("GET /budget/query (User_ID x month, cached)", "/budget/query", {"dimensions": "User_ID,month", "measures": "count,sum:Spent_Amount"}),
+        ("GET /budget/query (Sector x month, new filter each time)", "/budget/query", lambda i: {"dimensions": "Sector,month", "spent_min": i}),
+        ("GET /budget/timeseries/burn", "/budget/timeseries/burn", {}),
+        ("GET /transactions (1000 rows)", "/transactions", {"limit": 1000}),
+        ("GET /transactions (1000 rows, Arrow)", "/transactions", {"limit": 1000, "format": "arrow"}),
+        ("GET /transactions (filtered, 100 rows)", "/transactions", {"sector": "HR", "spent_min": 30000, "limit": 100}),
+    ],
+}
+
+
+def rss_mb():
+    """Current resident set size (VmRSS), falling back to the peak where /proc isn't available."""
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KiB on Linux
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds."""
+    samples = np.asarray(samples) * 1000
+    if not len(samples):
+        return {"count": 0}
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+    return {"count": len(samples), "mean_ms": round(float(samples.mean()), 3), "p50_ms": round(float(p50), 3),
+            "p90_ms": round(float(p90), 3), "p99_ms": round(float(p99), 3), "max_ms": round(float(samples.max()), 3)}
+
+
+def timed(client, method, path, **kwargs):
+    started = time.perf_counter()
+    response = client.request(method, path, **kwargs)
+    return time.perf_counter() - started, response.status_code
+
+
+def measure_reads(client, endpoints, count):
+    results = {}
+    for name, path, params in endpoints:
+        samples, statuses = [], {}
+        for i in range(count + 3):
+            elapsed, status = timed(client, "GET", path, params=params(i) if callable(params) else params)
+            statuses[status] = statuses.get(status, 0) + 1
+            if i >= 3:  # The first requests warm caches and lazy state
+                samples.append(elapsed)
+        results[name] = {**summarize(samples), "statuses": statuses}
+
+    # Revalidation: what an unchanged dashboard rerun costs
+    etag = client.get("/budget/summary").headers.get("etag")
+    if etag:
+        samples = [timed(client, "GET", "/budget/summary", headers={"If-None-Match": etag})[0] for _ in range(count)]
+        results["GET /budget/summary (304)"] = summarize(samples)
+    return results
+
+
+def measure_throughput(client, endpoints, concurrency, duration):
+    """Threads issue the read mix back to back for `duration` seconds."""
+    samples, errors, lock = [], [0], threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def worker(offset):
+        local, failed, i = [], 0, offset
+        while time.perf_counter() < stop:
+            _, path, params = endpoints[i % len(endpoints)]
+            elapsed, status = timed(client, "GET", path, params=params(i) if callable(params) else params)
+            local.append(elapsed)
+            failed += status >= 500
+            i += 1
+        with lock:
+            samples.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {"concurrency": concurrency, "requests": len(samples), "errors": errors[0],
+            "rps": round(len(samples) / elapsed, 1), **summarize(samples)}
+
+
+def measure_writes(client, count, firebase=None):
+    """Latency of add, update and delete; with the fake Firebase, also calls and bytes sent per write."""
+    results = {}
+    ids = [f"BENCH{i:08d}" for i in range(count)]
+    operations = {
+        "POST /transactions/add": lambda tid: ("POST", "/transactions/add", {
+            "Transaction_ID": tid, "Date": "2024-06-15", "Subsidiary": "Branch A", "Sector": "IT", "User_ID": "U001",
+            "Allocated_Budget": 1000.0, "Spent_Amount": 400.0, "Remaining_Budget": 600.0, "Revenue_Generated": 0.0,
+            "Transaction_Type": "Expense"}),
+        "PUT /transactions/update/{id}": lambda tid: ("PUT", f"/transactions/update/{tid}", {"Spent_Amount": 700.0}),
+        "DELETE /transactions/delete/{id}": lambda tid: ("DELETE", f"/transactions/delete/{tid}", {}),
+    }
+    for name, request in operations.items():
+        before = dict(firebase.stats) if firebase else {}
+        samples, statuses = [], {}
+        for tid in ids:
+            method, path, params = request(tid)
+            elapsed, status = timed(client, method, path, params=params)
+            samples.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+        results[name] = {**summarize(samples), "statuses": statuses}
+        if firebase:
+            sent = {operation: (calls - before.get(operation, (0, 0))[0], size - before.get(operation, (0, 0))[1])
+                    for operation, (calls, size) in firebase.stats.items() if operation != "get"}
+            results[name]["firebase_calls_per_write"] = round(sum(calls for calls, _ in sent.values()) / count, 2)
+            results[name]["firebase_bytes_per_write"] = round(sum(size for _, size in sent.values()) / count, 1)
+    return results
+
+
+def start_firebase(size, seed, workdir):
+    """Seeds fake_firebase with synthetic data and returns (app, fake) with backend.py pointed at it."""
+    os.environ["SNAPSHOT_DIR"] = os.path.join(workdir, "snapshot")
+    import backend
+    from fake_firebase import FakeDatabase
+    from firebase_store import TRANSACTIONS_PATH, transaction_key
+    from synthetic import generate_transactions
+
+    fake = FakeDatabase()
+    fake.reference(TRANSACTIONS_PATH).set({transaction_key(row["Transaction_ID"]): row
+                                           for row in generate_transactions(size, seed)})
+    fake.stats.clear()
+    backend.db = fake
+    return backend.app, fake
+
+
+def start_sql(size, seed, workdir):
+    """Loads synthetic data into a SQLite stand-in with the repo's own loader and returns (app, None)."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    import app
+    from database import load_csv
+    from migrate import migrate
+    from rollup import rebuild_rollup
+    from synthetic import write_csv
+
+    csv_file = os.path.join(workdir, "transactions.csv")
+    write_csv(csv_file, size, seed)
+    migrate(app.engine)
+    with contextlib.redirect_stdout(sys.stderr):  # Keep stdout for the result
+        load_csv(app.engine, csv_file)
+    with app.engine.begin() as conn:
+        rebuild_rollup(conn)
+    return app.app, None
+
+
+def run_one(backend_name, size, args):
+    """Benchmarks one backend at one dataset size; returns the result dict."""
+    from fastapi.testclient import TestClient
+
+    result = {"backend": backend_name, "size": size}
+    with tempfile.TemporaryDirectory() as workdir:
+        baseline = rss_mb()
+        started = time.perf_counter()
+        app, fake = (start_firebase if backend_name == "firebase" else start_sql)(size, args.seed, workdir)
+        result["seed_s"] = round(time.perf_counter() - started, 3)
+        seeded = rss_mb()
+
+        started = time.perf_counter()
+        with TestClient(app) as client:  # Runs the lifespan: backend.py downloads from the fake here
+            result["startup_s"] = round(time.perf_counter() - started, 3)
+            result["app_rss_mb"] = round(rss_mb() - seeded, 1)
+            result["seed_rss_mb"] = round(seeded - baseline, 1)  # The fake remote store, or the loader's imports for sql
+
+            print(f"  {backend_name} {size:,}: reads", file=sys.stderr)
+            result["reads"] = measure_reads(client, READS[backend_name], args.requests)
+            print(f"  {backend_name} {size:,}: throughput", file=sys.stderr)
+            result["throughput"] = [measure_throughput(client, READS[backend_name], concurrency, args.duration)
+                                    for concurrency in args.concurrency]
+            print(f"  {backend_name} {size:,}: writes", file=sys.stderr)
+            result["writes"] = measure_writes(client, args.writes, fake)
+        result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return result
+
+
+def flatten(results):
+    """{(backend, size, metric path): value} for the metrics --compare checks."""
+    flat = {}
+    for run in results["runs"]:
+        key = (run["backend"], run["size"])
+        flat[key + ("startup_s",)] = run["startup_s"]
+        flat[key + ("peak_rss_mb",)] = run["peak_rss_mb"]
+        for group in ("reads", "writes"):
+            for name, stats in run[group].items():
+                for metric in ("p50_ms", "p99_ms"):
+                    if metric in stats:
+                        flat[key + (f"{name} {metric}",)] = stats[metric]
+        for stats in run["throughput"]:
+            flat[key + (f"concurrency {stats['concurrency']} rps",)] = stats["rps"]
+    return flat
+
+
+def compare(old_file, new_results, threshold):
+    """Prints metrics that moved more than `threshold` (a fraction) and returns how many got worse."""
+    with open(old_file) as file:
+        old = flatten(json.load(file))
+    new = flatten(new_results)
+    regressions = 0
+    for key in sorted(set(old) & set(new), key=str):
+        before, after = old[key], new[key]
+        if not before:
+            continue
+        change = (after - before) / before
+        higher_is_better = key[-1].endswith("rps")
+        worse = change < -threshold if higher_is_better else change > threshold
+        better = change > threshold if higher_is_better else change < -threshold
+        if worse or better:
+            regressions += worse
+            print(f"{'❌' if worse else '✅'} {key[0]} {key[1]:,} {key[2]}: {before} → {after} ({change:+.0%})")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark backend.py and app.py on synthetic data.")
+    parser.add_argument("--backends", default="firebase,sql", help="comma-separated: firebase, sql")
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated dataset sizes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=100, help="timed requests per read endpoint")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated thread counts for the throughput test")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per throughput test")
+    parser.add_argument("--writes", type=int, default=50, help="adds, updates and deletes timed each")
+    parser.add_argument("--output", help=f"result file (default: {RESULTS_DIR}/<UTC time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against (exit code 1 on regressions)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change --compare reports")
+    parser.add_argument("--run", help=argparse.SUPPRESS)  # backend:size, used for the per-run subprocesses
+    args = parser.parse_args()
+    args.concurrency = [int(value) for value in args.concurrency.split(",")]
+
+    if args.run:
+        backend_name, size = args.run.split(":")
+        print(json.dumps(run_one(backend_name, int(size), args)))
+        raise SystemExit(0)
+
+    results = {
+        "meta": {"started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": git_commit(),
+                 "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "args": {key: value for key, value in vars(args).items() if key not in ("run", "compare", "output")}},
+        "runs": [],
+    }
+    passthrough = ["--seed", str(args.seed), "--requests", str(args.requests), "--duration", str(args.duration),
+                   "--writes", str(args.writes), "--concurrency", ",".join(map(str, args.concurrency))]
+    for backend_name in args.backends.split(","):
+        for size in [int(value) for value in args.sizes.split(",")]:
+            print(f"⏳ {backend_name} with {size:,} transactions", file=sys.stderr)
+            completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", f"{backend_name}:{size}",
+                                        *passthrough], stdout=subprocess.PIPE, text=True)
+            if completed.returncode:
+                print(f"❌ {backend_name} {size:,} failed (exit {completed.returncode})", file=sys.stderr)
+                continue
+            run = json.loads(completed.stdout.strip().splitlines()[-1])
+            results["runs"].append(run)
+            reads = run["reads"]
+            print(f"✅ startup {run['startup_s']}s, peak RSS {run['peak_rss_mb']} MB, summary p50 "
+                  f"{reads['GET /budget/summary']['p50_ms']} ms, "
+                  f"{max(stats['rps'] for stats in run['throughput'])} req/s best", file=sys.stderr)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"📄 Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        raise SystemExit(1 if compare(args.compare, results, args.threshold) else 0)
@@ -0,0 +1,144 @@
+import codecs
+import csv
+import json
+
+from fastapi import HTTPException
+
+from schema import parse_transaction
+
+BULK_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json": "ndjson",
+}
+
+
+def bulk_format(request, format=None):
+    """Body format from ?format=, else from the Content-Type header (415 if it is neither CSV nor NDJSON)."""
+    if format:
+        return format
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson (or pass ?format=)")
+    return CONTENT_TYPES[content_type]
+
+
+async def read_lines(request):
+    """Decodes the request body as it arrives and yields it line by line."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()  # Also drops a leading BOM (Excel CSV exports)
+    pending = ""
+    try:
+        async for chunk in request.stream():
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body is not valid UTF-8 (earlier batches were already applied)")
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def read_records(request, format):
+    """Yields (row_number, raw_record, error) for every data row; raw_record is None when the row can't be parsed."""
+    number = 0
+    if format == "ndjson":
+        async for line in read_lines(request):
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield number, None, f"Invalid JSON: {error}"
+                continue
+            if isinstance(record, dict):
+                yield number, record, None
+            else:
+                yield number, None, "Expected a JSON object"
+        return
+
+    header, buffered = None, ""
+    async for line in read_lines(request):
+        buffered = f"{buffered}\n{line}" if buffered else line
+        if buffered.count('"') % 2:
+            continue  # A quoted field continues on the next line
+        text, buffered = buffered, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        number += 1
+        if len(values) != len(header):
+            yield number, None, f"Expected {len(header)} fields, got {len(values)}"
+        else:
+            yield number, dict(zip(header, values)), None
+    if buffered:
+        yield number + 1, None, "Unterminated quoted field"
+
+
+def row_error(number, record, message):
+    return {"row": number, "Transaction_ID": (record or {}).get("Transaction_ID"), "error": message}
+
+
+async def read_batches(request, format, batch_size=BULK_BATCH_SIZE):
+    """
+    Streams the body in batches of `batch_size` rows, validated with schema.parse_transaction.
+
+    Yields (valid, errors): valid is [(row_number, transaction)], errors are row_error dicts.
+    """
+    valid, errors = [], []
+    async for number, record, error in read_records(request, format):
+        if error is None:
+            try:
+                valid.append((number, parse_transaction(record)))
+            except ValueError as invalid:
+                error = str(invalid)
+        if error is not None:
+            errors.append(row_error(number, record, error))
+        if len(valid) + len(errors) >= batch_size:
+            yield valid, errors
+            valid, errors = [], []
+    if valid or errors:
+        yield valid, errors
+
+
+def split_duplicates(valid, existing):
+    """Separates rows whose Transaction_ID is in `existing` or repeated earlier in the batch."""
+    fresh, errors, seen = [], [], set()
+    for number, transaction in valid:
+        transaction_id = transaction["Transaction_ID"]
+        if transaction_id in existing or transaction_id in seen:
+            errors.append(row_error(number, transaction, f"Transaction {transaction_id} already exists"))
+        else:
+            seen.add(transaction_id)
+            fresh.append((number, transaction))
+    return fresh, errors
+
+
+class BulkReport:
+    """Running totals for one bulk request; only the first MAX_REPORTED_ERRORS errors are listed."""
+
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def add(self, inserted, errors, received):
+        self.received += received
+        self.inserted += inserted
+        self.rejected += len(errors)
+        self.errors.extend(errors[:MAX_REPORTED_ERRORS - len(self.errors)])
+
+    def as_dict(self):
+        return {"received": self.received, "inserted": self.inserted, "rejected": self.rejected,
+                "errors": self.errors, "errors_truncated": self.rejected > len(self.errors)}
@@ -0,0 +1,148 @@
+import bisect
+import json
+import os
+import threading
+
+from snapshot import SNAPSHOT_DIR
+
+# Changes kept for clients to catch up on; a client further behind gets reset=True and reloads
+CHANGELOG_RETAIN = int(os.getenv("CHANGELOG_RETAIN", "10000"))
+
+
+class ChangeLog:
+    """
+    Ordered log of transaction adds, updates and deletes, shared by every worker on the host.
+
+    Entries are appended to an NDJSON file next to the snapshots (call append() inside
+    snapshots.writer(), before publishing), each with the next sequence number. Every worker
+    tails the file into memory, so since() only reads the bytes appended since its last call.
+
+    A "reset" entry marks a wholesale replacement of the data (a download from Firebase):
+    clients behind it can't catch up with deltas and must reload.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, retain=CHANGELOG_RETAIN):
+        self.path = os.path.join(directory, "changes.ndjson")
+        self.retain = retain
+        self._lock = threading.Lock()
+        self._entries = []   # Last `retain` entries, oldest first
+        self._seqs = []      # Their sequence numbers, for bisect
+        self._last_seq = 0
+        self._file = None    # (inode, bytes read, lines in the file)
+
+    def _catch_up(self):
+        """Reads entries appended (by any worker) since the last call. Call with self._lock held."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._entries, self._seqs, self._last_seq, self._file = [], [], 0, None
+            return
+        inode, offset, lines = self._file if self._file and self._file[0] == stat.st_ino else (stat.st_ino, 0, 0)
+        if offset == 0:
+            self._entries, self._seqs, self._last_seq = [], [], 0  # New or compacted file: start over
+        if stat.st_size > offset:
+            with open(self.path, "rb") as file:
+                file.seek(offset)
+                data = file.read(stat.st_size - offset)
+            complete = data[:data.rfind(b"\n") + 1]  # A line still being written is picked up next time
+            for line in complete.splitlines():
+                entry = json.loads(line)
+                self._entries.append(entry)
+                self._seqs.append(entry["seq"])
+                self._last_seq = entry["seq"]
+                lines += 1
+            offset += len(complete)
+            if len(self._entries) > self.retain:
+                del self._entries[:-self.retain], self._seqs[:-self.retain]
+        self._file = (inode, offset, lines)
+
+    def last_seq(self):
+        with self._lock:
+            self._catch_up()
+            return self._last_seq
+
+    def append(self, changes):
+        """Logs [(op, transaction_id, record)] changes (op is "add", "update" or "delete"); returns the last seq."""
+        with self._lock:
+            self._catch_up()
+            entries = []
+            for op, transaction_id, record in changes:
+                self._last_seq += 1
+                entries.append({"seq": self._last_seq, "op": op, "Transaction_ID": transaction_id, "record": record})
+            self._write(entries)
+            return self._last_seq
+
+    def reset(self):
+        """Logs that the whole dataset was replaced; returns its seq."""
+        return self.append([("reset", None, None)])
+
+    def _write(self, entries):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = "".join(json.dumps(entry, default=str) + "\n" for entry in entries).encode("utf-8")
+        lines = (self._file[2] if self._file else 0) + len(entries)
+        if lines > 2 * self.retain:
+            # Compact: keep only what clients can still catch up on, swapped in atomically
+            kept = b"".join(json.dumps(entry, default=str).encode("utf-8") + b"\n" for entry in self._entries)
+            staging = self.path + ".tmp"
+            with open(staging, "wb") as file:
+                file.write(kept + data)
+            os.replace(staging, self.path)
+        else:
+            with open(self.path, "ab") as file:
+                file.write(data)  # One write per batch, so other workers never see half a batch's lines
+        self._catch_up()
+
+    def since(self, seq, limit):
+        """
+        Changes after `seq` (at most `limit`): {"seq", "reset", "changes", "has_more"}.
+
+        reset=True means the client can't catch up from `seq` (it's ahead of the log, too far
+        behind, or the data was replaced since) and should reload everything, then continue from "seq".
+        """
+        with self._lock:
+            self._catch_up()
+            last = self._last_seq
+            first = self._seqs[0] if self._seqs else last + 1
+            if seq > last or seq < first - 1:
+                return {"seq": last, "reset": True, "changes": [], "has_more": False}
+            pending = self._entries[bisect.bisect_right(self._seqs, seq):]
+        if any(entry["op"] == "reset" for entry in pending):
+            return {"seq": last, "reset": True, "changes": [], "has_more": False}
+        changes = pending[:limit]
+        return {"seq": changes[-1]["seq"] if changes else seq, "reset": False, "changes": changes,
+                "has_more": len(pending) > limit}
+
+
+def replay(transactions, entries):
+    """
+    Applies add/update/delete entries to a ColumnarTransactions (e.g. a snapshot that is behind the log).
+    Returns [(entry, previous record or None)] so callers can move their derived totals along.
+    """
+    applied, adds = [], {}  # Runs of new rows go in as one extend()
+
+    def flush():
+        if adds:
+            transactions.extend([entry["record"] for entry in adds.values()])
+            applied.extend((entry, None) for entry in adds.values())
+            adds.clear()
+
+    for entry in entries:
+        if entry["op"] not in ("add", "update", "delete"):
+            continue
+        transaction_id = entry["Transaction_ID"]
+        if transaction_id in adds:
+            flush()
+        previous = transactions.get(transaction_id)
+        if entry["op"] != "delete" and previous is None:
+            adds[transaction_id] = entry
+            continue
+        flush()
+        if entry["op"] == "delete":
+            if previous is None:
+                continue
+            transactions.remove(transaction_id)
+        else:
+            transactions.add(entry["record"])
+        applied.append((entry, previous))
+    flush()
+    return applied
@@ -0,0 +1,31 @@
+import json
+import os
+
+# Resume points for the CSV loaders: how many data rows of a given file are already safely written.
+
+
+def read_checkpoint(path, csv_file):
+    """Returns how many data rows of csv_file were already committed (0 if the file changed or no checkpoint)."""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    stat = os.stat(csv_file)
+    if checkpoint.get("size") != stat.st_size or checkpoint.get("mtime") != stat.st_mtime:
+        print("⚠️ CSV changed since the last checkpoint, starting from the beginning.")
+        return 0
+    return checkpoint["rows_done"]
+
+
+def write_checkpoint(path, csv_file, rows_done):
+    stat = os.stat(csv_file)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"file": os.path.abspath(csv_file), "size": stat.st_size, "mtime": stat.st_mtime,
+                   "rows_done": rows_done}, f)
+    os.replace(tmp_path, path)  # Atomic, so a crash never leaves a half-written checkpoint
+
+
+def clear_checkpoint(path):
+    if path and os.path.exists(path):
+        os.remove(path)
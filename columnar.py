@@ -0,0 +1,664 @@
+import bisect
+import functools
+import hashlib
+import heapq
+import itertools
+import math
+import threading
+
+import numpy as np
+
+from schema import AMOUNT_COLUMNS, DIMENSION_COLUMNS, TRANSACTION_COLUMNS
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+# Extra sort orders kept for exception queries: name -> (group columns, ranked value).
+# Rows are ordered by (group codes, value, Transaction_ID), so each group is one contiguous range.
+RANKINGS = {
+    "remaining": (("Subsidiary", "Sector"), "Remaining_Budget"),
+    "spent": (("Subsidiary", "Sector"), "Spent_Amount"),
+    "utilization": (("Subsidiary", "Sector"), "utilization"),
+    "user_spent": (("User_ID",), "Spent_Amount"),
+}
+
+# New rows are indexed in small `_recent_*` arrays first; past this many they are merged into the main indexes
+OVERFLOW_ROWS = 1024
+
+
+class Dictionary:
+    """Dictionary encoding for one categorical column: each distinct value is stored once, rows hold int32 codes."""
+
+    def __init__(self):
+        self.values = []   # code -> value
+        self._codes = {}   # value -> code
+
+    def encode(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode_many(self, values):
+        return np.fromiter((self.encode(value) for value in values), dtype=np.int32, count=len(values))
+
+    def code_of(self, value):
+        """Existing code for `value`, or None if no row has ever held it."""
+        return self._codes.get(value)
+
+
+def to_day(value):
+    """'YYYY-MM-DD' (or a date) -> int32 days since 1970-01-01."""
+    return int((np.datetime64(str(value)[:10], "D") - EPOCH).astype(np.int32))
+
+
+def merge_sorted(index, rows, key):
+    """Row numbers `index` with `rows` merged in, both already sorted by `key`: one np.insert, one copy."""
+    return np.insert(index, [bisect.bisect_left(index, key(row), key=key) for row in rows], rows).astype(np.int32)
+
+
+def from_day(day):
+    return str(EPOCH + np.timedelta64(int(day), "D"))
+
+
+def utilization(spent, allocated):
+    """Spent / allocated; inf for spending without an allocation, 0 when both are 0. Works on floats or arrays."""
+    if np.ndim(spent) == 0:
+        return spent / allocated if allocated else (math.inf if spent > 0 else 0.0)
+    ratio = np.divide(spent, allocated, out=np.zeros(len(spent)), where=allocated != 0)
+    ratio[(allocated == 0) & (spent > 0)] = np.inf
+    return ratio
+
+
+def bucket_days(days, bucket):
+    """Maps day numbers to the first day of their day/week (Monday)/month/year bucket."""
+    if bucket == "day":
+        return days
+    if bucket == "week":
+        return days - (days + 3) % 7  # 1970-01-01 was a Thursday
+    unit = "M" if bucket == "month" else "Y"
+    return ((EPOCH + days).astype(f"datetime64[{unit}]").astype("datetime64[D]") - EPOCH).astype(np.int32)
+
+
+class ColumnarTransactions:
+    """
+    In-process transactions stored column by column instead of as one dict per row.
+
+    - Subsidiary, Sector, User_ID and Transaction_Type are dictionary-encoded int32 codes
+    - the four amounts are float64 arrays and Date is an int32 day number
+    - Transaction_ID is a fixed-width bytes column, looked up through `_by_id` (rows sorted by ID)
+      instead of a per-row Python dict
+    - rows are appended (arrays grow by doubling) and deleted by tombstone; dead rows
+      are compacted away once they make up a quarter of the store
+    - `_order` keeps row numbers in (Date, Transaction_ID) order for keyset pagination,
+      and `_ranks` one sort order per RANKINGS entry for top-K exception queries
+    - single writes never copy those indexes: new rows go into the small sorted `_recent_*` overflow
+      (merged in every OVERFLOW_ROWS rows), and deleted rows stay in the main indexes, skipped as tombstones
+
+    Dict records are only built, a batch at a time, for the rows a request actually returns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset(0)
+
+    def _reset(self, capacity):
+        self._size = 0   # Rows used, live or dead
+        self._dead = 0
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._ids = np.zeros(capacity, dtype="S1")
+        self._days = np.zeros(capacity, dtype=np.int32)
+        self._codes = {column: np.zeros(capacity, dtype=np.int32) for column in DIMENSION_COLUMNS}
+        self._amounts = {column: np.zeros(capacity, dtype=np.float64) for column in AMOUNT_COLUMNS}
+        self._dictionaries = {column: Dictionary() for column in DIMENSION_COLUMNS}
+        self._by_id = np.zeros(0, dtype=np.int32)   # Rows sorted by Transaction_ID
+        self._order = np.zeros(0, dtype=np.int32)   # Rows sorted by (Date, Transaction_ID)
+        self._ranks = {name: np.zeros(0, dtype=np.int32) for name in RANKINGS}  # Rows in each ranking's order
+        self._reset_recent()
+
+    def _reset_recent(self):
+        """Empties the overflow: every row below `_indexed` is in the main indexes, later live rows only here."""
+        self._indexed = self._size
+        self._recent_by_id = np.zeros(0, dtype=np.int32)
+        self._recent_order = np.zeros(0, dtype=np.int32)
+        self._recent_ranks = {name: np.zeros(0, dtype=np.int32) for name in RANKINGS}
+
+    # 🔹 Loading and writes
+
+    def load(self, records):
+        """Rebuilds the store from an iterable of transaction dicts (the last copy of a Transaction_ID wins)."""
+        latest = {}
+        for record in records:
+            if isinstance(record, dict):
+                latest[str(record.get("Transaction_ID"))] = record
+        rows = list(latest.values())
+
+        with self._lock:
+            self._reset(len(rows))
+            self._size = len(rows)
+            self._alive[:] = True
+            self._ids = np.array([tid.encode("utf-8") for tid in latest], dtype="S") if rows else self._ids
+            dates = np.array([str(record.get("Date"))[:10] for record in rows], dtype="datetime64[D]")
+            self._days[:] = (dates - EPOCH).astype(np.int32)
+            for column in DIMENSION_COLUMNS:
+                self._codes[column][:] = self._dictionaries[column].encode_many([record.get(column) for record in rows])
+            for column in AMOUNT_COLUMNS:
+                self._amounts[column][:] = [record.get(column) or 0 for record in rows]
+            self._by_id = np.argsort(self._ids, kind="stable").astype(np.int32)
+            self._order = np.lexsort((self._ids, self._days)).astype(np.int32)
+            self._ranks = {name: self._rank_rows(name, self._by_id) for name in RANKINGS}
+            self._indexed = self._size
+
+    def __len__(self):
+        return self._size - self._dead
+
+    def __contains__(self, transaction_id):
+        with self._lock:
+            return self._find(transaction_id) is not None
+
+    def get(self, transaction_id):
+        with self._lock:
+            row = self._find(transaction_id)
+            return None if row is None else self._records([row])[0]
+
+    def add(self, record):
+        """Appends a transaction, replacing any previous row with the same Transaction_ID."""
+        key = str(record.get("Transaction_ID")).encode("utf-8")
+        with self._lock:
+            self._remove(record.get("Transaction_ID"))
+            self._grow(self._size + 1)
+            if len(key) > self._ids.dtype.itemsize:
+                self._ids = self._ids.astype(f"S{len(key)}")
+
+            row = self._size
+            self._size += 1
+            self._alive[row] = True
+            self._ids[row] = key
+            self._days[row] = to_day(record.get("Date"))
+            for column in DIMENSION_COLUMNS:
+                self._codes[column][row] = self._dictionaries[column].encode(record.get(column))
+            for column in AMOUNT_COLUMNS:
+                self._amounts[column][row] = record.get(column) or 0
+            self._index(np.array([row], dtype=np.int32))
+
+    def extend(self, records):
+        """
+        Appends a batch of transactions (replacing earlier rows with the same Transaction_ID).
+
+        The batch is sorted once and merged into each overflow index with a single np.insert,
+        instead of shifting the indexes once per row.
+        """
+        records = list({str(record.get("Transaction_ID")): record for record in records}.values())
+        if not records:
+            return
+        keys = [str(record.get("Transaction_ID")).encode("utf-8") for record in records]
+        with self._lock:
+            for record in records:
+                self._remove(record.get("Transaction_ID"))
+            self._grow(self._size + len(records))
+            width = max(len(key) for key in keys)
+            if width > self._ids.dtype.itemsize:
+                self._ids = self._ids.astype(f"S{width}")
+
+            rows = np.arange(self._size, self._size + len(records), dtype=np.int32)
+            self._size += len(records)
+            self._alive[rows] = True
+            self._ids[rows] = keys
+            self._days[rows] = [to_day(record.get("Date")) for record in records]
+            for column in DIMENSION_COLUMNS:
+                self._codes[column][rows] = self._dictionaries[column].encode_many([r.get(column) for r in records])
+            for column in AMOUNT_COLUMNS:
+                self._amounts[column][rows] = [record.get(column) or 0 for record in records]
+            self._index(rows)
+
+    def remove(self, transaction_id):
+        """Tombstones a transaction and returns it as a dict (None if unknown)."""
+        with self._lock:
+            return self._remove(transaction_id)
+
+    def _remove(self, transaction_id):
+        row = self._find(transaction_id)
+        if row is None:
+            return None
+
+        record = self._records([row])[0]
+        self._alive[row] = False
+        self._dead += 1
+        if row >= self._indexed:  # Main index entries just become tombstones; overflow entries are cheap to drop
+            position = bisect.bisect_left(self._recent_by_id, self._ids[row], key=self._ids.__getitem__)
+            self._recent_by_id = np.delete(self._recent_by_id, position)
+            position = bisect.bisect_left(self._recent_order, self._sort_key(row), key=self._sort_key)
+            self._recent_order = np.delete(self._recent_order, position)
+            for name, recent in self._recent_ranks.items():
+                key = functools.partial(self._rank_key, name)
+                self._recent_ranks[name] = np.delete(recent, bisect.bisect_left(recent, key(row), key=key))
+
+        if self._dead >= max(1024, self._size // 4):
+            self._compact()
+        return record
+
+    def _find(self, transaction_id):
+        """Live row holding a Transaction_ID, or None when it is not stored."""
+        key = str(transaction_id).encode("utf-8")
+        for index in (self._recent_by_id, self._by_id):
+            position = bisect.bisect_left(index, key, key=self._ids.__getitem__)
+            if position < len(index) and self._ids[index[position]] == key and self._alive[index[position]]:
+                return int(index[position])
+        return None
+
+    def _index(self, rows):
+        """Adds new `rows` to the overflow indexes, merging them into the main ones once OVERFLOW_ROWS pile up."""
+        by_id = rows[np.argsort(self._ids[rows], kind="stable")]
+        self._recent_by_id = merge_sorted(self._recent_by_id, by_id, self._ids.__getitem__)
+        by_date = rows[np.lexsort((self._ids[rows], self._days[rows]))]
+        self._recent_order = merge_sorted(self._recent_order, by_date, self._sort_key)
+        for name, recent in self._recent_ranks.items():
+            key = functools.partial(self._rank_key, name)
+            self._recent_ranks[name] = merge_sorted(recent, self._rank_rows(name, by_id), key)
+        if len(self._recent_by_id) >= OVERFLOW_ROWS:
+            self._merge()
+
+    def _merge(self):
+        """Folds the overflow into the main indexes and drops their tombstones: one copy of each index."""
+        live = self._alive
+        self._by_id = merge_sorted(self._by_id[live[self._by_id]], self._recent_by_id, self._ids.__getitem__)
+        self._order = merge_sorted(self._order[live[self._order]], self._recent_order, self._sort_key)
+        self._ranks = {name: merge_sorted(rank[live[rank]], self._recent_ranks[name],
+                                          functools.partial(self._rank_key, name))
+                       for name, rank in self._ranks.items()}
+        self._reset_recent()
+
+    def _grow(self, needed):
+        capacity = len(self._alive)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+        self._alive = np.resize(self._alive, capacity)
+        self._alive[self._size:] = False
+        self._ids = np.resize(self._ids, capacity)
+        self._days = np.resize(self._days, capacity)
+        self._codes = {column: np.resize(codes, capacity) for column, codes in self._codes.items()}
+        self._amounts = {column: np.resize(values, capacity) for column, values in self._amounts.items()}
+
+    def _compact(self):
+        """Drops tombstoned rows and renumbers the survivors (every sort order is preserved)."""
+        self._merge()
+        live = np.flatnonzero(self._alive[:self._size])
+        new_row = np.full(self._size, -1, dtype=np.int32)
+        new_row[live] = np.arange(len(live), dtype=np.int32)
+
+        self._alive = np.ones(len(live), dtype=bool)
+        self._ids = self._ids[live]
+        self._days = self._days[live]
+        self._codes = {column: codes[live] for column, codes in self._codes.items()}
+        self._amounts = {column: values[live] for column, values in self._amounts.items()}
+        self._by_id = new_row[self._by_id]
+        self._order = new_row[self._order]
+        self._ranks = {name: new_row[rank] for name, rank in self._ranks.items()}
+        self._size, self._dead = len(live), 0
+        self._indexed = self._size
+
+    # 🔹 Snapshots (see snapshot.py)
+
+    def export(self):
+        """Live rows as plain arrays (tombstones dropped, every index kept) plus each column's dictionary values."""
+        with self._lock:
+            self._merge()
+            live = np.flatnonzero(self._alive[:self._size])
+            new_row = np.full(self._size, -1, dtype=np.int32)
+            new_row[live] = np.arange(len(live), dtype=np.int32)
+            arrays = {
+                "alive": np.ones(len(live), dtype=bool),
+                "ids": self._ids[live],
+                "days": self._days[live],
+                "by_id": new_row[self._by_id],
+                "order": new_row[self._order],
+                **{f"rank_{name}": new_row[rank] for name, rank in self._ranks.items()},
+                **{f"code_{column}": codes[live] for column, codes in self._codes.items()},
+                **{f"amount_{column}": values[live] for column, values in self._amounts.items()},
+            }
+            return arrays, {column: list(dictionary.values) for column, dictionary in self._dictionaries.items()}
+
+    def fingerprint(self):
+        """Digest of the live rows in Transaction_ID order, independent of row numbering and encoding order."""
+        with self._lock:
+            rows = merge_sorted(self._by_id[self._alive[self._by_id]], self._recent_by_id, self._ids.__getitem__)
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(b"\0".join(self._ids[rows].tolist()))
+            digest.update(self._days[rows].tobytes())
+            for column, codes in self._codes.items():
+                values = self._dictionaries[column].values
+                digest.update("\0".join(str(values[code]) for code in codes[rows].tolist()).encode("utf-8"))
+            for column, amounts in self._amounts.items():
+                digest.update(amounts[rows].tobytes())
+            return digest.hexdigest()
+
+    def attach(self, arrays, dictionaries):
+        """Switches to arrays from SnapshotStore.open(): nothing is copied until this process writes to them."""
+        with self._lock:
+            self._size, self._dead = len(arrays["ids"]), 0
+            self._alive = arrays["alive"]
+            self._ids = arrays["ids"]
+            self._days = arrays["days"]
+            self._by_id = arrays["by_id"]
+            self._order = arrays["order"]
+            self._codes = {column: arrays[f"code_{column}"] for column in DIMENSION_COLUMNS}
+            self._amounts = {column: arrays[f"amount_{column}"] for column in AMOUNT_COLUMNS}
+            self._dictionaries = {column: Dictionary() for column in DIMENSION_COLUMNS}
+            for column, values in dictionaries.items():
+                for value in values:
+                    self._dictionaries[column].encode(value)
+            # Snapshots published before the rankings existed get them built once here
+            self._ranks = {name: arrays[f"rank_{name}"] if f"rank_{name}" in arrays else
+                           self._rank_rows(name, self._by_id) for name in RANKINGS}
+            self._reset_recent()
+
+    # 🔹 Reads
+
+    def _sort_key(self, row):
+        return int(self._days[row]), self._ids[row]
+
+    def _rank_values(self, name, rows):
+        value = RANKINGS[name][1]
+        if value == "utilization":
+            return utilization(self._amounts["Spent_Amount"][rows], self._amounts["Allocated_Budget"][rows])
+        return self._amounts[value][rows]
+
+    def _rank_key(self, name, row):
+        columns, value = RANKINGS[name]
+        if value == "utilization":
+            amount = utilization(float(self._amounts["Spent_Amount"][row]), float(self._amounts["Allocated_Budget"][row]))
+        else:
+            amount = float(self._amounts[value][row])
+        return (*(int(self._codes[column][row]) for column in columns), amount, self._ids[row])
+
+    def _rank_rows(self, name, rows):
+        """`rows` (in Transaction_ID order) sorted into ranking `name`'s order: stable sorts by value, then group."""
+        columns = RANKINGS[name][0]
+        rows = rows[np.argsort(self._rank_values(name, rows), kind="stable")]
+        group = np.zeros(len(rows), dtype=np.int64)
+        for column in columns:
+            group = group * max(len(self._dictionaries[column].values), 1) + self._codes[column][rows]
+        return rows[np.argsort(group, kind="stable")].astype(np.int32)
+
+    def ranked(self, name, equals=None, limit=10, largest=False, minimum=None, maximum=None):
+        """
+        Up to `limit` records in ranking `name` order (smallest value first, largest first with largest=True),
+        within the groups matching `equals` ({group column: value}) and with values in [minimum, maximum].
+
+        Each matching group is a contiguous range of the ranking (and of its overflow) found by binary search,
+        and the ranges are merged lazily: O(G log n + limit log G) for G groups, without scanning the rows.
+        Records of the utilization ranking get a "utilization" field.
+        """
+        columns, value = RANKINGS[name]
+        equals = equals or {}
+        with self._lock:
+            key = functools.partial(self._rank_key, name)
+            candidates = []
+            for column in columns:
+                if equals.get(column) is None:
+                    candidates.append(range(len(self._dictionaries[column].values)))
+                    continue
+                code = self._dictionaries[column].code_of(equals[column])
+                if code is None:
+                    return []
+                candidates.append([code])
+
+            ranges = []
+            for codes, rank in itertools.product(itertools.product(*candidates),
+                                                 (self._ranks[name], self._recent_ranks[name])):
+                # A key prefix sorts before every row of its group; (codes, value) before rows with that value
+                start = bisect.bisect_left(rank, codes if minimum is None else (*codes, minimum), key=key)
+                end = bisect.bisect_left(rank, (*codes[:-1], codes[-1] + 1) if maximum is None else
+                                         (*codes, math.nextafter(maximum, math.inf)), key=key)
+                if start < end:
+                    ranges.append((rank, range(end - 1, start - 1, -1) if largest else range(start, end)))
+
+            def walk(rank, positions):
+                for position in positions:
+                    row = int(rank[position])
+                    if self._alive[row]:  # Deleted rows stay in the main ranking until the next merge
+                        yield key(row)[-2:], row  # (value, Transaction_ID) orders rows across groups
+
+            walks = itertools.starmap(walk, ranges)
+            rows = [row for _, row in itertools.islice(heapq.merge(*walks, reverse=largest), limit)]
+            records = self._records(rows)
+            if value == "utilization":
+                for record, ratio in zip(records, self._rank_values(name, np.asarray(rows, dtype=np.int64)).tolist()):
+                    record["utilization"] = round(ratio, 4) if math.isfinite(ratio) else None
+            return records
+
+    def _records(self, rows):
+        """Decodes a batch of rows into transaction dicts, column by column."""
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = {
+            "Transaction_ID": [key.decode("utf-8") for key in self._ids[rows].tolist()],
+            "Date": (EPOCH + self._days[rows]).astype(str).tolist(),
+        }
+        for column, codes in self._codes.items():
+            values = self._dictionaries[column].values
+            columns[column] = [values[code] for code in codes[rows].tolist()]
+        for column, amounts in self._amounts.items():
+            columns[column] = amounts[rows].tolist()
+        return [dict(zip(TRANSACTION_COLUMNS, values)) for values in zip(*(columns[c] for c in TRANSACTION_COLUMNS))]
+
+    def _mask(self, filters, rows):
+        """Vectorized TransactionFilter.matches over an array of row numbers."""
+        mask = np.ones(len(rows), dtype=bool)
+        if filters.date_from:
+            mask &= self._days[rows] >= to_day(filters.date_from)
+        if filters.date_to:
+            mask &= self._days[rows] <= to_day(filters.date_to)
+        for column, value in filters.equals.items():
+            code = self._dictionaries[column].code_of(value)
+            if code is None:
+                return np.zeros(len(rows), dtype=bool)
+            mask &= self._codes[column][rows] == code
+        for column, (low, high) in filters.ranges.items():
+            if low is not None:
+                mask &= self._amounts[column][rows] >= low
+            if high is not None:
+                mask &= self._amounts[column][rows] <= high
+        return mask
+
+    def _start(self, order, after, date_from):
+        """Position in `order` of the first row after the cursor key (and on or after date_from)."""
+        start = 0
+        if after:
+            cursor_key = (to_day(after[0]), str(after[1]).encode("utf-8"))
+            start = bisect.bisect_right(order, cursor_key, key=self._sort_key)
+        if date_from:
+            start = max(start, bisect.bisect_left(order, (to_day(date_from), b""), key=self._sort_key))
+        return start
+
+    def _next_rows(self, after, date_from, batch):
+        """The next `batch` rows of `_order` and its overflow, merged, after the cursor key (tombstones included)."""
+        rows = np.concatenate([order[self._start(order, after, date_from):][:batch]
+                               for order in (self._order, self._recent_order)])
+        return rows[np.lexsort((self._ids[rows], self._days[rows]))][:batch]
+
+    def _scan(self, filters, after, batch, decode):
+        """
+        Yields decode(matching row numbers) for successive batches in (Date, Transaction_ID) order after the `after` key.
+
+        The lock is only held while filtering and decoding the next `batch` rows, so long exports don't block writers.
+        """
+        position = None
+        while True:
+            with self._lock:
+                rows = self._next_rows(position or after, filters.date_from, batch)
+                if not len(rows):
+                    return
+                if filters.date_to and self._days[rows[0]] > to_day(filters.date_to):
+                    return  # Rows are date-ordered, nothing later can match
+                live = rows[self._alive[rows]]
+                decoded = decode(live[self._mask(filters, live)])
+                position = (from_day(self._days[rows[-1]]), self._ids[rows[-1]].decode("utf-8"))
+            yield decoded
+
+    def scan(self, filters, after=None, batch=1000):
+        """Yields matching records in (Date, Transaction_ID) order, starting after the `after` key."""
+        for records in self._scan(filters, after, batch, self._records):
+            yield from records
+
+    def page(self, filters, after=None, limit=1000):
+        """Returns up to limit + 1 matching rows after the cursor key (the extra row signals a next page)."""
+        rows = []
+        for record in self.scan(filters, after, batch=limit + 1):
+            rows.append(record)
+            if len(rows) > limit:
+                break
+        return rows
+
+    def stream(self, filters, after=None):
+        yield from self.scan(filters, after)
+
+    def _arrow_batch(self, rows):
+        """Row numbers as a pyarrow RecordBatch built from the column arrays (dimensions stay dictionary-encoded)."""
+        import pyarrow as pa
+
+        arrays = {
+            "Transaction_ID": pa.array(self._ids[rows], pa.binary()).cast(pa.string()),
+            "Date": pa.array(self._days[rows].astype(np.int32), pa.int32()).cast(pa.date32()),  # EPOCH is 1970-01-01
+        }
+        for column, codes in self._codes.items():
+            values = self._dictionaries[column].values
+            indices = codes[rows].astype(np.int32)
+            missing = self._dictionaries[column].code_of(None)
+            arrays[column] = pa.DictionaryArray.from_arrays(
+                pa.array(indices, mask=None if missing is None else indices == missing),
+                pa.array(["" if value is None else value for value in values], pa.string()))
+        for column, amounts in self._amounts.items():
+            arrays[column] = pa.array(amounts[rows])
+        return pa.RecordBatch.from_arrays([arrays[column] for column in TRANSACTION_COLUMNS], TRANSACTION_COLUMNS)
+
+    def page_table(self, filters, after=None, limit=1000):
+        """page() as a pyarrow Table: no per-row dicts are built, so large pages serialize to Arrow/Parquet cheaply."""
+        import pyarrow as pa
+
+        batches, count = [], 0
+        for batch in self._scan(filters, after, limit + 1, self._arrow_batch):
+            batches.append(batch)
+            count += batch.num_rows
+            if count > limit:
+                break
+        if not batches:
+            return pa.Table.from_batches([self._arrow_batch(np.zeros(0, dtype=np.int64))])
+        # Dictionaries can grow between batches; unify them so the table has one dictionary per column
+        return pa.Table.from_batches(batches).unify_dictionaries().combine_chunks().slice(0, limit + 1)
+
+    def table_batches(self, filters, batch=100_000):
+        """Matching rows as pyarrow RecordBatches in (Date, Transaction_ID) order: scan() without per-row dicts."""
+        return self._scan(filters, None, batch, self._arrow_batch)
+
+    def group_totals(self, dimensions=("Subsidiary", "Sector")):
+        """
+        {(value, ...): {"count": n, <amount column>: sum, ...}} over live rows, grouped by categorical columns.
+
+        Each group-by is one np.unique over the combined codes plus one bincount per amount column.
+        """
+        with self._lock:
+            live = self._alive[:self._size]
+            key = np.zeros(int(live.sum()), dtype=np.int64)
+            for column in dimensions:
+                key = key * max(len(self._dictionaries[column].values), 1) + self._codes[column][:self._size][live]
+            groups, inverse = np.unique(key, return_inverse=True)
+            counts = np.bincount(inverse, minlength=len(groups))
+            sums = {column: np.bincount(inverse, weights=values[:self._size][live], minlength=len(groups))
+                    for column, values in self._amounts.items()}
+
+            totals = {}
+            for index, combined in enumerate(groups.tolist()):
+                labels = []
+                for column in reversed(dimensions):
+                    combined, code = divmod(combined, max(len(self._dictionaries[column].values), 1))
+                    labels.append(self._dictionaries[column].values[code])
+                totals[tuple(reversed(labels))] = {
+                    "count": int(counts[index]), **{column: float(sums[column][index]) for column in sums}}
+            return totals
+
+    def aggregate(self, dimensions, measures, filters=None):
+        """
+        Vectorized GROUP BY for /budget/query.
+
+        `dimensions` are categorical columns or one of day/week/month/year; `measures` are
+        (aggregate, column, other) tuples as parsed by query.parse_measures. Returns one dict per group.
+        """
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            if filters is not None:
+                rows = rows[self._mask(filters, rows)]
+
+            # Densify each dimension, then combine them into a single mixed-radix group number
+            levels, combined = [], np.zeros(len(rows), dtype=np.int64)
+            for dimension in dimensions:
+                values = self._codes[dimension][rows] if dimension in self._codes else \
+                    bucket_days(self._days[rows], dimension)
+                unique, inverse = np.unique(values, return_inverse=True)
+                levels.append(unique)
+                combined = combined * len(unique) + inverse.reshape(-1)
+            groups, inverse = np.unique(combined, return_inverse=True)
+            inverse = inverse.reshape(-1)
+
+            counts = np.bincount(inverse, minlength=len(groups))
+            sums, extremes = {}, {}
+            for aggregate, column, other in measures:
+                for name in (column, other):
+                    if name and aggregate in ("sum", "avg", "ratio") and name not in sums:
+                        sums[name] = np.bincount(inverse, weights=self._amounts[name][rows], minlength=len(groups))
+                if aggregate in ("min", "max") and (aggregate, column) not in extremes:
+                    by_group = np.argsort(inverse, kind="stable")
+                    starts = np.concatenate(([0], np.flatnonzero(np.diff(inverse[by_group])) + 1)) if len(rows) else []
+                    reduce = np.minimum if aggregate == "min" else np.maximum
+                    extremes[(aggregate, column)] = reduce.reduceat(self._amounts[column][rows][by_group], starts) \
+                        if len(rows) else np.zeros(0)
+
+            results = []
+            for index, number in enumerate(groups.tolist()):
+                labels = []
+                for dimension, unique in zip(reversed(dimensions), reversed(levels)):
+                    number, position = divmod(number, len(unique))
+                    value = unique[position]
+                    labels.append(self._dictionaries[dimension].values[value] if dimension in self._dictionaries
+                                  else from_day(value))
+                result = dict(zip(dimensions, reversed(labels)))
+                for aggregate, column, other in measures:
+                    if aggregate == "count":
+                        value = int(counts[index])
+                    elif aggregate == "sum":
+                        value = float(sums[column][index])
+                    elif aggregate == "avg":
+                        value = float(sums[column][index] / counts[index])
+                    elif aggregate == "ratio":
+                        value = float(sums[column][index] / sums[other][index]) if sums[other][index] else None
+                    else:
+                        value = float(extremes[(aggregate, column)][index])
+                    result["_".join(part for part in (aggregate, column, other) if part)] = value
+                results.append(result)
+
+        # Same order as SQL's ORDER BY on the dimensions (missing values first)
+        results.sort(key=lambda result: tuple((result[d] is not None, result[d]) for d in dimensions))
+        return results
+
+    def to_frame(self):
+        """Live rows as a pandas DataFrame with categorical dimension columns (codes are reused, not re-encoded)."""
+        import pandas as pd
+
+        with self._lock:
+            live = self._alive[:self._size]
+            rows = np.flatnonzero(live)
+            columns = {
+                "Transaction_ID": np.char.decode(self._ids[rows], "utf-8"),
+                "Date": EPOCH + self._days[:self._size][live].astype("timedelta64[D]"),
+            }
+            for column in DIMENSION_COLUMNS:
+                dictionary = self._dictionaries[column]
+                codes = self._codes[column][:self._size][live]
+                missing = dictionary.code_of(None)
+                if missing is not None:  # pandas keeps missing values as code -1, not as a category
+                    codes = np.where(codes == missing, -1, codes - (codes > missing))
+                columns[column] = pd.Categorical.from_codes(
+                    codes, categories=[value for value in dictionary.values if value is not None])
+            for column in AMOUNT_COLUMNS:
+                columns[column] = self._amounts[column][:self._size][live]
+        return pd.DataFrame(columns)[TRANSACTION_COLUMNS]
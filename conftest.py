@@ -0,0 +1,12 @@
+import os
+import tempfile
+
+# Tests run against local stand-ins: a SQLite file for the SQL API, fake_firebase for Firebase,
+# and throwaway snapshot/report directories (set before any app module reads them at import).
+_scratch = tempfile.mkdtemp(prefix="budget-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'budget.db')}")
+os.environ.setdefault("SNAPSHOT_DIR", os.path.join(_scratch, "snapshot"))
+os.environ.setdefault("REPORT_DIR", os.path.join(_scratch, "reports"))
+
+# Manual scripts that connect to the real MySQL host / Firebase project when imported
+collect_ignore = ["test_db.py", "fetch_data_test.py"]
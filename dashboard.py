@@ -1,6 +1,10 @@
+import threading
+from collections import OrderedDict
+
 import streamlit as st
 import requests
 import pandas as pd
+import pyarrow as pa
 import matplotlib.pyplot as plt
 
 # Backend API URL
@@ -22,45 +26,210 @@ is_admin = role == "admin"
 SUBSIDIARY_OPTIONS = ["Branch A", "Branch B", "Branch C"]
 SECTOR_OPTIONS = ["R&D", "Marketing", "HR", "Operations", "IT"]
 
-# Fetch Budget Summary
-st.subheader("Total Budget Overview")
-response = requests.get(f"{BASE_URL}/budget/summary")
-if response.status_code == 200:
-    budget_data = pd.DataFrame(response.json())
-    st.dataframe(budget_data)
-else:
-    st.error("Failed to load budget summary!")
+TRANSACTION_COLUMNS = ["Transaction_ID", "Date", "Subsidiary", "Sector", "User_ID", "Allocated_Budget", "Spent_Amount",
+                       "Remaining_Budget", "Revenue_Generated", "Transaction_Type"]
+TOTALS = {"Allocated_Budget": "total_allocated", "Spent_Amount": "total_spent", "Remaining_Budget": "total_remaining"}
+PAGE_SIZE = 1000
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# 🔹 One pooled HTTP session per Streamlit server: keep-alive connections are reused across reruns
+@st.cache_resource
+def get_session():
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+session = get_session()
+
+
+# 🔹 Client-side HTTP cache keyed by URL: unchanged data comes back as an empty 304 and the parsed DataFrames are reused
+class ResponseCache:
+    def __init__(self, max_entries=64):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # URL -> (ETag, parsed result), least recently used first
+        self.max_entries = max_entries
+
+    def get(self, url, params=None, parse=lambda data: data):
+        """GETs url with If-None-Match; returns parse(json), or the cached result when the server answers 304."""
+        url = requests.Request("GET", url, params=params).prepare().url
+        with self._lock:
+            cached = self._entries.get(url)
+
+        response = session.get(url, headers={"If-None-Match": cached[0]} if cached else {})
+        if response.status_code == 304 and cached:
+            with self._lock:
+                self._entries[url] = cached
+                self._entries.move_to_end(url)
+            return cached[1]
+        if response.status_code != 200:
+            return None
+
+        result = parse(response.json())
+        if "ETag" in response.headers:
+            with self._lock:
+                self._entries[url] = (response.headers["ETag"], result)
+                self._entries.move_to_end(url)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+
+# 🔹 Local copy of every transaction: loaded once per session, then kept current with /transactions/changes deltas
+def indexed(frame):
+    frame.index = frame["Transaction_ID"].to_numpy()  # Indexed by ID so deltas can drop rows directly
+    return frame
+
+
+def transaction_frame(records):
+    frame = pd.DataFrame(records, columns=TRANSACTION_COLUMNS)
+    frame["Date"] = pd.to_datetime(frame["Date"])  # Same dtype as the Arrow date column
+    return indexed(frame)
+
+
+def read_arrow(response):
+    """Arrow IPC body to a DataFrame: amount columns are wrapped as-is, dictionary columns become categoricals."""
+    table = pa.ipc.open_stream(response.content).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=True, date_as_object=False)
+
+
+def load_transactions():
+    """Full download in Arrow pages, used for a new session or when the server says deltas can't catch us up."""
+    head = session.get(f"{BASE_URL}/transactions/changes")  # Its seq is read before the data, so no change is missed
+    if head.status_code != 200:
+        return None
+    frames, params = [], {"limit": 10000}
+    while True:
+        response = session.get(f"{BASE_URL}/transactions", params=params, headers={"Accept": ARROW_STREAM})
+        if response.status_code == 404 and "cursor" not in params:
+            break  # No transactions yet
+        if response.status_code != 200:
+            return None
+        frames.append(read_arrow(response))
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    frame = indexed(pd.concat(frames)) if frames else transaction_frame([])
+    return {"lineage": head.json()["lineage"], "seq": head.json()["seq"], **derived_frames(frame)}
 
 
+def derived_frames(frame):
+    """Sorted history (same order as the API's pages) and per-(Subsidiary, Sector) totals, rebuilt only on change."""
+    frame = frame.sort_values(["Date", "Transaction_ID"])
+    summary = frame.groupby(["Subsidiary", "Sector"], as_index=False, observed=True)[list(TOTALS)].sum().rename(columns=TOTALS)
+    return {"frame": frame, "summary": summary}
+
+
+def apply_changes(local, changes):
+    """Applies change-feed entries in order: adds and updates upsert the record, deletes drop it."""
+    latest = {}
+    for change in changes:
+        latest[change["Transaction_ID"]] = change["record"]  # Only the last change per ID matters
+    frame = local["frame"].drop(index=list(latest), errors="ignore")
+    upserts = [record for record in latest.values() if record is not None]
+    if upserts:
+        frame = pd.concat([frame, transaction_frame(upserts)])
+    return {**local, **derived_frames(frame)}
+
+
+def sync_transactions():
+    """Brings the session's copy up to date; each rerun costs one (usually 304) request plus the changes themselves."""
+    local = st.session_state.get("transactions")
+    for _ in range(100):
+        if local is None:
+            local = load_transactions()
+            if local is None:
+                return None
+        feed = get_response_cache().get(f"{BASE_URL}/transactions/changes", {"since": local["seq"], "limit": 10000})
+        if feed is None:
+            break  # Keep showing the last good copy
+        if feed["reset"] or feed["lineage"] != local["lineage"]:
+            local = None  # Replaced wholesale on the server (or a different snapshot lineage): reload
+            continue
+        if feed["changes"]:
+            local = apply_changes(local, feed["changes"])
+        local["seq"] = feed["seq"]
+        if not feed["has_more"]:
+            break
+    st.session_state.transactions = local
+    return local
+
+
+# First row of the transaction page being shown
+if "transaction_offset" not in st.session_state:
+    st.session_state.transaction_offset = 0
+
+# Panels are laid out first and filled in once the local copy is synced
+st.subheader("Total Budget Overview")
+summary_panel = st.container()
 
 # Filter by Subsidiary
 selected_subsidiary = st.selectbox("🔍 Filter by Subsidiary", ["All"] + SUBSIDIARY_OPTIONS)
-if selected_subsidiary != "All":
-    sub_response = requests.get(f"{BASE_URL}/budget/subsidiary/{selected_subsidiary}")
-    if sub_response.status_code == 200:
-        st.write("### Subsidiary Budget Breakdown")
-        st.dataframe(pd.DataFrame(sub_response.json()))
-    else:
-        st.error("Subsidiary not found!")
+subsidiary_panel = st.container()
 
 # Filter by Sector
 selected_sector = st.selectbox("🔍 Filter by Sector", ["All"] + SECTOR_OPTIONS)
-if selected_sector != "All":
-    sec_response = requests.get(f"{BASE_URL}/budget/sector/{selected_sector}")
-    if sec_response.status_code == 200:
-        st.write("### Sector Budget Breakdown")
-        st.dataframe(pd.DataFrame(sec_response.json()))
-    else:
-        st.error("Sector not found!")
+sector_panel = st.container()
 
-# Fetch All Transactions
 st.subheader("💰 Transaction History")
-trans_response = requests.get(f"{BASE_URL}/transactions")
-if trans_response.status_code == 200:
-    transactions = pd.DataFrame(trans_response.json())
-    st.dataframe(transactions)
-else:
-    st.error("Failed to load transactions!")
+transactions_panel = st.container()
+
+local = sync_transactions()
+panels = None
+if local is not None:
+    summary = local["summary"]
+    offset = st.session_state.transaction_offset
+    panels = {
+        "summary": summary,
+        "subsidiary": summary[summary["Subsidiary"] == selected_subsidiary].drop(columns="Subsidiary"),
+        "sector": summary[summary["Sector"] == selected_sector].drop(columns="Sector"),
+        "transactions": local["frame"].iloc[offset:offset + PAGE_SIZE].reset_index(drop=True),
+        "has_next": offset + PAGE_SIZE < len(local["frame"]),
+    }
+
+with summary_panel:
+    if panels is not None:
+        st.dataframe(panels["summary"])
+    else:
+        st.error("Failed to load budget summary!")
+
+with subsidiary_panel:
+    if panels is not None and selected_subsidiary != "All":
+        if not panels["subsidiary"].empty:
+            st.write("### Subsidiary Budget Breakdown")
+            st.dataframe(panels["subsidiary"])
+        else:
+            st.error("Subsidiary not found!")
+
+with sector_panel:
+    if panels is not None and selected_sector != "All":
+        if not panels["sector"].empty:
+            st.write("### Sector Budget Breakdown")
+            st.dataframe(panels["sector"])
+        else:
+            st.error("Sector not found!")
+
+with transactions_panel:
+    if panels is not None:
+        transactions = panels["transactions"]
+        st.dataframe(transactions)
+
+        previous_col, next_col = st.columns(2)
+        if st.session_state.transaction_offset > 0 and previous_col.button("⬅️ Previous page"):
+            st.session_state.transaction_offset = max(0, st.session_state.transaction_offset - PAGE_SIZE)
+            st.rerun()
+        if panels["has_next"] and next_col.button("Next page ➡️"):
+            st.session_state.transaction_offset += PAGE_SIZE
+            st.rerun()
+    else:
+        st.error("Failed to load transactions!")
 
 # 🔹 ADMIN FUNCTIONALITY
 if is_admin:
@@ -94,7 +263,7 @@ if is_admin:
                 "Revenue_Generated": Revenue_Generated,
                 "Transaction_Type": Transaction_Type
             }
-            response = requests.post(f"{BASE_URL}/transactions/add", params=payload)
+            response = session.post(f"{BASE_URL}/transactions/add", params=payload)
             if response.status_code == 200:
                 st.success("Transaction added successfully!")
             else:
@@ -124,7 +293,7 @@ if is_admin:
         update_submit = st.form_submit_button("Update Transaction")
 
         if update_submit and update_transaction_id:
-            response = requests.put(f"{BASE_URL}/transactions/update/{update_transaction_id}", params=updated_fields)
+            response = session.put(f"{BASE_URL}/transactions/update/{update_transaction_id}", params=updated_fields)
             if response.status_code == 200:
                 st.success(f"Transaction {update_transaction_id} updated successfully!")
             else:
@@ -134,7 +303,7 @@ if is_admin:
     st.markdown("### 🗑️ Delete a Transaction")
     delete_transaction_id = st.text_input("Transaction ID to Delete")
     if st.button("Delete Transaction"):
-        delete_response = requests.delete(f"{BASE_URL}/transactions/delete/{delete_transaction_id}")
+        delete_response = session.delete(f"{BASE_URL}/transactions/delete/{delete_transaction_id}")
         if delete_response.status_code == 200:
             st.success(f"Transaction {delete_transaction_id} deleted successfully!")
         else:
@@ -0,0 +1,85 @@
+import os
+
+# Without DATABASE_URL the check runs against an in-memory SQLite stand-in seeded from the CSV
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pandas as pd
+from sqlalchemy import text
+
+import app
+from migrate import migrate
+from pagination import TransactionFilter
+from sql_store import dialect_family
+
+# Same statement as the by-sector endpoint of the SQL API kept in backend.py
+SECTOR_QUERY = """
+    SELECT
+        Subsidiary,
+        SUM(Allocated_Budget) AS total_allocated,
+        SUM(Spent_Amount) AS total_spent,
+        SUM(Remaining_Budget) AS total_remaining
+    FROM budget_transactions
+    WHERE Sector = :sector
+    GROUP BY Subsidiary;
+    """
+
+TRANSACTION_LOOKUP_QUERY = "SELECT * FROM budget_transactions WHERE Transaction_ID = :transaction_id"
+
+# Raw-table grouping used by `python rollup.py rebuild`
+RAW_SUMMARY_QUERY = """
+    SELECT Subsidiary, Sector, SUM(Allocated_Budget), SUM(Spent_Amount), SUM(Remaining_Budget)
+    FROM budget_transactions
+    GROUP BY Subsidiary, Sector;
+    """
+
+KEYSET_QUERY, KEYSET_PARAMS = app.transactions_query(TransactionFilter(), after=("2024-02-01", "T5000"))
+
+# (endpoint, query, params, indexes any of which may serve it; "PRIMARY" = the primary key)
+CHECKS = [
+    ("GET /budget/summary (rollup)", app.SUMMARY_QUERY, {}, ("PRIMARY", "idx_rollup_sector_subsidiary")),
+    ("GET /budget/{subsidiary} (rollup)", app.SUBSIDIARY_QUERY, {"subsidiary": "Branch A"}, ("PRIMARY",)),
+    ("GET /budget/sector/{sector}", SECTOR_QUERY, {"sector": "HR"}, ("idx_sector_subsidiary",)),
+    ("Rollup rebuild", RAW_SUMMARY_QUERY, {}, ("idx_subsidiary_sector_date", "idx_sector_subsidiary")),
+    ("GET /transactions (keyset page)", KEYSET_QUERY + " LIMIT 1001", KEYSET_PARAMS, ("idx_date_transaction",)),
+    ("Transaction_ID lookup (update/delete)", TRANSACTION_LOOKUP_QUERY, {"transaction_id": "T4081"}, ("PRIMARY",)),
+]
+
+
+def plan_indexes(conn, query, params):
+    """Runs EXPLAIN and returns the plan as text plus the indexes it uses."""
+    statement = query.strip().rstrip(";")
+    if dialect_family(conn) == "sqlite":
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + statement), params).all()
+        details = [row[-1] for row in rows]
+        used = [d.split(" INDEX ", 1)[1].split(" ")[0] for d in details if " INDEX " in d]
+        # SQLite names primary-key indexes sqlite_autoindex_<table>_N
+        used = ["PRIMARY" if name.startswith("sqlite_autoindex") else name for name in used]
+        if any("INTEGER PRIMARY KEY" in d for d in details):
+            used.append("PRIMARY")
+        return "; ".join(details), used
+
+    rows = conn.execute(text("EXPLAIN " + statement), params).mappings().all()
+    return "; ".join(f"{row['table']}: type={row['type']} key={row['key']}" for row in rows), \
+        [row["key"] for row in rows if row["key"]]
+
+
+def seed_stand_in(engine):
+    """Loads the CSV into a legacy-shaped table and migrates it, like a fresh copy of budget_backup.sql."""
+    df = pd.read_csv("dataset_company_budget_allocation_dashboard.csv")
+    df.to_sql("budget_transactions", con=engine, if_exists="replace", index=False)
+    migrate(engine)
+
+
+if __name__ == "__main__":
+    if dialect_family(app.engine) == "sqlite":
+        seed_stand_in(app.engine)
+
+    failures = 0
+    with app.engine.connect() as conn:
+        for endpoint, query, params, expected in CHECKS:
+            plan, used = plan_indexes(conn, query, params)
+            ok = any(name in used for name in expected)
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {endpoint}: {plan}")
+
+    raise SystemExit(1 if failures else 0)
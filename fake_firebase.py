@@ -0,0 +1,175 @@
+import copy
+import json
+import threading
+import time
+
+
+def _to_tree(value):
+    """Stores values the way Realtime Database does: arrays become {"0": ..., "1": ...}, nulls vanish."""
+    if isinstance(value, (list, tuple)):
+        value = {str(i): item for i, item in enumerate(value)}
+    if isinstance(value, dict):
+        tree = {}
+        for key, item in value.items():
+            item = _to_tree(item)
+            if item is not None and item != {}:
+                tree[str(key)] = item
+        return tree or None
+    return value
+
+
+def _from_tree(value):
+    """Returns mostly-dense integer-keyed objects as lists, like the real SDK does."""
+    if not isinstance(value, dict):
+        return value
+    value = {key: _from_tree(item) for key, item in value.items()}
+    if value and all(key.isdigit() for key in value):
+        top = max(int(key) for key in value)
+        if top < 2 * len(value):
+            return [value.get(str(i)) for i in range(top + 1)]
+    return value
+
+
+class FakeReference:
+    """Subset of firebase_admin.db.Reference backed by a FakeDatabase."""
+
+    def __init__(self, database, path):
+        self._database = database
+        self._segments = [segment for segment in path.strip("/").split("/") if segment]
+
+    @property
+    def path(self):
+        return "/" + "/".join(self._segments)
+
+    @property
+    def key(self):
+        return self._segments[-1] if self._segments else None
+
+    @property
+    def parent(self):
+        if not self._segments:
+            return None
+        return FakeReference(self._database, "/".join(self._segments[:-1]))
+
+    def child(self, path):
+        return FakeReference(self._database, "/".join(self._segments + [path.strip("/")]))
+
+    def get(self, etag=False, shallow=False):
+        value = self._database._read(self._segments)
+        if shallow and isinstance(value, dict):
+            value = {key: True for key in value}
+        value = _from_tree(copy.deepcopy(value))
+        self._database._count("get", value)
+        return (value, self._database._etag(value)) if etag else value
+
+    def set(self, value):
+        self._database._count("set", value)
+        self._database._write(self._segments, value)
+
+    def update(self, value):
+        """Multi-path update: every key (which may contain '/') is replaced atomically."""
+        if not isinstance(value, dict) or not value:
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        self._database._count("update", value)
+        with self._database._lock:
+            self._database._maybe_fail()
+            for path, item in value.items():
+                segments = self._segments + [segment for segment in path.strip("/").split("/") if segment]
+                self._database._write(segments, item, locked=True)
+
+    def push(self, value=""):
+        key = self._database._next_push_key()
+        child = self.child(key)
+        child.set(value)
+        return child
+
+    def delete(self):
+        self._database._count("delete", None)
+        self._database._write(self._segments, None)
+
+    def transaction(self, transaction_update):
+        with self._database._lock:
+            current = _from_tree(copy.deepcopy(self._database._read(self._segments)))
+            new_value = transaction_update(current)
+            self._database._write(self._segments, new_value, locked=True)
+            return new_value
+
+
+class FakeDatabase:
+    """
+    In-memory stand-in for the `firebase_admin.db` module.
+
+    Use `fake.reference(path)` wherever code calls `db.reference(path)`. Counters in `stats`
+    (calls and JSON bytes per operation) let tests and benchmarks see what a change costs.
+    """
+
+    def __init__(self, data=None, latency=0.0):
+        self._lock = threading.RLock()
+        self._root = _to_tree(data) or {}
+        self._push_counter = 0
+        self._failures = 0
+        self.latency = latency  # Simulated round-trip per call, in seconds
+        self.stats = {}
+
+    def reference(self, path="/", app=None, url=None):
+        return FakeReference(self, path)
+
+    def fail_next(self, count=1, error=ConnectionError):
+        """Makes the next `count` writes raise `error`, to exercise retry paths."""
+        self._failures = count
+        self._error = error
+
+    def _maybe_fail(self):
+        if self._failures:
+            self._failures -= 1
+            raise self._error("Simulated Firebase failure")
+
+    def _count(self, operation, value):
+        if self.latency:
+            time.sleep(self.latency)
+        payload = len(json.dumps(value, default=str)) if value is not None else 0
+        with self._lock:
+            calls, size = self.stats.get(operation, (0, 0))
+            self.stats[operation] = (calls + 1, size + payload)
+
+    def _etag(self, value):
+        return str(hash(json.dumps(value, sort_keys=True, default=str)))
+
+    def _next_push_key(self):
+        with self._lock:
+            self._push_counter += 1
+            return f"-Fake{int(time.time() * 1000):013d}{self._push_counter:07d}"
+
+    def _read(self, segments):
+        with self._lock:
+            node = self._root
+            for segment in segments:
+                if not isinstance(node, dict):
+                    return None
+                node = node.get(segment)
+            return node
+
+    def _write(self, segments, value, locked=False):
+        with self._lock:
+            if not locked:
+                self._maybe_fail()
+            value = _to_tree(copy.deepcopy(value))
+            if not segments:
+                self._root = value if isinstance(value, dict) else {}
+                return
+            node = self._root
+            parents = []
+            for segment in segments[:-1]:
+                parents.append((node, segment))
+                child = node.get(segment)
+                if not isinstance(child, dict):
+                    child = node[segment] = {}
+                node = child
+            if value is None:
+                node.pop(segments[-1], None)
+                # Realtime Database drops parents that became empty
+                for parent, segment in reversed(parents):
+                    if parent.get(segment) == {}:
+                        del parent[segment]
+            else:
+                node[segments[-1]] = value
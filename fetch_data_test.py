@@ -2,16 +2,22 @@ import firebase_admin
 from firebase_admin import credentials, db
 import pandas as pd
 
+from columnar import ColumnarTransactions
+from firebase_store import TRANSACTIONS_PATH, iter_transactions
+
 # Load Firebase credentials
 cred = credentials.Certificate("firebase-adminsdk.json")
 firebase_admin.initialize_app(cred, {'databaseURL': 'https://budgetdb-7d811-default-rtdb.firebaseio.com/'})
 
 # Fetch data
 def fetch_budget_data():
-    ref = db.reference("/budget_transactions")
+    ref = db.reference(TRANSACTIONS_PATH)
     data = ref.get()
     if data:
-        return pd.DataFrame(data)  # Convert to DataFrame
+        # Works for both the array and the keyed layout; dimensions come back as categoricals
+        store = ColumnarTransactions()
+        store.load(iter_transactions(data))
+        return store.to_frame()
     return pd.DataFrame()
 
 # Example usage
@@ -0,0 +1,66 @@
+import re
+
+TRANSACTIONS_PATH = "/budget_transactions"
+DUPLICATES_PATH = "/budget_transactions_duplicates"
+
+# Characters Firebase does not allow in child keys (plus "%", used as the escape character)
+_FORBIDDEN_KEY_CHARS = re.compile(r"[.$#\[\]/%\x00-\x1f\x7f]")
+
+
+def transaction_key(transaction_id):
+    """Maps a Transaction_ID to the Firebase child key it is stored under."""
+    return _FORBIDDEN_KEY_CHARS.sub(lambda m: "%{:02X}".format(ord(m.group())), str(transaction_id))
+
+
+def iter_keyed_transactions(data):
+    """Yields (child_key, record) pairs for both the legacy array layout and the keyed layout."""
+    if isinstance(data, dict):
+        items = data.items()
+    else:
+        items = ((str(index), record) for index, record in enumerate(data or []))
+
+    for key, record in items:
+        if isinstance(record, dict):
+            yield key, record
+
+
+def iter_transactions(data):
+    """Yields transaction dicts from a Firebase snapshot, skipping invalid or empty entries."""
+    for _, record in iter_keyed_transactions(data):
+        yield record
+
+
+def is_keyed_layout(data):
+    """True when every child is already stored under its Transaction_ID key."""
+    if isinstance(data, list):  # Children keyed by small integer IDs are read back as an array
+        data = {str(index): record for index, record in enumerate(data) if record is not None}
+    return isinstance(data, dict) and all(
+        isinstance(record, dict) and key == transaction_key(record.get("Transaction_ID"))
+        for key, record in data.items()
+    )
+
+
+def migrate_to_keyed(ref):
+    """
+    Rewrites an array of transactions as children keyed by Transaction_ID.
+
+    Rows that reuse an already-seen Transaction_ID are not dropped: they are moved to
+    DUPLICATES_PATH for manual review. Returns (migrated_count, duplicate_count).
+    """
+    data = ref.get()
+    if not data or is_keyed_layout(data):
+        return 0, 0
+
+    keyed, duplicates = {}, []
+    for _, record in iter_keyed_transactions(data):
+        key = transaction_key(record.get("Transaction_ID"))
+        if key in keyed:
+            duplicates.append(record)
+        else:
+            keyed[key] = record
+
+    if duplicates:
+        ref.parent.child(DUPLICATES_PATH.strip("/")).set(duplicates)
+    ref.set(keyed)  # Single write, so readers never see a half-migrated tree
+
+    return len(keyed), len(duplicates)
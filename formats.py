@@ -0,0 +1,110 @@
+import json
+import os
+from typing import Literal
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # JSON and NDJSON still work; Arrow and Parquet requests get a 406
+    pa = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+# Media types accepted for each ?format= (the first one is sent back as Content-Type)
+MEDIA_TYPES = {
+    "json": ("application/json",),
+    "ndjson": ("application/x-ndjson", "application/jsonl"),
+    "arrow": (ARROW_STREAM, "application/vnd.apache.arrow.file", "application/x-arrow"),
+    "parquet": (PARQUET, "application/x-parquet"),
+}
+TABLE_FORMATS = ("arrow", "parquet")
+
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+ARROW_COMPRESSION = os.getenv("ARROW_COMPRESSION") or None  # e.g. "lz4"; off by default so clients can map buffers as-is
+
+
+def dumps(value):
+    """Compact JSON bytes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; the apps use it as their default response class."""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def accepted_format(accept):
+    """The format an Accept header prefers among MEDIA_TYPES ("json" for */*, a missing header or no match)."""
+    ranked = []
+    for position, part in enumerate((accept or "").split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            ranked.append((-quality, position, media_type.lower()))
+    for _, _, media_type in sorted(ranked):
+        if media_type in ("*/*", "application/*"):
+            return "json"
+        for name, media_types in MEDIA_TYPES.items():
+            if media_type in media_types:
+                return name
+    return "json"
+
+
+def negotiate(request, format=None):
+    """?format= if given, else the Accept header. 406 for Arrow/Parquet when pyarrow isn't installed."""
+    format = format or accepted_format(request.headers.get("accept"))
+    if format in TABLE_FORMATS and pa is None:
+        raise HTTPException(status_code=406, detail="Arrow and Parquet need pyarrow on the server; use JSON")
+    return format
+
+
+def response_format(request: Request, format: Literal["json", "ndjson", "arrow", "parquet"] = None):
+    """FastAPI dependency: the negotiated format for endpoints returning rows."""
+    return negotiate(request, format)
+
+
+def table_response(table, format, headers=None):
+    """Serializes a pyarrow Table as an Arrow IPC stream or a compressed Parquet file."""
+    sink = pa.BufferOutputStream()
+    if format == "arrow":
+        options = pa.ipc.IpcWriteOptions(compression=ARROW_COMPRESSION)
+        with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    else:
+        pa.parquet.write_table(table, sink, compression=PARQUET_COMPRESSION)
+    return Response(sink.getvalue().to_pybytes(), media_type=MEDIA_TYPES[format][0], headers=headers)
+
+
+def rows_table(rows, columns=None):
+    """pyarrow Table from a list of row dicts, column by column (columns default to the first row's keys)."""
+    columns = columns or (list(rows[0]) if rows else [])
+    return pa.table({column: [row.get(column) for row in rows] for column in columns})
+
+
+def rows_response(rows, format, columns=None):
+    """Rows in the negotiated format; JSON is returned as-is for FastAPI to render."""
+    if format in TABLE_FORMATS:
+        return table_response(rows_table(rows, columns), format)
+    if format == "ndjson":
+        return StreamingResponse((dumps(row) + b"\n" for row in rows), media_type=MEDIA_TYPES["ndjson"][0])
+    return rows
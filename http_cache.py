@@ -0,0 +1,100 @@
+import inspect
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from formats import accepted_format
+
+
+class DataVersion:
+    """
+    Monotonic in-process data version, bumped by every write.
+
+    The epoch (process start time) is part of the tag, so a restarted server never
+    answers 304 to an ETag handed out by the previous process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.epoch = format(time.time_ns(), "x")
+        self.current = 0
+
+    def bump(self):
+        with self._lock:
+            self.current += 1
+            return self.current
+
+    def follow(self, epoch, current):
+        """Adopts a version published elsewhere (a shared snapshot), so every worker hands out the same ETags."""
+        with self._lock:
+            self.epoch, self.current = epoch, current
+
+    def tag(self):
+        return f"{self.epoch}.{self.current}"
+
+
+def etag_for(version):
+    return f'"v{version}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Checks if an If-None-Match header (a list of tags, possibly weak, or "*") matches `etag`."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class ConditionalGetMiddleware:
+    """
+    Adds an ETag derived from the data version to every successful GET and answers
+    304 Not Modified when the client's If-None-Match still matches, without running the endpoint.
+
+    `get_version` may be sync (run in the threadpool, as it may hit the database) or async.
+    It returns None when the version is unavailable, in which case the request is served normally;
+    otherwise it is left in request.state.data_version, so endpoints can key caches on it without reading it again.
+    Paths in `exclude`, or starting with one of `exclude_prefixes`, change independently of the data version.
+    """
+
+    def __init__(self, app, get_version, exclude=(), exclude_prefixes=()):
+        self.app = app
+        self.get_version = get_version
+        self.exclude = tuple(exclude)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or scope["path"] in self.exclude or \
+                scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        # Read before the endpoint runs: a write racing with this request can only make the tag stale, never too new
+        if inspect.iscoroutinefunction(self.get_version):
+            version = await self.get_version()
+        else:
+            version = await run_in_threadpool(self.get_version)
+        if version is None:
+            await self.app(scope, receive, send)
+            return
+        scope.setdefault("state", {})["data_version"] = version
+
+        # The same URL can be served as JSON, Arrow or Parquet depending on Accept: each gets its own tag
+        request_headers = Headers(scope=scope)
+        representation = accepted_format(request_headers.get("accept"))
+        etag = etag_for(version if representation == "json" else f"{version}.{representation}")
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}  # Cache, but revalidate every time
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            await Response(status_code=304, headers=cache_headers)(scope, receive, send)
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                for name, value in cache_headers.items():
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
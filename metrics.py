@@ -0,0 +1,319 @@
+import bisect
+import contextvars
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.routing import Match
+
+from formats import dumps
+
+# In-process Prometheus metrics shared by backend.py, app.py and async_app.py, served on /metrics.
+# Each worker process keeps its own counts: scrape workers individually, or run one worker per target.
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # Share of requests answered with a Server-Timing header
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile").lower().encode("latin-1")  # Asks for one; "" disables it
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+SIZE_SAMPLE = 256  # Items serialized to estimate the size of a larger upstream payload
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = []
+
+# Phase -> [seconds, calls] for the current request when it is being profiled, else None
+_breakdown = contextvars.ContextVar("metrics_breakdown", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric with fixed label names; values are kept per tuple of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_labels(self.labels, key)} {_number(value)}"
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; observe() is one bisect and one locked update."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)  # First bucket whose upper bound is >= value
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_labels(self.labels, key, [('le', _number(bound))])} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {count}"
+
+
+class ObservedCounter(Metric):
+    """Counter read from existing stats when /metrics is scraped, so the hot path pays nothing for it."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self.readers = {}  # First label value -> function returning {second label value: count}
+
+    def samples(self):
+        for first, read in list(self.readers.items()):
+            for second, value in read().items():
+                yield f"{self.name}{_labels(self.labels, (first, second))} {_number(value)}"
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to answer a request, by route template and status",
+                            ("app", "method", "route", "status"))
+UPSTREAM_SECONDS = Histogram("upstream_request_duration_seconds", "Time spent in calls to an upstream store",
+                             ("source", "operation"))
+UPSTREAM_BYTES = Histogram("upstream_payload_bytes", "JSON size of payloads sent to or received from an upstream store",
+                           ("source", "operation"), buckets=SIZE_BUCKETS)
+AGGREGATION_SECONDS = Histogram("aggregation_duration_seconds", "Time spent computing totals and time series in process",
+                                ("operation",))
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Time spent executing SQL, by statement kind and table",
+                             ("statement",))
+DB_POOL_WAIT_SECONDS = Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled database connection")
+CACHE_REQUESTS = ObservedCounter("cache_requests_total", "Lookups in the read caches, by outcome", ("cache", "result"))
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.lines()) + "\n"
+
+
+def metrics_response():
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
+def watch_cache(cache, read):
+    """Reports `read()` ({"hit": n, "miss": n, ...}) as cache_requests_total{cache=...} on every scrape."""
+    CACHE_REQUESTS.readers[cache] = read
+
+
+def record(phase, seconds):
+    """Adds `seconds` to a phase of the current request's Server-Timing breakdown, if it is being profiled."""
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        totals = breakdown.setdefault(phase, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+
+@contextmanager
+def timed(phase, histogram=None, **labels):
+    """Times the block into `histogram` (if given) and into the request's `phase` breakdown."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if histogram is not None:
+            histogram.observe(elapsed, **labels)
+        record(phase, elapsed)
+
+
+def payload_size(payload):
+    """
+    Compact-JSON size of a payload. Dicts and lists with more than SIZE_SAMPLE items are
+    estimated from a random sample of them, so a full-tree download isn't serialized again just to be measured.
+    """
+    if not isinstance(payload, (dict, list)) or len(payload) <= SIZE_SAMPLE:
+        return len(dumps(payload))
+    if isinstance(payload, dict):
+        sample = {key: payload[key] for key in random.sample(list(payload), SIZE_SAMPLE)}
+    else:
+        sample = random.sample(payload, SIZE_SAMPLE)
+    return round(len(dumps(sample)) * len(payload) / SIZE_SAMPLE)
+
+
+@contextmanager
+def upstream(source, operation):
+    """
+    Times one call to an upstream store. The yielded function records the size of a payload
+    and returns it unchanged, e.g. `tree = measure(ref.get())` or `ref.set(measure(row))`.
+    Payloads are sized after the call is timed: pass `size` when the byte count is already
+    known (e.g. from the HTTP response), otherwise it is estimated by payload_size().
+    """
+    payloads = []
+
+    def measure(payload, size=None):
+        payloads.append((payload, size))
+        return payload
+
+    with timed("upstream", UPSTREAM_SECONDS, source=source, operation=operation):
+        yield measure
+    for payload, size in payloads:
+        UPSTREAM_BYTES.observe(payload_size(payload) if size is None else size, source=source, operation=operation)
+
+
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|ON)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?[`\"\[]?(\w+)", re.IGNORECASE)
+
+
+def statement_label(statement):
+    """"SELECT budget_rollup", "INSERT budget_transactions", ...: one label per kind of statement, not per parameter list."""
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    match = _TABLE.search(statement)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+def instrument_engine(engine):
+    """
+    Records statement execution times and pool checkout waits for a SQLAlchemy Engine
+    (pass `async_engine.sync_engine` for an AsyncEngine).
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.metrics_started
+        DB_QUERY_SECONDS.observe(elapsed, statement=statement_label(statement))
+        record("db", elapsed)
+
+    # Checkouts go through pool.connect(); includes opening a new connection when the pool has room for one
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            elapsed = time.perf_counter() - started
+            DB_POOL_WAIT_SECONDS.observe(elapsed)
+            record("pool", elapsed)
+
+    pool.connect = timed_connect
+
+
+def route_template(scope, routes):
+    """The path template of the route serving `scope` ("/budget/{subsidiary}"), keeping label values bounded."""
+    route = scope.get("route")
+    if route is None:  # Answered before routing (e.g. a 304): match it the way the router would
+        for candidate in routes:
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", "unmatched")
+
+
+def server_timing(breakdown, total):
+    parts = [f'{phase};dur={seconds * 1000:.3f};desc="{calls} call{"s" if calls != 1 else ""}"'
+             for phase, (seconds, calls) in breakdown.items()]
+    return ", ".join([*parts, f"total;dur={total * 1000:.3f}"])
+
+
+class MetricsMiddleware:
+    """
+    Records every request's latency by route template, method and status.
+
+    A sampled share of requests (PROFILE_SAMPLE_RATE), plus any request sending the PROFILE_HEADER
+    header, is profiled: the time spent in upstream calls, aggregations, SQL and pool waits is
+    added up and returned in a Server-Timing header. Add it last, so it times the other middleware too.
+    """
+
+    def __init__(self, app, name, routes, exclude=("/metrics",)):
+        self.app = app
+        self.name = name
+        self.routes = routes
+        self.exclude = tuple(exclude)
+
+    def profiled(self, scope):
+        if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            return True
+        return bool(PROFILE_HEADER) and any(name == PROFILE_HEADER for name, _ in scope["headers"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        breakdown = {} if self.profiled(scope) else None
+        token = _breakdown.set(breakdown)  # Threadpool calls copy the context, so they add to the same dict
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if breakdown is not None:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", server_timing(breakdown, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _breakdown.reset(token)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, app=self.name, method=scope["method"],
+                                    route=route_template(scope, self.routes), status=status)
@@ -0,0 +1,63 @@
+import re
+from pathlib import Path
+from sqlalchemy import create_engine, text
+
+from sql_store import DATABASE_URL, dialect_family
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.(\w+)\.sql$")
+
+
+def split_statements(sql):
+    """Splits a migration file into statements (one per trailing ';', `--` comment lines dropped)."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";\n") if stmt.strip().rstrip(";")]
+
+
+def available_migrations(dialect):
+    """Returns [(version, name, path)] for the given dialect, ordered by version."""
+    migrations = []
+    for path in MIGRATIONS_DIR.glob("*.sql"):
+        match = MIGRATION_FILE.match(path.name)
+        if match and match.group(3) == dialect:
+            migrations.append((int(match.group(1)), match.group(2), path))
+    return sorted(migrations)
+
+
+def current_version(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER NOT NULL PRIMARY KEY, name VARCHAR(128) NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+
+def migrate(engine):
+    """Applies every migration newer than the recorded schema version, in order. Returns the applied names."""
+    applied = []
+    dialect = dialect_family(engine)
+
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    for number, name, path in available_migrations(dialect):
+        if number <= version:
+            continue
+        # MySQL commits DDL implicitly, so each migration is only atomic on the SQLite stand-in
+        with engine.begin() as conn:
+            for statement in split_statements(path.read_text(encoding="utf-8")):
+                conn.exec_driver_sql(statement)
+            conn.execute(text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                         {"version": number, "name": name})
+        applied.append(f"{number:04d}_{name}")
+
+    return applied
+
+
+if __name__ == "__main__":
+    applied = migrate(create_engine(DATABASE_URL))
+    if applied:
+        print("✅ Applied migrations:", ", ".join(applied))
+    else:
+        print("✅ Schema is up to date.")
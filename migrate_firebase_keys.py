@@ -0,0 +1,20 @@
+import firebase_admin
+from firebase_admin import credentials, db
+
+from firebase_store import TRANSACTIONS_PATH, DUPLICATES_PATH, migrate_to_keyed
+
+# One-shot migration: /budget_transactions array -> children keyed by Transaction_ID
+cred = credentials.Certificate("firebase-adminsdk.json")  # Ensure this file is in your project folder
+firebase_admin.initialize_app(cred, {
+    'databaseURL': 'https://budgetdb-7d811-default-rtdb.firebaseio.com/'  # Replace with your actual URL
+})
+
+migrated, duplicates = migrate_to_keyed(db.reference(TRANSACTIONS_PATH))
+
+if migrated:
+    print(f"✅ Migrated {migrated} transactions to keyed children.")
+else:
+    print("✅ Nothing to migrate, transactions are already keyed by Transaction_ID.")
+
+if duplicates:
+    print(f"⚠️ {duplicates} rows reused an existing Transaction_ID and were moved to {DUPLICATES_PATH}")
@@ -0,0 +1,44 @@
+-- 0001: move budget_transactions from untyped MyISAM text columns to a typed, indexed InnoDB table.
+-- The old table is kept as budget_transactions_legacy so the migration can be rolled back by hand.
+
+CREATE TABLE IF NOT EXISTS `budget_transactions` (
+  `Transaction_ID` text,
+  `Date` text,
+  `Subsidiary` text,
+  `Sector` text,
+  `User_ID` text,
+  `Allocated_Budget` double DEFAULT NULL,
+  `Spent_Amount` double DEFAULT NULL,
+  `Remaining_Budget` double DEFAULT NULL,
+  `Revenue_Generated` double DEFAULT NULL,
+  `Transaction_Type` text
+) ENGINE=MyISAM DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE `budget_transactions_typed` (
+  `Transaction_ID` varchar(32) NOT NULL,
+  `Date` date NOT NULL,
+  `Subsidiary` varchar(64) NOT NULL,
+  `Sector` varchar(64) NOT NULL,
+  `User_ID` varchar(32) NOT NULL,
+  `Allocated_Budget` double NOT NULL DEFAULT 0,
+  `Spent_Amount` double NOT NULL DEFAULT 0,
+  `Remaining_Budget` double NOT NULL DEFAULT 0,
+  `Revenue_Generated` double NOT NULL DEFAULT 0,
+  `Transaction_Type` varchar(32) NOT NULL,
+  PRIMARY KEY (`Transaction_ID`),
+  KEY `idx_subsidiary_sector_date` (`Subsidiary`, `Sector`, `Date`),
+  KEY `idx_sector_subsidiary` (`Sector`, `Subsidiary`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Rows repeating a Transaction_ID keep their first copy; every row stays in the legacy table
+INSERT IGNORE INTO `budget_transactions_typed`
+  (`Transaction_ID`, `Date`, `Subsidiary`, `Sector`, `User_ID`, `Allocated_Budget`,
+   `Spent_Amount`, `Remaining_Budget`, `Revenue_Generated`, `Transaction_Type`)
+SELECT
+  `Transaction_ID`, CAST(`Date` AS DATE), `Subsidiary`, `Sector`, `User_ID`, COALESCE(`Allocated_Budget`, 0),
+  COALESCE(`Spent_Amount`, 0), COALESCE(`Remaining_Budget`, 0), COALESCE(`Revenue_Generated`, 0), `Transaction_Type`
+FROM `budget_transactions`
+WHERE `Transaction_ID` IS NOT NULL AND `Date` IS NOT NULL;
+
+RENAME TABLE `budget_transactions` TO `budget_transactions_legacy`,
+             `budget_transactions_typed` TO `budget_transactions`;
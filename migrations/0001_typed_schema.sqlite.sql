@@ -0,0 +1,42 @@
+-- 0001: typed, indexed budget_transactions for the local SQLite stand-in (mirrors the MySQL migration).
+
+CREATE TABLE IF NOT EXISTS budget_transactions (
+  Transaction_ID TEXT,
+  Date TEXT,
+  Subsidiary TEXT,
+  Sector TEXT,
+  User_ID TEXT,
+  Allocated_Budget REAL,
+  Spent_Amount REAL,
+  Remaining_Budget REAL,
+  Revenue_Generated REAL,
+  Transaction_Type TEXT
+);
+
+CREATE TABLE budget_transactions_typed (
+  Transaction_ID VARCHAR(32) NOT NULL PRIMARY KEY,
+  Date DATE NOT NULL,
+  Subsidiary VARCHAR(64) NOT NULL,
+  Sector VARCHAR(64) NOT NULL,
+  User_ID VARCHAR(32) NOT NULL,
+  Allocated_Budget DOUBLE NOT NULL DEFAULT 0,
+  Spent_Amount DOUBLE NOT NULL DEFAULT 0,
+  Remaining_Budget DOUBLE NOT NULL DEFAULT 0,
+  Revenue_Generated DOUBLE NOT NULL DEFAULT 0,
+  Transaction_Type VARCHAR(32) NOT NULL
+);
+
+INSERT OR IGNORE INTO budget_transactions_typed
+  (Transaction_ID, Date, Subsidiary, Sector, User_ID, Allocated_Budget,
+   Spent_Amount, Remaining_Budget, Revenue_Generated, Transaction_Type)
+SELECT
+  Transaction_ID, date(Date), Subsidiary, Sector, User_ID, COALESCE(Allocated_Budget, 0),
+  COALESCE(Spent_Amount, 0), COALESCE(Remaining_Budget, 0), COALESCE(Revenue_Generated, 0), Transaction_Type
+FROM budget_transactions
+WHERE Transaction_ID IS NOT NULL AND Date IS NOT NULL;
+
+ALTER TABLE budget_transactions RENAME TO budget_transactions_legacy;
+ALTER TABLE budget_transactions_typed RENAME TO budget_transactions;
+
+CREATE INDEX idx_subsidiary_sector_date ON budget_transactions (Subsidiary, Sector, Date);
+CREATE INDEX idx_sector_subsidiary ON budget_transactions (Sector, Subsidiary);
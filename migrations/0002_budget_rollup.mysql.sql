@@ -0,0 +1,21 @@
+-- 0002: (Subsidiary, Sector, month) rollup read by the summary endpoints and kept in sync by every write.
+
+CREATE TABLE `budget_rollup` (
+  `Subsidiary` varchar(64) NOT NULL,
+  `Sector` varchar(64) NOT NULL,
+  `Month` date NOT NULL,
+  `transaction_count` int NOT NULL DEFAULT 0,
+  `total_allocated` double NOT NULL DEFAULT 0,
+  `total_spent` double NOT NULL DEFAULT 0,
+  `total_remaining` double NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Subsidiary`, `Sector`, `Month`),
+  KEY `idx_rollup_sector_subsidiary` (`Sector`, `Subsidiary`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT INTO `budget_rollup`
+  (`Subsidiary`, `Sector`, `Month`, `transaction_count`, `total_allocated`, `total_spent`, `total_remaining`)
+SELECT
+  `Subsidiary`, `Sector`, DATE_SUB(`Date`, INTERVAL DAYOFMONTH(`Date`) - 1 DAY) AS `Month`,
+  COUNT(*), SUM(`Allocated_Budget`), SUM(`Spent_Amount`), SUM(`Remaining_Budget`)
+FROM `budget_transactions`
+GROUP BY `Subsidiary`, `Sector`, `Month`;
@@ -0,0 +1,22 @@
+-- 0002: (Subsidiary, Sector, month) rollup for the local SQLite stand-in (mirrors the MySQL migration).
+
+CREATE TABLE budget_rollup (
+  Subsidiary VARCHAR(64) NOT NULL,
+  Sector VARCHAR(64) NOT NULL,
+  Month DATE NOT NULL,
+  transaction_count INTEGER NOT NULL DEFAULT 0,
+  total_allocated DOUBLE NOT NULL DEFAULT 0,
+  total_spent DOUBLE NOT NULL DEFAULT 0,
+  total_remaining DOUBLE NOT NULL DEFAULT 0,
+  PRIMARY KEY (Subsidiary, Sector, Month)
+);
+
+CREATE INDEX idx_rollup_sector_subsidiary ON budget_rollup (Sector, Subsidiary);
+
+INSERT INTO budget_rollup
+  (Subsidiary, Sector, Month, transaction_count, total_allocated, total_spent, total_remaining)
+SELECT
+  Subsidiary, Sector, date(Date, 'start of month') AS Month,
+  COUNT(*), SUM(Allocated_Budget), SUM(Spent_Amount), SUM(Remaining_Budget)
+FROM budget_transactions
+GROUP BY Subsidiary, Sector, Month;
@@ -0,0 +1,3 @@
+-- 0003: index backing keyset pagination of /transactions (ORDER BY Date, Transaction_ID).
+
+ALTER TABLE `budget_transactions` ADD KEY `idx_date_transaction` (`Date`, `Transaction_ID`);
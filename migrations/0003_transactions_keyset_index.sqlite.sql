@@ -0,0 +1,3 @@
+-- 0003: index backing keyset pagination of /transactions (ORDER BY Date, Transaction_ID).
+
+CREATE INDEX idx_date_transaction ON budget_transactions (Date, Transaction_ID);
@@ -0,0 +1,9 @@
+-- 0004: single-row data version, bumped in the same transaction as every write (drives ETag / 304 responses).
+
+CREATE TABLE `data_version` (
+  `id` TINYINT NOT NULL,
+  `version` BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB;
+
+INSERT INTO `data_version` (`id`, `version`) VALUES (1, 0);
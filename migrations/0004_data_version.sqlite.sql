@@ -0,0 +1,8 @@
+-- 0004: single-row data version for the local SQLite stand-in (mirrors the MySQL migration).
+
+CREATE TABLE data_version (
+  id INTEGER NOT NULL PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO data_version (id, version) VALUES (1, 0);
@@ -0,0 +1,20 @@
+-- 0005: (Subsidiary, Sector, day) rollup behind the /budget/timeseries endpoints, kept in sync by every write.
+
+CREATE TABLE `budget_daily` (
+  `Subsidiary` varchar(64) NOT NULL,
+  `Sector` varchar(64) NOT NULL,
+  `Day` date NOT NULL,
+  `transaction_count` int NOT NULL DEFAULT 0,
+  `total_allocated` double NOT NULL DEFAULT 0,
+  `total_spent` double NOT NULL DEFAULT 0,
+  `total_remaining` double NOT NULL DEFAULT 0,
+  PRIMARY KEY (`Subsidiary`, `Sector`, `Day`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT INTO `budget_daily`
+  (`Subsidiary`, `Sector`, `Day`, `transaction_count`, `total_allocated`, `total_spent`, `total_remaining`)
+SELECT
+  `Subsidiary`, `Sector`, `Date`,
+  COUNT(*), SUM(`Allocated_Budget`), SUM(`Spent_Amount`), SUM(`Remaining_Budget`)
+FROM `budget_transactions`
+GROUP BY `Subsidiary`, `Sector`, `Date`;
@@ -0,0 +1,20 @@
+-- 0005: (Subsidiary, Sector, day) rollup for the local SQLite stand-in (mirrors the MySQL migration).
+
+CREATE TABLE budget_daily (
+  Subsidiary VARCHAR(64) NOT NULL,
+  Sector VARCHAR(64) NOT NULL,
+  Day DATE NOT NULL,
+  transaction_count INTEGER NOT NULL DEFAULT 0,
+  total_allocated DOUBLE NOT NULL DEFAULT 0,
+  total_spent DOUBLE NOT NULL DEFAULT 0,
+  total_remaining DOUBLE NOT NULL DEFAULT 0,
+  PRIMARY KEY (Subsidiary, Sector, Day)
+);
+
+INSERT INTO budget_daily
+  (Subsidiary, Sector, Day, transaction_count, total_allocated, total_spent, total_remaining)
+SELECT
+  Subsidiary, Sector, Date,
+  COUNT(*), SUM(Allocated_Budget), SUM(Spent_Amount), SUM(Remaining_Budget)
+FROM budget_transactions
+GROUP BY Subsidiary, Sector, Date;
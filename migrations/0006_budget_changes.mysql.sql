@@ -0,0 +1,12 @@
+-- 0006: Transaction_IDs written at each data version, so backup.py's incremental segments only read what changed.
+-- changes_start: budget_changes is complete for every version after it (raised when old entries are pruned).
+
+CREATE TABLE `budget_changes` (
+  `version` BIGINT NOT NULL,
+  `Transaction_ID` varchar(32) NOT NULL,
+  PRIMARY KEY (`version`, `Transaction_ID`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+ALTER TABLE `data_version` ADD COLUMN `changes_start` BIGINT NOT NULL DEFAULT 0;
+
+UPDATE `data_version` SET `changes_start` = `version` WHERE `id` = 1;
@@ -0,0 +1,11 @@
+-- 0006: per-version change log for the local SQLite stand-in (mirrors the MySQL migration).
+
+CREATE TABLE budget_changes (
+  version BIGINT NOT NULL,
+  Transaction_ID VARCHAR(32) NOT NULL,
+  PRIMARY KEY (version, Transaction_ID)
+);
+
+ALTER TABLE data_version ADD COLUMN changes_start BIGINT NOT NULL DEFAULT 0;
+
+UPDATE data_version SET changes_start = version WHERE id = 1;
@@ -0,0 +1,176 @@
+import base64
+import json
+from datetime import date
+from typing import Literal
+
+from fastapi import HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from formats import TABLE_FORMATS, FastJSONResponse, dumps, negotiate, rows_table, table_response
+from schema import TRANSACTION_COLUMNS
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+
+class TransactionFilter:
+    """Server-side filters for /transactions, usable as an in-memory predicate or a SQL WHERE clause."""
+
+    def __init__(self, date_from=None, date_to=None, equals=None, ranges=None):
+        self.date_from = date_from.isoformat() if date_from else None
+        self.date_to = date_to.isoformat() if date_to else None
+        self.equals = {column: value for column, value in (equals or {}).items() if value is not None}
+        self.ranges = {column: bounds for column, bounds in (ranges or {}).items() if bounds != (None, None)}
+
+    def matches(self, record):
+        date_value = str(record.get("Date"))
+        if self.date_from and date_value < self.date_from:
+            return False
+        if self.date_to and date_value > self.date_to:
+            return False
+        for column, value in self.equals.items():
+            if record.get(column) != value:
+                return False
+        for column, (low, high) in self.ranges.items():
+            amount = record.get(column) or 0
+            if (low is not None and amount < low) or (high is not None and amount > high):
+                return False
+        return True
+
+    def key(self):
+        """Hashable, order-independent form of the filter (for cache keys)."""
+        return self.date_from, self.date_to, tuple(sorted(self.equals.items())), tuple(sorted(self.ranges.items()))
+
+    def to_sql(self):
+        """Returns (conditions, params) to AND into a WHERE clause."""
+        conditions, params = [], {}
+        if self.date_from:
+            conditions.append("Date >= :date_from")
+            params["date_from"] = self.date_from
+        if self.date_to:
+            conditions.append("Date <= :date_to")
+            params["date_to"] = self.date_to
+        for column, value in self.equals.items():
+            conditions.append(f"{column} = :eq_{column}")
+            params[f"eq_{column}"] = value
+        for column, (low, high) in self.ranges.items():
+            if low is not None:
+                conditions.append(f"{column} >= :min_{column}")
+                params[f"min_{column}"] = low
+            if high is not None:
+                conditions.append(f"{column} <= :max_{column}")
+                params[f"max_{column}"] = high
+        return conditions, params
+
+
+def transaction_filters(
+    date_from: date = None,
+    date_to: date = None,
+    subsidiary: str = None,
+    sector: str = None,
+    transaction_type: str = None,
+    user_id: str = None,
+    allocated_min: float = None, allocated_max: float = None,
+    spent_min: float = None, spent_max: float = None,
+    remaining_min: float = None, remaining_max: float = None,
+    revenue_min: float = None, revenue_max: float = None,
+):
+    """FastAPI dependency collecting the /transactions filter parameters."""
+    return TransactionFilter(
+        date_from=date_from,
+        date_to=date_to,
+        equals={"Subsidiary": subsidiary, "Sector": sector, "Transaction_Type": transaction_type, "User_ID": user_id},
+        ranges={
+            "Allocated_Budget": (allocated_min, allocated_max),
+            "Spent_Amount": (spent_min, spent_max),
+            "Remaining_Budget": (remaining_min, remaining_max),
+            "Revenue_Generated": (revenue_min, revenue_max),
+        },
+    )
+
+
+def page_params(
+    request: Request,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str = None,
+    format: Literal["json", "ndjson", "arrow", "parquet"] = None,
+):
+    """
+    FastAPI dependency for cursor, page size, projection (?fields=Date,Spent_Amount) and output format.
+
+    The format comes from ?format=, else from the Accept header (JSON by default). NDJSON streams
+    every matching row; Arrow and Parquet pages use the same cursor and X-Next-Cursor as JSON.
+    """
+    return {"after": decode_cursor(cursor), "limit": limit, "fields": parse_fields(fields),
+            "format": negotiate(request, format)}
+
+
+def encode_cursor(record):
+    raw = json.dumps([str(record["Date"]), record["Transaction_ID"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns the (Date, Transaction_ID) a page starts after, or None for the first page."""
+    if not cursor:
+        return None
+    try:
+        date_value, transaction_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(date_value), str(transaction_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields):
+    if not fields:
+        return None
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in TRANSACTION_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+
+def project(record, fields):
+    return record if fields is None else {field: record.get(field) for field in fields}
+
+
+def page_response(rows, limit, fields, format="json"):
+    """
+    JSON list (or Arrow/Parquet table) of at most `limit` rows; the caller fetches limit + 1 to detect a next page.
+
+    The body stays a plain list, as before; the cursor for the next page travels in the
+    X-Next-Cursor header (absent on the last page).
+    """
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1])
+    if format in TABLE_FORMATS:
+        return table_response(rows_table(rows, fields or TRANSACTION_COLUMNS), format, headers)
+    return FastJSONResponse(jsonable_encoder([project(row, fields) for row in rows]), headers=headers)
+
+
+def table_page_response(table, limit, fields, format):
+    """page_response() for a pyarrow Table of up to limit + 1 rows (built straight from column arrays)."""
+    headers = {}
+    if table.num_rows > limit:
+        last = table.slice(limit - 1, 1).select(["Date", "Transaction_ID"]).to_pylist()[0]
+        headers["X-Next-Cursor"] = encode_cursor(last)
+        table = table.slice(0, limit)
+    return table_response(table.select(fields or TRANSACTION_COLUMNS), format, headers)
+
+
+def ndjson_response(rows, fields):
+    """Streams rows (an iterator or async iterator) as newline-delimited JSON as they are read, without a full list."""
+    async def async_lines():
+        async for row in rows:
+            yield dumps(project(row, fields)) + b"\n"
+
+    def lines():
+        for row in rows:
+            yield dumps(project(row, fields)) + b"\n"
+
+    return StreamingResponse(async_lines() if hasattr(rows, "__aiter__") else lines(), media_type="application/x-ndjson")
@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException
+
+from pagination import transaction_filters
+from schema import AMOUNT_COLUMNS, DIMENSION_COLUMNS
+
+DATE_BUCKETS = ("day", "week", "month", "year")
+AGGREGATES = ("sum", "count", "avg", "min", "max", "ratio")
+DEFAULT_MEASURES = "count,sum:Allocated_Budget,sum:Spent_Amount,sum:Remaining_Budget"
+
+# Date buckets are returned as the first day of the bucket (weeks start on Monday); month matches rollup.MONTH_EXPR
+BUCKET_EXPR = {
+    "mysql": {
+        "day": "{column}",
+        "week": "DATE_SUB({column}, INTERVAL WEEKDAY({column}) DAY)",
+        "month": "DATE_SUB({column}, INTERVAL DAYOFMONTH({column}) - 1 DAY)",
+        "year": "MAKEDATE(YEAR({column}), 1)",
+    },
+    "sqlite": {
+        "day": "{column}",
+        "week": "date({column}, '-6 days', 'weekday 1')",
+        "month": "date({column}, 'start of month')",
+        "year": "date({column}, 'start of year')",
+    },
+}
+
+
+def bucket_expr(dialect, bucket, column="Date"):
+    """SQL expression for the first day of `column`'s day/week/month/year bucket."""
+    return BUCKET_EXPR[dialect][bucket].format(column=column)
+
+
+def measure_name(measure):
+    """Result key for a measure: "count", "sum_Spent_Amount", "ratio_Revenue_Generated_Spent_Amount"."""
+    return "_".join(part for part in measure if part)
+
+
+class BudgetQuery:
+    """A parsed /budget/query request: group-by dimensions, (aggregate, column, other) measures and filters."""
+
+    def __init__(self, dimensions, measures, filters):
+        self.dimensions = dimensions
+        self.measures = measures
+        self.filters = filters
+
+    @property
+    def key(self):
+        """Normalized form used as the result-cache key."""
+        return self.dimensions, self.measures, self.filters.key()
+
+    def to_sql(self, dialect):
+        """Returns (query, params) running the whole aggregation as one GROUP BY in the database."""
+        columns = [f"{bucket_expr(dialect, dimension)} AS {dimension}" if dimension in DATE_BUCKETS else dimension
+                   for dimension in self.dimensions]
+        for aggregate, column, other in self.measures:
+            if aggregate == "count":
+                expression = "COUNT(*)"
+            elif aggregate == "ratio":
+                expression = f"SUM({column}) / NULLIF(SUM({other}), 0)"
+            else:
+                expression = f"{aggregate.upper()}({column})"
+            columns.append(f"{expression} AS {measure_name((aggregate, column, other))}")
+
+        conditions, params = self.filters.to_sql()
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        group_by = ", ".join(self.dimensions)
+        query = f"SELECT {', '.join(columns)} FROM budget_transactions {where} GROUP BY {group_by} ORDER BY {group_by}"
+        return query, params
+
+
+def parse_dimensions(text):
+    dimensions = []
+    for dimension in (part.strip() for part in text.split(",")):
+        if dimension and dimension not in dimensions:
+            if dimension not in DIMENSION_COLUMNS and dimension not in DATE_BUCKETS:
+                raise HTTPException(status_code=400, detail=f"Unknown dimension: {dimension}")
+            dimensions.append(dimension)
+    if not dimensions:
+        raise HTTPException(status_code=400, detail="At least one dimension is required")
+    if len([dimension for dimension in dimensions if dimension in DATE_BUCKETS]) > 1:
+        raise HTTPException(status_code=400, detail="Only one date bucket can be used per query")
+    return tuple(dimensions)
+
+
+def parse_measures(text):
+    """Parses "count,sum:Spent_Amount,ratio:Revenue_Generated/Spent_Amount" into (aggregate, column, other) tuples."""
+    measures = []
+    for spec in (part.strip() for part in text.split(",")):
+        if not spec:
+            continue
+        aggregate, _, target = spec.partition(":")
+        column, _, other = target.partition("/")
+        if aggregate not in AGGREGATES:
+            raise HTTPException(status_code=400, detail=f"Unknown aggregate: {aggregate}")
+        if aggregate == "count":
+            measure = ("count", "", "")
+        elif column not in AMOUNT_COLUMNS or (aggregate == "ratio") != bool(other) or \
+                (other and other not in AMOUNT_COLUMNS):
+            raise HTTPException(status_code=400, detail=f"Invalid measure: {spec}")
+        else:
+            measure = (aggregate, column, other)
+        if measure not in measures:
+            measures.append(measure)
+    if not measures:
+        raise HTTPException(status_code=400, detail="At least one measure is required")
+    return tuple(measures)
+
+
+def budget_query(dimensions: str = "Subsidiary,Sector", measures: str = DEFAULT_MEASURES,
+                 filters=Depends(transaction_filters)):
+    """
+    FastAPI dependency for /budget/query, e.g.
+    ?dimensions=User_ID,month&measures=count,avg:Spent_Amount,ratio:Revenue_Generated/Spent_Amount&sector=IT
+    """
+    return BudgetQuery(parse_dimensions(dimensions), parse_measures(measures), filters)
+
+
+class QueryCache:
+    """Bounded LRU of query results, keyed by (normalized query, data version) so writes never serve stale results."""
+
+    def __init__(self, maxsize=256):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
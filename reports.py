@@ -0,0 +1,415 @@
+import csv
+import hashlib
+import heapq
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Literal
+
+from fastapi import HTTPException, Query
+from fastapi.responses import FileResponse
+
+from pagination import TransactionFilter
+
+# Budget reports (summary tables, time series, overspend list) built in a process pool, off the request path.
+# Job state lives in REPORT_DIR as one JSON file per report, so any worker process can answer GET /reports/{id}.
+
+REPORT_DIR = os.getenv("REPORT_DIR", "generated_reports")
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))               # Processes building reports, per API worker
+MAX_QUEUED_REPORTS = int(os.getenv("MAX_QUEUED_REPORTS", "16"))      # Queued + running jobs per API worker; more get a 503
+REPORT_TTL = float(os.getenv("REPORT_TTL", str(24 * 3600)))          # Finished reports are deleted after this many seconds
+REPORT_BATCH_SIZE = 5000  # Rows read per batch while streaming transactions into a report
+MAX_REPORT_TOP = 1000
+
+# format -> (media type, optional module the writer needs)
+REPORT_FORMATS = {
+    "csv": ("text/csv", None),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "openpyxl"),
+    "pdf": ("application/pdf", "reportlab"),
+}
+
+# (section, title, columns)
+SECTIONS = [
+    ("summary", "Totals by subsidiary and sector",
+     ["Subsidiary", "Sector", "transactions", "allocated", "spent", "remaining", "revenue", "overspent_transactions",
+      "overspent_amount"]),
+    ("timeseries", "Spending over time",
+     ["period", "Subsidiary", "Sector", "transactions", "allocated", "spent"]),
+    ("overspend", "Largest overspends",
+     ["Transaction_ID", "Date", "Subsidiary", "Sector", "User_ID", "Allocated_Budget", "Spent_Amount", "overspend"]),
+]
+
+REPORT_ID = re.compile(r"[0-9a-f]{20}")
+
+
+def report_params(
+    subsidiary: str = None,
+    sector: str = None,
+    date_from: date = None,
+    date_to: date = None,
+    bucket: Literal["week", "month"] = "month",
+    top: int = Query(50, ge=1, le=MAX_REPORT_TOP, description="Number of overspent transactions to list"),
+    format: Literal["csv", "xlsx", "pdf"] = "csv",
+):
+    """FastAPI dependency: the report to build. 406 when the writer for `format` isn't installed on the server."""
+    module = REPORT_FORMATS[format][1]
+    if module and importlib.util.find_spec(module) is None:
+        raise HTTPException(status_code=406, detail=f"{format.upper()} reports need {module} on the server; use CSV")
+    return {"subsidiary": subsidiary, "sector": sector, "date_from": date_from and date_from.isoformat(),
+            "date_to": date_to and date_to.isoformat(), "bucket": bucket, "top": top, "format": format}
+
+
+def report_id(spec, data_version):
+    """Same report of the same data -> same id, so identical requests share one job."""
+    key = json.dumps([spec, str(data_version)], sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(key, digest_size=10).hexdigest()
+
+
+# 🔹 Building a report (runs in the pool's processes)
+
+@contextmanager
+def open_transactions(source, filters):
+    """
+    Yields (data version, matching transactions) from `source`, streamed in batches:
+    ("snapshot", directory, version) maps a published columnar snapshot, ("sql", url) reads the database.
+    """
+    if source[0] == "snapshot":
+        from columnar import ColumnarTransactions
+        from snapshot import SnapshotStore
+
+        lineage, version, arrays, meta = SnapshotStore(source[1]).open(source[2])
+        transactions = ColumnarTransactions()
+        transactions.attach(arrays, meta["dictionaries"])  # Shared pages, no copy
+        yield f"{lineage}.{version}", transactions.scan(filters, batch=REPORT_BATCH_SIZE)
+        return
+
+    from sqlalchemy import create_engine, text
+    from schema import TRANSACTION_COLUMNS
+    from sql_store import read_data_version
+
+    conditions, params = filters.to_sql()
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = text(f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM budget_transactions {where} ORDER BY Date, Transaction_ID")
+    engine = create_engine(source[1])
+    try:
+        with engine.connect() as conn, conn.begin():  # One transaction: the version matches the rows read
+            version = read_data_version(conn)
+            result = conn.execution_options(stream_results=True, yield_per=REPORT_BATCH_SIZE).execute(query, params)
+            yield version, result.mappings()
+    finally:
+        engine.dispose()
+
+
+def period_of(day, bucket):
+    """"2024-03" for month buckets, the Monday starting the week ("2024-03-04") for week buckets."""
+    if bucket == "month":
+        return day[:7]
+    start = date.fromisoformat(day)
+    return (start - timedelta(days=start.weekday())).isoformat()
+
+
+def build_report(rows, bucket="month", top=50):
+    """One pass over the rows: per-group totals, per-period spending and the `top` largest overspends."""
+    groups, series, largest = {}, {}, []
+    periods = {}  # Date -> period, as many rows share a date
+    for row in rows:
+        group = (row["Subsidiary"], row["Sector"])
+        allocated, spent = row["Allocated_Budget"] or 0.0, row["Spent_Amount"] or 0.0
+        overspend = spent - allocated
+
+        totals = groups.get(group)
+        if totals is None:
+            totals = groups[group] = [0, 0.0, 0.0, 0.0, 0.0, 0, 0.0]
+        totals[0] += 1
+        totals[1] += allocated
+        totals[2] += spent
+        totals[3] += row["Remaining_Budget"] or 0.0
+        totals[4] += row["Revenue_Generated"] or 0.0
+        if overspend > 0:
+            totals[5] += 1
+            totals[6] += overspend
+            entry = (overspend, row["Transaction_ID"], row)
+            if len(largest) < top:
+                heapq.heappush(largest, entry)
+            elif entry[:2] > largest[0][:2]:
+                heapq.heapreplace(largest, entry)
+
+        day = str(row["Date"])
+        period = periods.get(day)
+        if period is None:
+            period = periods[day] = period_of(day, bucket)
+        point = series.get((period, *group))
+        if point is None:
+            point = series[(period, *group)] = [0, 0.0, 0.0]
+        point[0] += 1
+        point[1] += allocated
+        point[2] += spent
+
+    summary = [dict(zip(SECTIONS[0][2], (*group, totals[0], *(round(value, 2) for value in totals[1:5]), totals[5],
+                                         round(totals[6], 2))))
+               for group, totals in sorted(groups.items())]
+    if summary:
+        grand = [sum(values) for values in zip(*groups.values())]
+        summary.append(dict(zip(SECTIONS[0][2], ("All", "", grand[0], *(round(value, 2) for value in grand[1:5]), grand[5],
+                                                 round(grand[6], 2)))))
+    return {
+        "summary": summary,
+        "timeseries": [{"period": period, "Subsidiary": subsidiary, "Sector": sector, "transactions": point[0],
+                        "allocated": round(point[1], 2), "spent": round(point[2], 2)}
+                       for (period, subsidiary, sector), point in sorted(series.items())],
+        "overspend": [{"Transaction_ID": row["Transaction_ID"], "Date": str(row["Date"]), "Subsidiary": row["Subsidiary"],
+                       "Sector": row["Sector"], "User_ID": row["User_ID"], "Allocated_Budget": row["Allocated_Budget"],
+                       "Spent_Amount": row["Spent_Amount"], "overspend": round(overspend, 2)}
+                      for overspend, _, row in sorted(largest, key=lambda entry: entry[:2], reverse=True)],
+    }
+
+
+def describe(job):
+    """Title lines shared by every output format."""
+    filters = ", ".join(f"{name}={job['params'][name]}" for name in ("subsidiary", "sector", "date_from", "date_to")
+                        if job["params"][name]) or "none"
+    return [("Budget report", ""), ("Filters", filters), ("Data version", str(job["data_version"])),
+            ("Transactions", str(job["rows"])), ("Generated at", time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime()))]
+
+
+def write_csv(path, job, report):
+    """All sections in one CSV, each under a title row and separated by a blank row (opens as-is in Excel)."""
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerows(describe(job))
+        for section, title, columns in SECTIONS:
+            writer.writerows([[], [title], columns])
+            writer.writerows([row[column] for column in columns] for row in report[section])
+
+
+def write_xlsx(path, job, report):
+    """One sheet per section, written in streaming (write-only) mode."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    about = workbook.create_sheet("Report")
+    for line in describe(job):
+        about.append(list(line))
+    for section, title, columns in SECTIONS:
+        sheet = workbook.create_sheet(title[:31])  # Excel's sheet name limit
+        sheet.append(columns)
+        for row in report[section]:
+            sheet.append([row[column] for column in columns])
+    workbook.save(path)
+
+
+def write_pdf(path, job, report):
+    """Landscape A4 with one table per section; long tables repeat their header on every page."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    style = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f3b5a")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTSIZE", (0, 0), (-1, -1), 7),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#eef2f6")]),
+    ])
+    title, *details = describe(job)
+    story = [Paragraph(title[0], styles["Title"])]
+    story += [Paragraph(f"<b>{name}:</b> {value}", styles["Normal"]) for name, value in details]
+    for section, heading, columns in SECTIONS:
+        story += [Spacer(1, 12), Paragraph(heading, styles["Heading2"])]
+        rows = [[f"{row[column]:,.2f}" if isinstance(row[column], float) else row[column] for column in columns]
+                for row in report[section]]
+        if rows:
+            story.append(Table([columns] + rows, repeatRows=1, style=style))
+        else:
+            story.append(Paragraph("No rows.", styles["Normal"]))
+    SimpleDocTemplate(path, pagesize=landscape(A4), title="Budget report").build(story)
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "pdf": write_pdf}
+
+
+def job_path(directory, job_id):
+    return os.path.join(directory, f"{job_id}.json")
+
+
+def file_path(directory, job):
+    return os.path.join(directory, f"{job['id']}.{job['format']}")
+
+
+def save_job(directory, job, exclusive=False):
+    """Writes a job's state atomically; with exclusive=True, raises FileExistsError if the job already exists."""
+    path = job_path(directory, job["id"])
+    data = json.dumps(job).encode("utf-8")
+    if exclusive:
+        with open(path, "xb") as file:
+            file.write(data)
+        return
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, "wb") as file:
+        file.write(data)
+    os.replace(staging, path)
+
+
+def run_report(directory, job, source):
+    """Builds one report in a pool process, recording its progress in the job file."""
+    job.update(status="running", started_at=time.time())
+    save_job(directory, job)
+    try:
+        spec = job["params"]
+        filters = TransactionFilter(
+            date_from=spec["date_from"] and date.fromisoformat(spec["date_from"]),
+            date_to=spec["date_to"] and date.fromisoformat(spec["date_to"]),
+            equals={"Subsidiary": spec["subsidiary"], "Sector": spec["sector"]},
+        )
+        rows = 0
+
+        def counted(transactions):
+            nonlocal rows
+            for row in transactions:
+                rows += 1
+                yield row
+
+        with open_transactions(source, filters) as (version, transactions):
+            report = build_report(counted(transactions), spec["bucket"], spec["top"])
+        job.update(rows=rows, data_version=version)  # The version actually read (a newer one if the queued one is gone)
+
+        path = file_path(directory, job)
+        staging = f"{path}.tmp"
+        WRITERS[job["format"]](staging, job, report)
+        os.replace(staging, path)
+        job.update(status="done", finished_at=time.time(), size=os.path.getsize(path))
+    except Exception as error:
+        job.update(status="failed", finished_at=time.time(), error=f"{error.__class__.__name__}: {error}")
+    save_job(directory, job)
+    return job["status"]
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# 🔹 The queue (runs in the API worker)
+
+class ReportQueue:
+    """
+    Bounded queue of report jobs run by a process pool (started on first use).
+
+    A job's id is derived from its parameters and the data version, so identical requests made
+    before the data changes share one job, across API workers too: the first one to create the
+    job file queues it, the others just report its status.
+    """
+
+    def __init__(self, directory=REPORT_DIR, workers=REPORT_WORKERS, max_queued=MAX_QUEUED_REPORTS):
+        self.directory = directory
+        self.workers = workers
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+
+    def _pool(self):
+        if self._executor is None:
+            # "spawn": forking a threaded server process can copy held locks into the children
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def status(self, job_id):
+        """The job's state, or None. Jobs whose API worker exited before they finished are reported as failed."""
+        if not REPORT_ID.fullmatch(job_id):
+            return None
+        try:
+            with open(job_path(self.directory, job_id), "rb") as file:
+                job = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if job["status"] in ("queued", "running") and not pid_alive(job["owner"]):
+            job.update(status="failed", error="The server process running this report exited")
+        return job
+
+    def describe(self, job):
+        """Public view of a job, with a download link once it is done."""
+        view = {key: value for key, value in job.items() if key != "owner"}
+        if job["status"] == "done":
+            view["download"] = f"/reports/{job['id']}/download"
+        return view
+
+    def submit(self, spec, data_version, source):
+        """Queues the report `spec` of `data_version` read from `source` (see open_transactions), unless already queued or built."""
+        job_id = report_id(spec, data_version)
+        previous = self.status(job_id)
+        if previous is not None and previous["status"] != "failed":
+            return self.describe(previous)
+
+        with self._lock:
+            if self._pending >= self.max_queued:
+                raise HTTPException(status_code=503, detail="Too many reports in progress, please retry later")
+            self._pending += 1
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self.prune()
+            job = {"id": job_id, "status": "queued", "format": spec["format"], "params": spec,
+                   "data_version": data_version, "created_at": time.time(), "started_at": None, "finished_at": None,
+                   "rows": None, "size": None, "error": None, "owner": os.getpid()}
+            try:
+                save_job(self.directory, job, exclusive=previous is None)  # A failed job is simply retried
+            except FileExistsError:  # Another worker queued it first
+                self._release(None)
+                return self.describe(self.status(job_id))
+            future = self._pool().submit(run_report, self.directory, job, source)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(lambda done: self._release(done, job))
+        return self.describe(job)
+
+    def _release(self, future, job=None):
+        with self._lock:
+            self._pending -= 1
+        if future is None:
+            return
+        error = "Cancelled" if future.cancelled() else future.exception()
+        if error is not None:  # The pool process died, or the pool shut down before running the job
+            job.update(status="failed", finished_at=time.time(), error=str(error) or error.__class__.__name__)
+            save_job(self.directory, job)
+
+    def download(self, job_id):
+        job = self.status(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Report {job_id} not found")
+        if job["status"] != "done":
+            raise HTTPException(status_code=409, detail=f"Report {job_id} is {job['status']}")
+        return FileResponse(file_path(self.directory, job), media_type=REPORT_FORMATS[job["format"]][0],
+                            filename=f"budget_report_{job_id}.{job['format']}")
+
+    def prune(self):
+        """Deletes finished reports older than REPORT_TTL."""
+        cutoff = time.time() - REPORT_TTL
+        for entry in os.listdir(self.directory):
+            if not entry.endswith(".json"):
+                continue
+            job = self.status(entry[:-5])
+            if job is not None and job["finished_at"] and job["finished_at"] < cutoff:
+                for path in (file_path(self.directory, job), job_path(self.directory, job["id"])):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
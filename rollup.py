@@ -0,0 +1,114 @@
+import argparse
+from sqlalchemy import create_engine, text
+
+from sql_store import DATABASE_URL, bump_data_version, dialect_family
+
+MONTH_EXPR = {
+    "mysql": "DATE_SUB(Date, INTERVAL DAYOFMONTH(Date) - 1 DAY)",
+    "sqlite": "date(Date, 'start of month')",
+}
+
+UPSERT_SUFFIX = {
+    "mysql": """
+        ON DUPLICATE KEY UPDATE
+            transaction_count = transaction_count + VALUES(transaction_count),
+            total_allocated = total_allocated + VALUES(total_allocated),
+            total_spent = total_spent + VALUES(total_spent),
+            total_remaining = total_remaining + VALUES(total_remaining)
+    """,
+    "sqlite": """
+        ON CONFLICT (Subsidiary, Sector, {bucket}) DO UPDATE SET
+            transaction_count = transaction_count + excluded.transaction_count,
+            total_allocated = total_allocated + excluded.total_allocated,
+            total_spent = total_spent + excluded.total_spent,
+            total_remaining = total_remaining + excluded.total_remaining
+    """,
+}
+
+
+def month_of(date_value):
+    """First day of the month for a DATE value or a 'YYYY-MM-DD' string."""
+    if isinstance(date_value, str):
+        return date_value[:7] + "-01"
+    return date_value.replace(day=1).isoformat()
+
+
+def day_of(date_value):
+    return str(date_value)[:10]
+
+
+# Rollup table -> (bucket column, Python bucket function, SQL bucket expression per dialect)
+ROLLUPS = {
+    "budget_rollup": ("Month", month_of, MONTH_EXPR),
+    "budget_daily": ("Day", day_of, {"mysql": "Date", "sqlite": "Date"}),
+}
+
+
+def apply_to_rollup(conn, record, sign=1):
+    """
+    Adds (sign=1) or subtracts (sign=-1) one transaction from its (Subsidiary, Sector, Month)
+    row in budget_rollup and its (Subsidiary, Sector, Day) row in budget_daily.
+
+    Must run on the same connection/transaction as the write to budget_transactions so the
+    rollups can never drift from the raw rows.
+    """
+    apply_batch_to_rollup(conn, [record], sign)
+
+
+def apply_batch_to_rollup(conn, records, sign=1):
+    """Same as apply_to_rollup for many transactions: deltas are summed per bucket first, then upserted once each."""
+    for table, (bucket, bucket_of, _) in ROLLUPS.items():
+        deltas = {}
+        for record in records:
+            key = (record["Subsidiary"], record["Sector"], bucket_of(record["Date"]))
+            delta = deltas.setdefault(key, {
+                "Subsidiary": key[0], "Sector": key[1], "bucket": key[2],
+                "transaction_count": 0, "total_allocated": 0, "total_spent": 0, "total_remaining": 0,
+            })
+            delta["transaction_count"] += sign
+            delta["total_allocated"] += sign * (record["Allocated_Budget"] or 0)
+            delta["total_spent"] += sign * (record["Spent_Amount"] or 0)
+            delta["total_remaining"] += sign * (record["Remaining_Budget"] or 0)
+        if not deltas:
+            continue
+
+        params = list(deltas.values())
+        conn.execute(text(f"""
+            INSERT INTO {table}
+                (Subsidiary, Sector, {bucket}, transaction_count, total_allocated, total_spent, total_remaining)
+            VALUES
+                (:Subsidiary, :Sector, :bucket, :transaction_count, :total_allocated, :total_spent, :total_remaining)
+        """ + UPSERT_SUFFIX[dialect_family(conn)].format(bucket=bucket)), params)
+
+        if sign < 0:
+            conn.execute(text(f"""
+                DELETE FROM {table}
+                WHERE Subsidiary = :Subsidiary AND Sector = :Sector AND {bucket} = :bucket AND transaction_count <= 0
+            """), params)
+
+
+def rebuild_rollup(conn):
+    """Recomputes budget_rollup and budget_daily from budget_transactions (recovery after manual edits or bulk loads)."""
+    for table, (bucket, _, bucket_expr) in ROLLUPS.items():
+        conn.execute(text(f"DELETE FROM {table}"))
+        conn.execute(text(f"""
+            INSERT INTO {table}
+                (Subsidiary, Sector, {bucket}, transaction_count, total_allocated, total_spent, total_remaining)
+            SELECT
+                Subsidiary, Sector, {bucket_expr[dialect_family(conn)]} AS {bucket},
+                COUNT(*), SUM(Allocated_Budget), SUM(Spent_Amount), SUM(Remaining_Budget)
+            FROM budget_transactions
+            GROUP BY Subsidiary, Sector, {bucket}
+        """))
+    bump_data_version(conn)
+    return conn.execute(text("SELECT COUNT(*) FROM budget_rollup")).scalar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance commands for the budget_rollup and budget_daily tables.")
+    parser.add_argument("command", choices=["rebuild"], help="rebuild: recompute the rollups from raw transactions")
+    parser.parse_args()
+
+    with create_engine(DATABASE_URL).begin() as conn:
+        groups = rebuild_rollup(conn)
+    print(f"✅ Rebuilt budget_rollup: {groups} (Subsidiary, Sector, Month) rows.")
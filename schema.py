@@ -0,0 +1,86 @@
+import math
+from datetime import date
+
+TRANSACTION_COLUMNS = ["Transaction_ID", "Date", "Subsidiary", "Sector", "User_ID", "Allocated_Budget",
+                       "Spent_Amount", "Remaining_Budget", "Revenue_Generated", "Transaction_Type"]
+DIMENSION_COLUMNS = ["Subsidiary", "Sector", "User_ID", "Transaction_Type"]
+AMOUNT_COLUMNS = ["Allocated_Budget", "Spent_Amount", "Remaining_Budget", "Revenue_Generated"]
+
+# Widths of the varchar columns in migrations/0001_typed_schema
+MAX_LENGTHS = {"Transaction_ID": 32, "Subsidiary": 64, "Sector": 64, "User_ID": 32, "Transaction_Type": 32}
+
+
+def parse_transaction(row):
+    """Validates and type-casts one raw row (CSV/NDJSON/query values) into a transaction dict. Raises ValueError."""
+    transaction = {}
+
+    for column in ["Transaction_ID"] + DIMENSION_COLUMNS:
+        value = str(row.get(column) or "").strip()
+        if not value:
+            raise ValueError(f"{column} is required")
+        if len(value) > MAX_LENGTHS[column]:
+            raise ValueError(f"{column} is longer than {MAX_LENGTHS[column]} characters")
+        transaction[column] = value
+
+    try:
+        transaction["Date"] = date.fromisoformat(str(row.get("Date") or "").strip()[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"Date must be YYYY-MM-DD, got {row.get('Date')!r}") from None
+
+    for column in AMOUNT_COLUMNS:
+        value = row.get(column)
+        if value is None or value == "":
+            if column == "Remaining_Budget":
+                continue  # Derived below
+            raise ValueError(f"{column} is required")
+        try:
+            amount = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{column} must be a number, got {value!r}") from None
+        if not math.isfinite(amount):
+            raise ValueError(f"{column} must be finite")
+        transaction[column] = amount
+
+    transaction.setdefault("Remaining_Budget", transaction["Allocated_Budget"] - transaction["Spent_Amount"])
+    return {column: transaction[column] for column in TRANSACTION_COLUMNS}
+
+
+def clean_frame(df):
+    """
+    Vectorized parse_transaction for a DataFrame chunk read with dtype=str.
+
+    Returns (valid, rejected): valid has typed columns in TRANSACTION_COLUMNS order,
+    rejected keeps the raw values plus an Error column.
+    """
+    import pandas as pd  # Only the bulk loaders need pandas; keep it off the API servers' import path
+
+    missing = [column for column in TRANSACTION_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    df = df[TRANSACTION_COLUMNS]
+    valid = pd.DataFrame(index=df.index)
+    errors = pd.Series("", index=df.index)
+
+    for column in ["Transaction_ID"] + DIMENSION_COLUMNS:
+        values = df[column].fillna("").astype(str).str.strip()
+        errors = errors.mask((errors == "") & (values == ""), f"{column} is required")
+        errors = errors.mask((errors == "") & (values.str.len() > MAX_LENGTHS[column]),
+                             f"{column} is longer than {MAX_LENGTHS[column]} characters")
+        valid[column] = values
+
+    dates = pd.to_datetime(df["Date"].astype(str).str.strip().str[:10], format="%Y-%m-%d", errors="coerce")
+    errors = errors.mask((errors == "") & dates.isna(), "Date must be YYYY-MM-DD")
+    valid["Date"] = dates.dt.strftime("%Y-%m-%d")
+
+    for column in AMOUNT_COLUMNS:
+        amounts = pd.to_numeric(df[column], errors="coerce")
+        if column == "Remaining_Budget":
+            amounts = amounts.fillna(valid["Allocated_Budget"] - valid["Spent_Amount"])
+        bad = amounts.isna() | ~amounts.abs().lt(math.inf)
+        errors = errors.mask((errors == "") & bad, f"{column} must be a number")
+        valid[column] = amounts
+
+    ok = errors == ""
+    rejected = df[~ok].assign(Error=errors[~ok])
+    return valid.loc[ok, TRANSACTION_COLUMNS], rejected
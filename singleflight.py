@@ -0,0 +1,123 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a finished result is kept for late arrivals (0 = only share in-flight calls)
+SINGLEFLIGHT_TTL = float(os.getenv("SINGLEFLIGHT_TTL", "0"))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the function, the
+    others wait for it and share its result (or its exception).
+
+    Keys should include the data version, so a caller that arrives after a write never
+    shares a result computed before it. With `ttl` > 0, finished results are also kept for
+    that many seconds (at most `maxsize` of them).
+    """
+
+    def __init__(self, ttl=SINGLEFLIGHT_TTL, maxsize=256):
+        self._lock = threading.Lock()
+        self._calls = {}                # key -> _Call or asyncio.Future, while in flight
+        self._results = OrderedDict()   # key -> (expires_at, result), when ttl > 0
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.executions = 0   # Calls that actually ran the function
+        self.coalesced = 0    # Calls that waited on another caller's execution
+        self.cached = 0       # Calls answered from a finished result within the TTL
+
+    def _cached(self, key):
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] < time.monotonic():
+            del self._results[key]
+            return False, None
+        self.cached += 1
+        return True, entry[1]
+
+    def _finish(self, key, result, failed):
+        del self._calls[key]
+        if self.ttl > 0 and not failed:
+            self._results[key] = (time.monotonic() + self.ttl, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def do(self, key, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) once for every concurrent caller with the same key (thread-based callers)."""
+        with self._lock:
+            hit, result = self._cached(key)
+            if hit:
+                return result
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                self._finish(key, call.result, call.error is not None)
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """Same as do() for coroutine functions called from the event loop."""
+        with self._lock:
+            hit, result = self._cached(key)
+            if hit:
+                return result
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = asyncio.get_running_loop().create_future()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return await asyncio.shield(future)  # A cancelled waiter must not cancel the shared call
+
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as error:
+            with self._lock:
+                self._finish(key, None, True)
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
+                future.exception()  # Marks it retrieved, so an unwaited failure isn't logged as "never retrieved"
+            raise
+        with self._lock:
+            self._finish(key, result, False)
+        future.set_result(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"executions": self.executions, "coalesced": self.coalesced, "cached": self.cached,
+                    "in_flight": len(self._calls), "ttl": self.ttl}
@@ -0,0 +1,142 @@
+import contextlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only one worker process, the thread lock is enough
+    fcntl = None
+
+# Where the loader publishes snapshots; every worker on the host maps the same files
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", ".snapshot")
+KEEP_VERSIONS = 3  # Older versions stay on disk briefly for workers that are still opening them
+
+
+class SnapshotStore:
+    """
+    Versioned, memory-mapped columnar snapshots shared by all worker processes on a host.
+
+    Each version is a directory of .npy column files plus meta.json. `CURRENT` names the
+    latest version and is swapped atomically, so readers always see a complete snapshot.
+    Columns are opened with np.load(mmap_mode="c"): pages come from the shared OS page
+    cache (zero copy), and a worker that modifies an array only copies the pages it touches.
+
+    The (lineage, version) pair identifies a snapshot; the lineage is random per directory,
+    so a wiped directory never reuses an old version's ETag.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._current_stat = None
+        self._current = None
+
+    @property
+    def _current_path(self):
+        return os.path.join(self.directory, "CURRENT")
+
+    def current(self):
+        """(lineage, version, published_at) of the latest snapshot, or None. Re-read only when CURRENT changes."""
+        try:
+            stat = os.stat(self._current_path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key != self._current_stat:
+            with open(self._current_path) as file:
+                current = json.load(file)
+            self._current = (current["lineage"], current["version"], current["published_at"])
+            self._current_stat = key
+        return self._current
+
+    @contextlib.contextmanager
+    def writer(self):
+        """Exclusive across threads and worker processes: read the latest snapshot, apply a write, publish."""
+        with self._lock, self.exclusive("lock") as acquired:
+            yield acquired
+
+    @contextlib.contextmanager
+    def exclusive(self, name, blocking=True):
+        """flock on `name` in the snapshot directory; yields False instead of waiting when blocking=False and it's held."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "a") as lock_file:
+            acquired = True
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    acquired = False
+            try:
+                yield acquired
+            finally:
+                if acquired and fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def mark_synced(self):
+        """Records that the latest snapshot was just reconciled with the remote store (no new version needed)."""
+        pointer = os.path.join(self.directory, ".SYNCED.tmp")
+        with open(pointer, "w") as file:
+            json.dump({"synced_at": time.time()}, file)
+        os.replace(pointer, os.path.join(self.directory, "SYNCED"))
+
+    def synced_at(self):
+        try:
+            with open(os.path.join(self.directory, "SYNCED")) as file:
+                return json.load(file)["synced_at"]
+        except (FileNotFoundError, ValueError):
+            return 0.0
+
+    def publish(self, arrays, meta):
+        """Writes a new version (call inside writer()) and returns its (lineage, version)."""
+        current = self.current()
+        lineage = current[0] if current else os.urandom(6).hex()
+        version = current[1] + 1 if current else 1
+
+        name = f"v{version:012d}"
+        staging = os.path.join(self.directory, f".{name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for column, values in arrays.items():
+            np.save(os.path.join(staging, f"{column}.npy"), values)
+        with open(os.path.join(staging, "meta.json"), "w") as file:
+            json.dump(meta, file)
+        os.replace(staging, os.path.join(self.directory, name))
+
+        pointer = os.path.join(self.directory, ".CURRENT.tmp")
+        with open(pointer, "w") as file:
+            json.dump({"lineage": lineage, "version": version, "path": name, "published_at": time.time()}, file)
+        os.replace(pointer, self._current_path)
+
+        # Workers that already mapped an older version keep their pages after the files are unlinked
+        versions = sorted(entry for entry in os.listdir(self.directory) if entry.startswith("v"))
+        for old in versions[:-KEEP_VERSIONS]:
+            shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+        return lineage, version
+
+    def open(self, version=None):
+        """
+        Maps the latest snapshot: returns (lineage, version, arrays, meta), or None if nothing is published.
+        With `version`, maps that one instead while it is still kept on disk (the latest otherwise).
+        """
+        for _ in range(3):
+            current = self.current()
+            if current is None:
+                return None
+            if version is not None and version != current[1] and \
+                    os.path.exists(os.path.join(self.directory, f"v{version:012d}", "meta.json")):
+                current = (current[0], version, None)
+            path = os.path.join(self.directory, f"v{current[1]:012d}")
+            try:
+                with open(os.path.join(path, "meta.json")) as file:
+                    meta = json.load(file)
+                arrays = {entry[:-4]: np.load(os.path.join(path, entry), mmap_mode="c")
+                          for entry in os.listdir(path) if entry.endswith(".npy")}
+                return current[0], current[1], arrays, meta
+            except FileNotFoundError:
+                self._current_stat = None  # Superseded and cleaned up while opening; retry with the newer one
+        raise RuntimeError(f"Could not open a stable snapshot in {self.directory}")
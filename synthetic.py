@@ -0,0 +1,125 @@
+import argparse
+import time
+from datetime import date
+
+import numpy as np
+
+from schema import TRANSACTION_COLUMNS
+
+# Seeded synthetic transactions at any scale, shaped like dataset_company_budget_allocation_dashboard.csv:
+# same schema and value ranges, but with skewed subsidiaries/sectors/users and a realistic spread of dates.
+
+BLOCK_SIZE = 100_000  # Rows per generated block; each block has its own seed, so output doesn't depend on chunking
+
+SECTORS = ["R&D", "IT", "Marketing", "Operations", "HR"]  # Most to least active, as in the sample CSV
+SECTOR_SCALE = {"R&D": 1.3, "IT": 1.1, "Marketing": 1.0, "Operations": 0.9, "HR": 0.7}
+TRANSACTION_TYPES = {"Expense": 41, "Salary Payment": 41, "Investment": 36, "Operational Cost": 32}  # Sample counts
+ZERO_REVENUE_SHARE = 0.55  # Share of sample rows with Revenue_Generated == 0
+
+
+def subsidiary_names(count):
+    """Branch A, Branch B, ..., Branch Z, Branch AA, ..."""
+    names = []
+    for index in range(count):
+        label = ""
+        index += 1
+        while index:
+            index, remainder = divmod(index - 1, 26)
+            label = chr(ord("A") + remainder) + label
+        names.append(f"Branch {label}")
+    return names
+
+
+def zipf_weights(count, skew):
+    """Probabilities proportional to 1 / rank**skew (skew=0 is uniform)."""
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+
+def day_weights(start, days):
+    """Fewer transactions at weekends, more in the last week of each quarter."""
+    dates = np.datetime64(start) + np.arange(days)
+    weekday = (dates.astype("datetime64[D]").view("int64") - 4) % 7  # 1970-01-01 was a Thursday; 0 = Monday
+    weights = np.where(weekday >= 5, 0.3, 1.0)
+    month = dates.astype("datetime64[M]").astype(int) % 12 + 1
+    next_month_start = (dates.astype("datetime64[M]") + 1).astype("datetime64[D]")
+    quarter_end = np.isin(month, (3, 6, 9, 12)) & ((next_month_start - dates).astype(int) <= 7)
+    weights = weights * np.where(quarter_end, 1.8, 1.0)
+    return dates, weights / weights.sum()
+
+
+def generate_columns(count, seed=0, start=date(2024, 1, 1), days=365, subsidiaries=3, users=200, skew=1.0,
+                     id_prefix="T"):
+    """Yields blocks of up to BLOCK_SIZE transactions as {column: numpy array}."""
+    subsidiary_values = np.array(subsidiary_names(subsidiaries), dtype=object)
+    subsidiary_p = zipf_weights(subsidiaries, skew * 0.5)  # Milder than sectors: branches are similar in size
+    sector_values = np.array(SECTORS, dtype=object)
+    sector_p = zipf_weights(len(SECTORS), skew * 0.5)
+    sector_scale = np.array([SECTOR_SCALE[sector] for sector in SECTORS])
+    width = max(3, len(str(users)))
+    user_values = np.array([f"U{index:0{width}d}" for index in range(1, users + 1)], dtype=object)
+    user_p = zipf_weights(users, skew)
+    type_values = np.array(list(TRANSACTION_TYPES), dtype=object)
+    type_p = np.array(list(TRANSACTION_TYPES.values()), dtype=float)
+    type_p /= type_p.sum()
+    dates, date_p = day_weights(start, days)
+    id_width = max(8, len(str(count)))
+
+    for block, offset in enumerate(range(0, count, BLOCK_SIZE)):
+        rng = np.random.default_rng([seed, block])
+        size = min(BLOCK_SIZE, count - offset)
+        sector = rng.choice(len(SECTORS), size, p=sector_p)
+        allocated = np.clip(rng.lognormal(np.log(25_000), 0.5, size) * sector_scale[sector], 1_000, 500_000)
+        spent = allocated * rng.beta(4, 3, size) * 1.4  # Roughly a quarter of rows overspend, like the sample
+        revenue = np.where(rng.random(size) < ZERO_REVENUE_SHARE, 0.0, rng.lognormal(np.log(35_000), 0.6, size))
+        allocated, spent, revenue = allocated.round(2), spent.round(2), revenue.round(2)
+        yield {
+            "Transaction_ID": np.array([f"{id_prefix}{number:0{id_width}d}" for number in range(offset + 1, offset + size + 1)],
+                                       dtype=object),
+            "Date": rng.choice(dates, size, p=date_p).astype(str).astype(object),
+            "Subsidiary": subsidiary_values[rng.choice(subsidiaries, size, p=subsidiary_p)],
+            "Sector": sector_values[sector],
+            "User_ID": user_values[rng.choice(users, size, p=user_p)],
+            "Allocated_Budget": allocated,
+            "Spent_Amount": spent,
+            "Remaining_Budget": (allocated - spent).round(2),
+            "Revenue_Generated": revenue,
+            "Transaction_Type": type_values[rng.choice(len(type_values), size, p=type_p)],
+        }
+
+
+def generate_transactions(count, seed=0, **options):
+    """Yields `count` transaction dicts (same keys and types as schema.parse_transaction returns)."""
+    for columns in generate_columns(count, seed, **options):
+        values = [columns[column].tolist() for column in TRANSACTION_COLUMNS]
+        for row in zip(*values):
+            yield dict(zip(TRANSACTION_COLUMNS, row))
+
+
+def write_csv(path, count, seed=0, **options):
+    """Writes the generated rows to a CSV that database.py and upload_to_firebase.py can load."""
+    import pandas as pd
+
+    header = True
+    for columns in generate_columns(count, seed, **options):
+        pd.DataFrame(columns, columns=TRANSACTION_COLUMNS).to_csv(path, mode="w" if header else "a", header=header,
+                                                                  index=False)
+        header = False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic budget transactions as a CSV.")
+    parser.add_argument("count", type=int, help="number of transactions")
+    parser.add_argument("--output", default="synthetic_transactions.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2024, 1, 1), help="first date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=365, help="number of days the dates are spread over")
+    parser.add_argument("--subsidiaries", type=int, default=3)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for users (half of it for subsidiaries and sectors)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    write_csv(args.output, args.count, args.seed, start=args.start, days=args.days, subsidiaries=args.subsidiaries,
+              users=args.users, skew=args.skew)
+    print(f"✅ Wrote {args.count:,} transactions to {args.output} in {time.perf_counter() - started:.1f}s")
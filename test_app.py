@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+import app
+from migrate import migrate
+
+ROW = {"Transaction_ID": "A1", "Date": "2024-03-15", "Subsidiary": "Branch A", "Sector": "HR", "User_ID": "U001",
+       "Allocated_Budget": 100.0, "Spent_Amount": 40.0, "Remaining_Budget": 60.0, "Revenue_Generated": 0.0,
+       "Transaction_Type": "Expense"}
+
+
+@pytest.fixture(scope="module")
+def client():
+    migrate(app.engine)
+    with app.engine.begin() as conn:
+        for table in ("budget_transactions", "budget_rollup", "budget_daily"):
+            conn.execute(text(f"DELETE FROM {table}"))
+    with TestClient(app.app) as test_client:
+        yield test_client
+
+
+def rollup_days():
+    with app.engine.connect() as conn:
+        return [row[0] for row in conn.execute(text("SELECT Day FROM budget_daily ORDER BY Day"))]
+
+
+def test_add_rejects_bad_date(client):
+    response = client.post("/transactions/add", params={**ROW, "Date": "03/15/2024"})
+    assert response.status_code == 400
+    assert "Date" in response.json()["detail"]
+    assert rollup_days() == []
+
+    assert client.post("/transactions/add", params=ROW).status_code == 200
+    assert rollup_days() == ["2024-03-15"]
+
+
+def test_update_rejects_bad_values(client):
+    assert client.put("/transactions/update/A1", params={"Date": "15.03.2024"}).status_code == 400
+    assert client.put("/transactions/update/A1", params={"Spent_Amount": "nan"}).status_code == 400
+    assert rollup_days() == ["2024-03-15"]
+
+    assert client.put("/transactions/update/A1", params={"Date": "2024-04-01"}).status_code == 200
+    assert rollup_days() == ["2024-04-01"]
+
+
+def test_reads_use_the_middlewares_data_version(client):
+    checkouts = []
+
+    def count(*args):
+        checkouts.append(args)
+
+    event.listen(app.engine.pool, "checkout", count)
+    try:
+        assert client.get("/budget/query", params={"dimensions": "Sector,User_ID"}).status_code == 200
+        assert client.get("/budget/Branch A").status_code == 200
+    finally:
+        event.remove(app.engine.pool, "checkout", count)
+    assert len(checkouts) == 4  # One version read in the middleware, one query each
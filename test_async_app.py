@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app
+import async_app
+from migrate import migrate
+from schema import parse_transaction
+from synthetic import generate_transactions
+
+
+@pytest.fixture(scope="module")
+def clients():
+    migrate(app.engine)
+    with app.engine.begin() as conn:
+        for table in ("budget_transactions", "budget_rollup", "budget_daily"):
+            conn.execute(text(f"DELETE FROM {table}"))
+        rows = [parse_transaction(row) for row in generate_transactions(400, seed=3, days=60)]
+        app.insert_transactions_batch(conn, list(enumerate(rows)))
+    with TestClient(app.app) as sync_client, TestClient(async_app.app) as async_client:
+        yield sync_client, async_client
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/budget/summary", {}),
+    ("/budget/Branch A", {}),
+    ("/budget/No Such Branch", {}),
+    ("/budget/query", {"dimensions": "Sector,month", "measures": "count,sum:Spent_Amount"}),
+    ("/budget/timeseries/burn", {"bucket": "week", "sector": "IT"}),
+    ("/budget/timeseries/cumulative", {"subsidiary": "Branch A"}),
+    ("/budget/timeseries/rolling", {"window": 7, "date_from": "2024-01-15"}),
+    ("/budget/timeseries/negative", {}),
+    ("/transactions", {"limit": 25, "sector": "HR"}),
+    ("/transactions", {"format": "ndjson", "fields": "Date,Spent_Amount"}),
+    ("/transactions", {"subsidiary": "No Such Branch"}),
+])
+def test_async_routes_match_app(clients, path, params):
+    sync_client, async_client = clients
+    expected, got = sync_client.get(path, params=params), async_client.get(path, params=params)
+    assert got.status_code == expected.status_code
+    assert got.content == expected.content
+    assert got.headers.get("x-next-cursor") == expected.headers.get("x-next-cursor")
+
+
+def test_async_reports_share_the_queue(clients):
+    _, async_client = clients
+    job = async_client.post("/reports", params={"sector": "IT"})
+    assert job.status_code == 202, job.text
+    assert async_client.get(f"/reports/{job.json()['id']}").status_code == 200
+    assert async_client.get("/reports/no-such-report").status_code == 404
+
+
+def test_reads_use_the_middlewares_data_version(clients):
+    _, async_client = clients
+    before = async_app.pool_stats.checkouts
+    assert async_client.get("/budget/query", params={"dimensions": "User_ID,Sector"}).status_code == 200
+    assert async_client.get("/budget/timeseries/negative", params={"sector": "IT"}).status_code == 200
+    assert async_app.pool_stats.checkouts - before == 4  # One version read in the middleware, one query each
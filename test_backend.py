@@ -0,0 +1,217 @@
+import math
+import operator
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend
+from changelog import replay
+from columnar import ColumnarTransactions
+from fake_firebase import FakeDatabase
+from firebase_store import TRANSACTIONS_PATH
+from synthetic import generate_transactions
+
+ROWS = {record["Transaction_ID"]: record for record in generate_transactions(3000, seed=8, users=25)}
+
+
+@pytest.fixture(scope="module")
+def client():
+    backend.db = FakeDatabase({TRANSACTIONS_PATH.strip("/"): ROWS})
+    try:
+        with TestClient(backend.app) as client:
+            yield client
+    finally:
+        backend.db = None
+
+
+def ids(response):
+    assert response.status_code == 200, response.text
+    return [row["Transaction_ID"] for row in response.json()]
+
+
+def top(rows, value, limit, largest=True):
+    return [row["Transaction_ID"] for row in sorted(rows, key=lambda row: (value(row), row["Transaction_ID"]),
+                                                   reverse=largest)[:limit]]
+
+
+def ratio(row):
+    spent, allocated = row["Spent_Amount"], row["Allocated_Budget"]
+    return spent / allocated if allocated else (math.inf if spent > 0 else 0.0)
+
+
+def test_overspent(client):
+    overspent = [row for row in ROWS.values() if row["Remaining_Budget"] < 0]
+    assert ids(client.get("/budget/exceptions/overspent", params={"limit": 7})) == \
+        top(overspent, lambda row: row["Remaining_Budget"], 7, largest=False)
+
+    group = [row for row in overspent if (row["Subsidiary"], row["Sector"]) == ("Branch B", "IT")]
+    response = client.get("/budget/exceptions/overspent", params={"subsidiary": "Branch B", "sector": "IT", "limit": 4})
+    assert ids(response) == top(group, lambda row: row["Remaining_Budget"], 4, largest=False)
+
+
+def test_utilization(client):
+    busy = [row for row in ROWS.values() if ratio(row) >= 0.8]
+    params = {"level": "transaction", "min_ratio": 0.8, "limit": 5}
+    response = client.get("/budget/exceptions/utilization", params=params)
+    assert ids(response) == top(busy, ratio, 5)
+
+    groups = client.get("/budget/exceptions/utilization", params={"level": "sector", "min_ratio": 0}).json()
+    for group in groups:
+        rows = [row for row in ROWS.values() if row["Sector"] == group["Sector"]]
+        spent, allocated = sum(row["Spent_Amount"] for row in rows), sum(row["Allocated_Budget"] for row in rows)
+        assert group["utilization"] == pytest.approx(round(spent / allocated, 4))
+    ratios = [group["utilization"] for group in groups]
+    assert ratios == sorted(ratios, reverse=True)
+
+
+def test_spends(client):
+    user = next(iter(ROWS.values()))["User_ID"]
+    by_user = [row for row in ROWS.values() if row["User_ID"] == user]
+    assert ids(client.get("/budget/exceptions/spends", params={"user_id": user, "limit": 3})) == \
+        top(by_user, lambda row: row["Spent_Amount"], 3)
+    assert ids(client.get("/budget/exceptions/spends", params={"limit": 3})) == \
+        top(ROWS.values(), lambda row: row["Spent_Amount"], 3)
+    assert client.get("/budget/exceptions/spends", params={"subsidiary": "No Such Branch"}).json() == []
+    assert client.get("/budget/exceptions/spends", params={"user_id": user, "sector": "HR"}).status_code == 400
+
+
+def test_rankings_follow_writes(client):
+    record = {**next(iter(ROWS.values())), "Transaction_ID": "X-overspent", "Spent_Amount": 9_999_999.0,
+              "Allocated_Budget": 1.0, "Remaining_Budget": -9_999_998.0}
+    assert client.post("/transactions/add", params=record).status_code == 200
+    assert ids(client.get("/budget/exceptions/overspent", params={"limit": 1})) == ["X-overspent"]
+    assert ids(client.get("/budget/exceptions/spends", params={"user_id": record["User_ID"], "limit": 1})) == \
+        ["X-overspent"]
+
+    assert client.delete("/transactions/delete/X-overspent").status_code == 200
+    overspent = [row for row in ROWS.values() if row["Remaining_Budget"] < 0]
+    assert ids(client.get("/budget/exceptions/overspent", params={"limit": 1})) == \
+        top(overspent, lambda row: row["Remaining_Budget"], 1, largest=False)
+
+
+def test_validation(client):
+    assert client.get("/budget/exceptions/overspent", params={"limit": 0}).status_code == 422
+    assert client.get("/budget/exceptions/utilization", params={"level": "region"}).status_code == 422
+
+
+def test_writes_are_logged_and_published_in_batches(client, monkeypatch):
+    monkeypatch.setattr(backend, "SNAPSHOT_PUBLISH_DELAY", 3600)
+    backend.publish_pending()
+    version = backend.snapshots.current()[1]
+    etag = client.get("/budget/subsidiary/Branch A").headers["etag"]
+
+    record = {**next(iter(ROWS.values())), "Transaction_ID": "X-logged", "Sector": "Logged"}
+    assert client.post("/transactions/add", params=record).status_code == 200
+    assert client.put("/transactions/update/X-logged", params={"Spent_Amount": 12.5}).status_code == 200
+    assert backend.snapshots.current()[1] == version  # No new snapshot per write...
+    assert client.get("/budget/subsidiary/Branch A").headers["etag"] != etag  # ...but a new ETag
+    assert backend.data_version.current == backend.change_log.last_seq()
+
+    # Another worker maps the same snapshot and replays the log past it
+    _, _, arrays, meta = backend.snapshots.open()
+    other = ColumnarTransactions()
+    other.attach(arrays, meta["dictionaries"])
+    replay(other, backend.change_log.since(meta["seq"], 1000)["changes"])
+    assert other.fingerprint() == backend.transactions.fingerprint()
+    assert other.get("X-logged")["Spent_Amount"] == 12.5
+
+    totals, daily = backend.aggregates.totals(), backend.timeseries.export()
+    with backend.attach_lock:
+        backend.attach_snapshot()  # A restarted worker: snapshot totals plus the replayed entries
+    assert backend.aggregates.totals().keys() == totals.keys()
+    for group, values in backend.aggregates.totals().items():
+        assert values == pytest.approx(totals[group])
+    by_day = operator.itemgetter("Subsidiary", "Sector", "day")
+    assert [pytest.approx(row) for row in sorted(backend.timeseries.export(), key=by_day)] == sorted(daily, key=by_day)
+
+    backend.publish_pending()  # Debounced publish
+    assert backend.snapshots.current()[1] == version + 1
+    assert backend.snapshots.open()[3]["seq"] == backend.change_log.last_seq()
+
+    monkeypatch.setattr(backend, "SNAPSHOT_PUBLISH_CHANGES", 2)
+    assert client.delete("/transactions/delete/X-logged").status_code == 200
+    assert backend.snapshots.current()[1] == version + 1
+    assert client.post("/transactions/add", params=record).status_code == 200
+    assert backend.snapshots.current()[1] == version + 2  # Every SNAPSHOT_PUBLISH_CHANGES changes
+    assert client.delete("/transactions/delete/X-logged").status_code == 200
+
+
+def group_totals(rows, column, value):
+    """Brute-force /budget/subsidiary/{value} (column="Subsidiary") or /budget/sector/{value}, keyed by the other."""
+    other = "Sector" if column == "Subsidiary" else "Subsidiary"
+    groups = {}
+    for row in rows:
+        if row[column] == value:
+            group = groups.setdefault(row[other], {"total_allocated": 0.0, "total_spent": 0.0, "total_remaining": 0.0})
+            group["total_allocated"] += row["Allocated_Budget"]
+            group["total_spent"] += row["Spent_Amount"]
+            group["total_remaining"] += row["Remaining_Budget"]
+    return groups
+
+
+def cumulative(rows, subsidiary, sector):
+    """Brute-force /budget/timeseries/cumulative for one group: running totals at each day with transactions."""
+    days = {}
+    for row in rows:
+        if (row["Subsidiary"], row["Sector"]) == (subsidiary, sector):
+            day = days.setdefault(row["Date"], [0.0, 0.0])
+            day[0] += row["Spent_Amount"]
+            day[1] += row["Allocated_Budget"]
+    spent = allocated = 0.0
+    running = []
+    for day in sorted(days):
+        spent, allocated = spent + days[day][0], allocated + days[day][1]
+        running.append((day, spent, allocated))
+    return running
+
+
+def assert_groups_match(client, live, subsidiaries, sectors):
+    for column, path, values in (("Subsidiary", "subsidiary", subsidiaries), ("Sector", "sector", sectors)):
+        for value in values:
+            response = client.get(f"/budget/{path}/{value}")
+            assert response.status_code == 200, response.text
+            other = "Sector" if column == "Subsidiary" else "Subsidiary"
+            got = {row.pop(other): row for row in response.json()}
+            expected = group_totals(live.values(), column, value)
+            assert got.keys() == expected.keys()
+            for group, totals in got.items():
+                assert totals == pytest.approx(expected[group])
+
+    for subsidiary in subsidiaries:
+        for sector in sectors:
+            params = {"subsidiary": subsidiary, "sector": sector}
+            got = [(row["Date"], row["cumulative_spent"], row["cumulative_allocated"])
+                   for row in client.get("/budget/timeseries/cumulative", params=params).json()]
+            assert got == pytest.approx(cumulative(live.values(), subsidiary, sector))
+
+
+def test_update_moves_a_row_between_groups(client):
+    original = next(row for row in ROWS.values() if (row["Subsidiary"], row["Sector"]) == ("Branch A", "IT"))
+    transaction_id = original["Transaction_ID"]
+    changes = {"Subsidiary": "Branch C", "Sector": "Moved", "Date": "2024-02-29", "Spent_Amount": 5_000_000.0,
+               "Remaining_Budget": -4_990_000.0}
+    live = dict(ROWS)
+    assert client.put(f"/transactions/update/{transaction_id}", params=changes).status_code == 200
+    live[transaction_id] = {**original, **changes}
+
+    assert_groups_match(client, live, ["Branch A", "Branch C"], ["IT", "Moved"])
+    overspent = [row for row in live.values() if row["Remaining_Budget"] < 0]
+    assert ids(client.get("/budget/exceptions/overspent", params={"limit": 5})) == \
+        top(overspent, lambda row: row["Remaining_Budget"], 5, largest=False)
+    assert ids(client.get("/budget/exceptions/spends", params={"subsidiary": "Branch C", "sector": "Moved"})) == \
+        [transaction_id]
+    assert ids(client.get("/budget/exceptions/spends", params={"subsidiary": "Branch A", "sector": "IT", "limit": 5})) \
+        == top([row for row in live.values() if (row["Subsidiary"], row["Sector"]) == ("Branch A", "IT")],
+               lambda row: row["Spent_Amount"], 5)
+    busy = [row for row in live.values() if ratio(row) >= 0.9]
+    assert ids(client.get("/budget/exceptions/utilization",
+                          params={"level": "transaction", "min_ratio": 0.9, "limit": 5})) == top(busy, ratio, 5)
+
+    # And back: every total returns to the original rows
+    restore = {column: original[column] for column in changes}
+    assert client.put(f"/transactions/update/{transaction_id}", params=restore).status_code == 200
+    assert_groups_match(client, ROWS, ["Branch A", "Branch C"], ["IT"])
+    assert client.get("/budget/sector/Moved").status_code == 404  # The emptied group is gone
+    moved_group = {"subsidiary": "Branch C", "sector": "Moved"}
+    assert client.get("/budget/timeseries/cumulative", params=moved_group).json() == []
+    assert ids(client.get("/budget/exceptions/spends", params=moved_group)) == []
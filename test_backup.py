@@ -0,0 +1,140 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import backup
+from migrate import migrate
+from sql_store import bump_data_version, upsert_transactions
+from synthetic import generate_transactions
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "PART_ROWS", 300)  # Several parts, so restores load them in parallel
+    monkeypatch.setattr(backup, "ROW_GROUP_ROWS", 100)
+    url = f"sqlite:///{tmp_path / 'source.db'}"
+    engine = create_engine(url)
+    migrate(engine)
+    write(engine, list(generate_transactions(1000, seed=6)))
+    yield engine, url
+    engine.dispose()
+
+
+def write(engine, rows=(), deleted=()):
+    """One write transaction: upserts `rows`, deletes `deleted` and logs both in budget_changes."""
+    with engine.begin() as conn:
+        upsert_transactions(conn, list(rows))
+        for transaction_id in deleted:
+            conn.execute(text("DELETE FROM budget_transactions WHERE Transaction_ID = :id"), {"id": transaction_id})
+        bump_data_version(conn, [row["Transaction_ID"] for row in rows] + list(deleted))
+
+
+def dump(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT * FROM budget_transactions ORDER BY Transaction_ID").fetchall()
+
+
+def some_writes(engine, seed):
+    """Updates 40 rows, adds 60, deletes 20 (plus an unknown ID) and rewrites one new row, over three transactions."""
+    with engine.connect() as conn:
+        current = [dict(row) for row in conn.execute(
+            text("SELECT * FROM budget_transactions ORDER BY Transaction_ID")).mappings()]
+    existing = [{**row, "Spent_Amount": 1.25, "Sector": "Moved"} for row in current[seed * 10:seed * 10 + 40]]
+    rows = generate_transactions(60, seed=seed)
+    new = [{**row, "Transaction_ID": f"N{seed}-{index}"} for index, row in enumerate(rows)]
+    doomed = [row["Transaction_ID"] for row in current[500 + seed * 20:520 + seed * 20]]
+    write(engine, existing + new)
+    write(engine, deleted=doomed + ["never-existed"])
+    write(engine, [{**new[0], "Spent_Amount": 2.5}])  # Changed twice between backups: the last version wins
+
+
+def test_full_incremental_restore_round_trip(source, tmp_path):
+    engine, url = source
+    directory = str(tmp_path / "backups")
+    full = backup.backup(backup.SqlSource(url), directory)
+    assert (full["kind"], full["rows"], len(full["files"])) == ("full", 1000, 4)
+    assert backup.backup(backup.SqlSource(url), directory) is None  # Nothing changed
+
+    some_writes(engine, 1)
+    first = backup.backup(backup.SqlSource(url), directory)
+    assert (first["kind"], first["since"], first["deleted"]) == ("incremental", full["version"], 21)
+    as_of_first = dump(tmp_path / "source.db")
+
+    some_writes(engine, 2)
+    second = backup.backup(backup.SqlSource(url), directory)
+    assert (second["kind"], second["since"]) == ("incremental", first["version"])
+
+    manifest = backup.read_manifest(directory)
+    assert backup.verify(directory, manifest["backups"]) == []
+    chain = backup.restore_chain(manifest)
+    assert [entry["name"] for entry in chain] == [full["name"], first["name"], second["name"]]
+
+    restored = tmp_path / "restored.db"
+    backup.restore_sql(directory, chain, f"sqlite:///{restored}", workers=4)
+    assert dump(restored) == dump(tmp_path / "source.db")
+
+    earlier = tmp_path / "earlier.db"
+    backup.restore_sql(directory, backup.restore_chain(manifest, first["version"]), f"sqlite:///{earlier}")
+    assert dump(earlier) == as_of_first
+
+    with sqlite3.connect(restored) as conn:  # Rollups rebuilt from the restored rows
+        assert conn.execute("SELECT SUM(total_spent) FROM budget_rollup").fetchone()[0] == \
+            pytest.approx(conn.execute("SELECT SUM(Spent_Amount) FROM budget_transactions").fetchone()[0])
+
+
+def test_corrupted_segment_fails_the_checksum(source, tmp_path):
+    engine, url = source
+    directory = tmp_path / "backups"
+    backup.backup(backup.SqlSource(url), str(directory))
+    some_writes(engine, 1)
+    segment = backup.backup(backup.SqlSource(url), str(directory))
+
+    path = directory / segment["files"][0]["path"]
+    data = bytearray(path.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    problems = backup.verify(str(directory), backup.read_manifest(str(directory))["backups"])
+    assert problems == [f"{segment['files'][0]['path']}: checksum mismatch"]
+    path.unlink()
+    assert backup.verify(str(directory), [segment]) == [f"{segment['files'][0]['path']}: missing"]
+
+
+def test_lineage_or_version_mismatch_takes_a_full_backup(source, tmp_path):
+    engine, url = source
+    directory = str(tmp_path / "backups")
+    full = backup.backup(backup.SqlSource(url), directory)
+
+    # The change log only reaches back to the last full backup's version
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM budget_changes")).scalar() == 0
+        assert conn.execute(text("SELECT changes_start FROM data_version")).scalar() == full["version"]
+
+    # Behind the change log (e.g. it was trimmed by another backup directory): full
+    some_writes(engine, 1)
+    elsewhere = str(tmp_path / "elsewhere")
+    backup.backup(backup.SqlSource(url), elsewhere)
+    some_writes(engine, 2)
+    behind = backup.backup(backup.SqlSource(url), directory)
+    assert behind["kind"] == "full"
+
+    # Ahead of the database (it was recreated at a lower version under the same URL): full
+    (tmp_path / "source.db").unlink()
+    engine.dispose()
+    migrate(engine)
+    write(engine, list(generate_transactions(50, seed=9)))
+    entry = backup.backup(backup.SqlSource(url), directory)
+    assert entry["kind"] == "full" and entry["rows"] == 50 and entry["version"] < behind["version"]
+
+    # A different database: full, and the old lineage's files are dropped
+    other_url = f"sqlite:///{tmp_path / 'other.db'}"
+    other = create_engine(other_url)
+    migrate(other)
+    write(other, list(generate_transactions(20, seed=10)))
+    entry = backup.backup(backup.SqlSource(other_url), directory)
+    other.dispose()
+    manifest = backup.read_manifest(directory)
+    assert entry["kind"] == "full" and [kept["name"] for kept in manifest["backups"]] == [entry["name"]]
+    assert manifest["lineage"] == backup.SqlSource(other_url).lineage
+    assert sorted(path.name for path in (tmp_path / "backups").iterdir()) == [entry["name"], "manifest.json"]
@@ -0,0 +1,218 @@
+import functools
+import math
+import random
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import columnar
+from columnar import RANKINGS, ColumnarTransactions
+from pagination import TransactionFilter
+from schema import AMOUNT_COLUMNS
+from synthetic import generate_transactions
+
+# Random add / replace / delete / extend sequences, checked against a plain dict of the surviving rows
+
+
+def random_writes(store, live, operations, seed):
+    """Applies `operations` random writes to both `store` and `live` ({Transaction_ID: record})."""
+    rng = random.Random(seed)
+    templates = list(generate_transactions(200, seed=seed + 1, users=20))
+    ids = list(live)
+    for step in range(operations):
+        choice = rng.random()
+        if choice < 0.3:
+            record = {**rng.choice(templates), "Transaction_ID": f"N{seed}-{step}"}
+            record["Allocated_Budget"] = rng.choice([0.0, 10.0, record["Allocated_Budget"]])
+            store.add(record)
+            live[record["Transaction_ID"]] = record
+            ids.append(record["Transaction_ID"])
+        elif choice < 0.5 and live:
+            transaction_id = rng.choice(list(live))
+            record = {**live[transaction_id], "Sector": rng.choice(["HR", "IT", "New Sector"]),
+                      "Date": f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+                      "Spent_Amount": round(rng.uniform(0, 5e4), 2)}
+            store.add(record)
+            live[transaction_id] = record
+        elif choice < 0.98 and ids:
+            transaction_id = rng.choice(ids if rng.random() < 0.2 or not live else list(live))  # Sometimes already gone
+            removed = store.remove(transaction_id)
+            assert (removed is None) == (transaction_id not in live)
+            if removed is not None:
+                assert removed["Transaction_ID"] == transaction_id
+                del live[transaction_id]
+        elif choice >= 0.98:
+            batch = [{**rng.choice(templates), "Transaction_ID": f"B{seed}-{step}-{index}"} for index in range(20)]
+            batch.append({**batch[0], "Spent_Amount": 1.0})  # A repeated ID inside one batch: the last copy wins
+            if live:
+                batch.append({**live[rng.choice(list(live))], "Remaining_Budget": -1.0})
+            store.extend(batch)
+            for record in batch:
+                live[record["Transaction_ID"]] = record
+                ids.append(record["Transaction_ID"])
+
+
+def frame_of(live):
+    frame = pd.DataFrame(list(live.values()))
+    allocated, spent = frame["Allocated_Budget"], frame["Spent_Amount"]
+    frame["utilization"] = np.where(allocated != 0, spent / allocated.where(allocated != 0),
+                                    np.where(spent > 0, np.inf, 0.0))
+    return frame
+
+
+def assert_indexes(store, live):
+    """
+    `_by_id`, `_order` and every `_ranks` entry, each in its own sort order, hold the live rows below `_indexed`
+    (plus tombstones), and their `_recent_*` overflow exactly the live rows after it.
+    """
+    alive = np.flatnonzero(store._alive[:store._size])
+    assert len(store) == len(alive) == len(live)
+    assert store._size - len(alive) == store._dead
+    assert sorted(store._ids[row].decode() for row in alive) == sorted(live)
+    assert len(store._recent_by_id) < columnar.OVERFLOW_ROWS
+    indexes = [(store._by_id, store._recent_by_id, store._ids.__getitem__),
+               (store._order, store._recent_order, store._sort_key)]
+    indexes += [(rank, store._recent_ranks[name], functools.partial(store._rank_key, name))
+                for name, rank in store._ranks.items()]
+    for main, recent, key in indexes:
+        assert sorted(main.tolist()) == sorted(set(main.tolist()))
+        assert sorted(row for row in main.tolist() if store._alive[row]) == alive[alive < store._indexed].tolist()
+        assert sorted(recent.tolist()) == alive[alive >= store._indexed].tolist()
+        for index in (main, recent):
+            keys = [key(row) for row in index]
+            assert keys == sorted(keys)
+
+
+def assert_reads(store, live):
+    frame = frame_of(live)
+    for record in random.Random(len(live)).sample(list(live.values()), 20):
+        assert store.get(record["Transaction_ID"]) == record
+
+    expected = frame.groupby(["Subsidiary", "Sector"])[AMOUNT_COLUMNS].agg(["count", "sum"])
+    totals = store.group_totals(("Subsidiary", "Sector"))
+    assert set(totals) == set(expected.index)
+    for group, values in totals.items():
+        assert values["count"] == expected.loc[group, ("Spent_Amount", "count")]
+        for column in AMOUNT_COLUMNS:
+            assert values[column] == pytest.approx(expected.loc[group, (column, "sum")])
+
+    for name, (_, value) in RANKINGS.items():
+        smallest = frame.sort_values([value, "Transaction_ID"], kind="stable")["Transaction_ID"].head(15).tolist()
+        assert [record["Transaction_ID"] for record in store.ranked(name, limit=15)] == smallest
+
+
+@pytest.mark.parametrize("filters", [
+    TransactionFilter(),
+    TransactionFilter(date_from=date(2024, 3, 1), date_to=date(2024, 6, 30)),
+    TransactionFilter(equals={"Subsidiary": "Branch A", "Sector": "IT"}),
+    TransactionFilter(ranges={"Spent_Amount": (1000.0, 20000.0)}),
+    TransactionFilter(equals={"Sector": "No Such Sector"}),
+])
+def test_page_walks_the_filtered_rows_in_order(filters):
+    store, live = ColumnarTransactions(), {}
+    store.load(generate_transactions(800, seed=5, users=20))
+    live.update((record["Transaction_ID"], record) for record in generate_transactions(800, seed=5, users=20))
+    random_writes(store, live, 600, seed=6)
+
+    expected = sorted((record for record in live.values() if filters.matches(record)),
+                      key=lambda record: (record["Date"], record["Transaction_ID"]))
+    pages, after = [], None
+    while True:
+        rows = store.page(filters, after, limit=37)
+        pages.extend(rows[:37])
+        if len(rows) <= 37:
+            break
+        after = (rows[36]["Date"], rows[36]["Transaction_ID"])
+    assert pages == expected
+
+
+@pytest.mark.parametrize("overflow", [columnar.OVERFLOW_ROWS, 40])
+def test_random_writes_match_brute_force(monkeypatch, overflow):
+    monkeypatch.setattr(columnar, "OVERFLOW_ROWS", overflow)  # 40: the overflow is merged in between compactions too
+    compactions = []
+    compact = ColumnarTransactions._compact
+    monkeypatch.setattr(ColumnarTransactions, "_compact", lambda store: compactions.append(store._dead) or compact(store))
+    store, live = ColumnarTransactions(), {}
+    records = list(generate_transactions(1500, seed=1, users=20))
+    store.load(records + [{**records[0], "Spent_Amount": 2.0}])  # load() keeps the last copy of an ID
+    live.update((record["Transaction_ID"], record) for record in records)
+    live[records[0]["Transaction_ID"]] = {**records[0], "Spent_Amount": 2.0}
+    assert_indexes(store, live)
+    assert_reads(store, live)
+
+    for seed in range(6):
+        random_writes(store, live, 500, seed)
+        assert_indexes(store, live)
+        assert_reads(store, live)
+    assert compactions  # Enough tombstones piled up to trigger at least one automatic _compact()
+
+    store._compact()
+    assert store._dead == 0 and store._size == len(live)
+    assert_indexes(store, live)
+    assert_reads(store, live)
+
+
+def test_single_writes_leave_the_main_indexes_alone():
+    store = ColumnarTransactions()
+    records = list(generate_transactions(500, seed=3, users=10))
+    store.load(records)
+    indexes = [store._by_id, store._order, *store._ranks.values()]
+    for index, record in enumerate(records[:50]):
+        store.add({**record, "Spent_Amount": 1.0})
+        store.add({**record, "Transaction_ID": f"New-{index}"})
+        store.remove(records[-index - 1]["Transaction_ID"])
+    assert all(now is before for now, before in zip([store._by_id, store._order, *store._ranks.values()], indexes))
+    assert len(store._recent_by_id) == 100 and len(store) == 500  # Replaced and new rows wait in the overflow
+    assert store.ranked("spent", limit=1, largest=True)[0]["Spent_Amount"] == \
+        max(record["Spent_Amount"] for record in records[:450])
+
+
+def test_writes_into_an_empty_store():
+    store, live = ColumnarTransactions(), {}
+    random_writes(store, live, 300, seed=9)
+    assert_indexes(store, live)
+    assert_reads(store, live)
+
+
+def brute_ranked(live, name, equals, limit, largest, minimum=None, maximum=None):
+    columns, value = RANKINGS[name]
+    frame = frame_of(live)
+    for column in columns:
+        if equals.get(column) is not None:
+            frame = frame[frame[column] == equals[column]]
+    if minimum is not None:
+        frame = frame[frame[value] >= minimum]
+    if maximum is not None:
+        frame = frame[frame[value] <= maximum]
+    return frame.sort_values([value, "Transaction_ID"], ascending=not largest)["Transaction_ID"].head(limit).tolist()
+
+
+def test_ranked_matches_brute_force_after_writes_and_snapshots():
+    store, live = ColumnarTransactions(), {}
+    records = list(generate_transactions(1000, seed=11, users=10))
+    store.load(records)
+    live.update((record["Transaction_ID"], record) for record in records)
+    random_writes(store, live, 800, seed=12)
+
+    arrays, dictionaries = store.export()
+    attached, rebuilt = ColumnarTransactions(), ColumnarTransactions()
+    attached.attach(arrays, dictionaries)
+    rebuilt.attach({key: values for key, values in arrays.items() if not key.startswith("rank_")}, dictionaries)
+
+    user = records[0]["User_ID"]
+    filters = [{}, {"Subsidiary": "Branch A"}, {"Sector": "HR"}, {"Subsidiary": "Branch B", "Sector": "IT"},
+               {"Sector": "New Sector"}, {"User_ID": user}, {"Subsidiary": "No Such Branch"}]
+    bounds = [(None, None), (None, math.nextafter(0.0, -math.inf)), (1.0, None), (100.0, 20_000.0)]
+    for candidate in (store, attached, rebuilt):
+        for name in RANKINGS:
+            for equals in filters:
+                for largest in (False, True):
+                    for minimum, maximum in bounds:
+                        got = candidate.ranked(name, equals, 12, largest, minimum, maximum)
+                        expected = brute_ranked(live, name, equals, 12, largest, minimum, maximum)
+                        assert [record["Transaction_ID"] for record in got] == expected, (name, equals, largest)
+                        if name == "utilization":
+                            assert all(record["utilization"] is None or record["utilization"] >= (minimum or 0) - 1e-4
+                                       for record in got)
@@ -0,0 +1,58 @@
+import math
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from database import load_csv
+from migrate import migrate
+from synthetic import write_csv
+
+RAW_DAILY = """
+    SELECT Subsidiary, Sector, Date, COUNT(*), SUM(Allocated_Budget), SUM(Spent_Amount), SUM(Remaining_Budget)
+    FROM budget_transactions GROUP BY Subsidiary, Sector, Date ORDER BY 1, 2, 3
+"""
+ROLLUP_DAILY = """
+    SELECT Subsidiary, Sector, Day, transaction_count, total_allocated, total_spent, total_remaining
+    FROM budget_daily ORDER BY 1, 2, 3
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+def assert_rollup_matches(engine):
+    with engine.connect() as conn:
+        raw, rollup = conn.execute(text(RAW_DAILY)).all(), conn.execute(text(ROLLUP_DAILY)).all()
+        months = conn.execute(text("SELECT SUM(transaction_count) FROM budget_rollup")).scalar()
+    assert [row[:4] for row in rollup] == [tuple(row[:4]) for row in raw]
+    for kept, expected in zip(rollup, raw):
+        assert all(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6) for a, b in zip(kept[4:], expected[4:]))
+    assert months == sum(row[3] for row in raw)
+
+
+def test_rollups_follow_every_chunk_including_replaced_rows(engine, tmp_path):
+    path = tmp_path / "rows.csv"
+    write_csv(path, 3000, seed=1)
+    load_csv(engine, path, chunk_size=700, batch_size=200)
+    assert_rollup_matches(engine)
+
+    # Re-run with changed amounts, groups and dates for some rows, plus a repeated ID within one chunk
+    frame = pd.read_csv(path, dtype=str)
+    frame.loc[::7, "Spent_Amount"] = "12345.5"
+    frame.loc[::11, "Sector"] = "HR"
+    frame.loc[::13, "Date"] = "2023-12-31"
+    frame = pd.concat([frame, frame.iloc[[5]].assign(Allocated_Budget="1.0")])
+    frame.to_csv(path, index=False)
+    load_csv(engine, path, chunk_size=700, batch_size=200)
+    assert_rollup_matches(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM budget_transactions")).scalar() == 3000
+        assert conn.execute(text("SELECT Allocated_Budget FROM budget_transactions WHERE Transaction_ID = :id"),
+                            {"id": frame.iloc[5]["Transaction_ID"]}).scalar() == 1.0
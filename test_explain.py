@@ -0,0 +1,19 @@
+import pytest
+from sqlalchemy import create_engine
+
+from explain_check import CHECKS, plan_indexes, seed_stand_in
+
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = create_engine("sqlite://")
+    seed_stand_in(engine)
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+@pytest.mark.parametrize("endpoint, query, params, expected", CHECKS, ids=[check[0] for check in CHECKS])
+def test_query_uses_index(conn, endpoint, query, params, expected):
+    plan, used = plan_indexes(conn, query, params)
+    assert any(name in used for name in expected), f"{endpoint} uses {used or 'no index'}: {plan}"
@@ -0,0 +1,64 @@
+import runpy
+
+import pytest
+
+from fake_firebase import FakeDatabase
+from firebase_store import DUPLICATES_PATH, TRANSACTIONS_PATH, migrate_to_keyed, transaction_key
+from synthetic import generate_transactions
+
+RECORDS = list(generate_transactions(6, seed=2))
+ODD_IDS = ["A.B/C#1", "50%$x[0]", "tab\there"]
+
+
+def legacy_tree():
+    """The old layout: one array, with a hole (a deleted index), a repeated ID and IDs Firebase can't use as keys."""
+    odd = [{**RECORDS[index], "Transaction_ID": transaction_id} for index, transaction_id in enumerate(ODD_IDS)]
+    repeated = {**RECORDS[1], "Spent_Amount": 1.0}
+    return [RECORDS[0], None, RECORDS[1], *odd, repeated, *RECORDS[2:]]
+
+
+def test_array_is_rewritten_keyed_by_transaction_id():
+    fake = FakeDatabase({TRANSACTIONS_PATH.strip("/"): legacy_tree()})
+    ref = fake.reference(TRANSACTIONS_PATH)
+    assert migrate_to_keyed(ref) == (len(RECORDS) + len(ODD_IDS), 1)
+
+    keyed = ref.get()
+    assert set(keyed) == {transaction_key(record["Transaction_ID"]) for record in RECORDS} | \
+        {"A%2EB%2FC%231", "50%25%24x%5B0%5D", "tab%09here"}
+    assert all(keyed[transaction_key(record["Transaction_ID"])] == record for record in RECORDS)  # First copy wins
+    assert keyed["A%2EB%2FC%231"]["Transaction_ID"] == "A.B/C#1"  # Only the key is escaped
+    assert fake.reference(DUPLICATES_PATH).get() == [{**RECORDS[1], "Spent_Amount": 1.0}]
+
+
+@pytest.mark.parametrize("records", [
+    RECORDS,
+    [{**record, "Transaction_ID": str(index)} for index, record in enumerate(RECORDS)],  # Keys read back as a list
+])
+def test_rerunning_on_a_keyed_tree_changes_nothing(records):
+    fake = FakeDatabase({TRANSACTIONS_PATH.strip("/"): records})
+    ref = fake.reference(TRANSACTIONS_PATH)
+    migrate_to_keyed(ref)
+    keyed, writes = ref.get(), dict(fake.stats).get("set")
+
+    assert migrate_to_keyed(ref) == (0, 0)
+    assert ref.get() == keyed
+    assert fake.stats.get("set") == writes
+    assert fake.reference(DUPLICATES_PATH).get() is None
+
+
+def test_migration_script(monkeypatch, capsys):
+    firebase_admin = pytest.importorskip("firebase_admin")
+    from firebase_admin import credentials, db
+
+    fake = FakeDatabase({TRANSACTIONS_PATH.strip("/"): legacy_tree()})
+    monkeypatch.setattr(credentials, "Certificate", lambda path: None)
+    monkeypatch.setattr(firebase_admin, "initialize_app", lambda *args, **kwargs: None)
+    monkeypatch.setattr(db, "reference", fake.reference)
+
+    runpy.run_path("migrate_firebase_keys.py")
+    output = capsys.readouterr().out
+    assert f"Migrated {len(RECORDS) + len(ODD_IDS)} transactions" in output
+    assert f"1 rows reused an existing Transaction_ID and were moved to {DUPLICATES_PATH}" in output
+
+    runpy.run_path("migrate_firebase_keys.py")
+    assert "Nothing to migrate" in capsys.readouterr().out
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from changelog import ChangeLog
+from columnar import RANKINGS, ColumnarTransactions
+from pagination import TransactionFilter
+from snapshot import KEEP_VERSIONS, SnapshotStore
+from synthetic import generate_transactions
+
+
+def sample_store():
+    store = ColumnarTransactions()
+    records = list(generate_transactions(500, seed=4, users=15))
+    store.load(records)
+    for record in records[:60]:
+        store.remove(record["Transaction_ID"])  # Tombstones must not survive the round trip
+    store.extend({**record, "Transaction_ID": f"X{index}", "Spent_Amount": 7.0} for index, record in enumerate(records))
+    store.add({**records[100], "Sector": "Brand New"})
+    return store
+
+
+def test_publish_open_attach_round_trip(tmp_path):
+    original = sample_store()
+    writer, reader = SnapshotStore(str(tmp_path)), SnapshotStore(str(tmp_path))  # Two workers on one host
+    assert reader.open() is None
+
+    with writer.writer():
+        arrays, dictionaries = original.export()
+        lineage, version = writer.publish(arrays, {"dictionaries": dictionaries, "note": "first"})
+    assert version == 1
+
+    opened_lineage, opened_version, mapped, meta = reader.open()
+    assert (opened_lineage, opened_version, meta["note"]) == (lineage, 1, "first")
+    assert all(isinstance(values, np.memmap) for values in mapped.values())
+
+    attached = ColumnarTransactions()
+    attached.attach(mapped, meta["dictionaries"])
+    assert attached.fingerprint() == original.fingerprint()
+    assert len(attached) == len(original)
+    everything = TransactionFilter()
+    assert attached.page(everything, limit=10_000) == original.page(everything, limit=10_000)
+    assert attached.group_totals() == original.group_totals()
+    for name in RANKINGS:
+        assert attached.ranked(name, limit=20, largest=True) == original.ranked(name, limit=20, largest=True)
+
+    # Writes after attaching copy the touched pages; the published files stay as they were
+    attached.add({**attached.get("X1"), "Spent_Amount": 1e9})
+    attached.remove("X2")
+    assert attached.fingerprint() != original.fingerprint()
+    *_, remapped, meta = SnapshotStore(str(tmp_path)).open()
+    fresh = ColumnarTransactions()
+    fresh.attach(remapped, meta["dictionaries"])
+    assert fresh.fingerprint() == original.fingerprint()
+
+
+def test_versions_and_pruning(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    published = []
+    for number in range(KEEP_VERSIONS + 2):
+        with store.writer():
+            published.append(store.publish({"values": np.arange(number + 1)}, {"number": number}))
+    assert [version for _, version in published] == list(range(1, KEEP_VERSIONS + 3))
+    assert len({lineage for lineage, _ in published}) == 1
+
+    lineage, version, arrays, meta = store.open()
+    assert (version, meta["number"], arrays["values"].tolist()) == (KEEP_VERSIONS + 2, KEEP_VERSIONS + 1,
+                                                                     list(range(KEEP_VERSIONS + 2)))
+    assert store.open(version - 1)[3]["number"] == KEEP_VERSIONS  # Still kept on disk
+    assert store.open(1)[1] == version  # Pruned: falls back to the latest
+    assert len([entry for entry in tmp_path.iterdir() if entry.name.startswith("v")]) == KEEP_VERSIONS
+
+    wiped = tmp_path / "wiped"
+    with SnapshotStore(str(wiped)).writer():
+        assert SnapshotStore(str(wiped)).publish({}, {})[0] != lineage  # A new directory never reuses the lineage
+
+
+def collect(log, seq, limit=1000):
+    """Follows since() from `seq` to the end; returns (seq, changes, reset)."""
+    changes = []
+    while True:
+        page = log.since(seq, limit)
+        if page["reset"]:
+            return page["seq"], changes, True
+        changes.extend(page["changes"])
+        seq = page["seq"]
+        if not page["has_more"]:
+            return seq, changes, False
+
+
+def test_changelog_since_round_trip(tmp_path):
+    writer, reader = ChangeLog(str(tmp_path)), ChangeLog(str(tmp_path))
+    assert reader.since(0, 10) == {"seq": 0, "reset": False, "changes": [], "has_more": False}
+
+    first = writer.append([("add", f"T{index}", {"Transaction_ID": f"T{index}"}) for index in range(25)])
+    writer.append([("update", "T3", {"Transaction_ID": "T3", "Spent_Amount": 2.0})])
+    last = writer.append([("delete", "T4", None)])
+    assert (first, last) == (25, 27)
+
+    seq, changes, reset = collect(reader, 0, limit=10)  # Paged with has_more, read by another worker
+    assert (seq, reset) == (27, False)
+    assert [change["seq"] for change in changes] == list(range(1, 28))
+    assert [(change["op"], change["Transaction_ID"]) for change in changes[-2:]] == [("update", "T3"), ("delete", "T4")]
+    assert changes[-2]["record"]["Spent_Amount"] == 2.0
+
+    assert collect(reader, 20) == (27, changes[20:], False)
+    assert reader.since(27, 10) == {"seq": 27, "reset": False, "changes": [], "has_more": False}
+    assert reader.since(99, 10)["reset"]  # Ahead of the log (e.g. it was wiped): reload
+
+
+def test_changelog_reset_and_retention(tmp_path):
+    log = ChangeLog(str(tmp_path), retain=20)
+    log.append([("add", f"T{index}", {}) for index in range(5)])
+    seq = log.reset()
+    log.append([("delete", "T1", None)])
+
+    assert log.since(2, 100) == {"seq": 7, "reset": True, "changes": [], "has_more": False}  # Behind the reset
+    assert [change["op"] for change in log.since(seq, 100)["changes"]] == ["delete"]  # Caught up from the reset on
+
+    for index in range(60):  # Past 2 * retain lines the file is compacted down to the retained entries
+        log.append([("add", f"U{index}", {})])
+    assert log.last_seq() == 67
+    assert len((tmp_path / "changes.ndjson").read_text().splitlines()) <= 2 * log.retain
+    assert log.since(10, 100)["reset"]  # Too far behind what is retained
+    assert collect(log, 50) == (67, log.since(50, 100)["changes"], False)
+    assert [change["Transaction_ID"] for change in ChangeLog(str(tmp_path)).since(64, 100)["changes"]] == \
+        ["U57", "U58", "U59"]
+
+
+@pytest.mark.parametrize("retain", [1, 3])
+def test_changelog_tiny_retention_never_loses_the_tail(tmp_path, retain):
+    log = ChangeLog(str(tmp_path), retain=retain)
+    for index in range(10):
+        log.append([("add", f"T{index}", {})])
+        assert log.since(index, 10)["changes"][0]["Transaction_ID"] == f"T{index}"
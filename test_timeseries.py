@@ -0,0 +1,119 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from columnar import ColumnarTransactions, from_day, to_day
+from synthetic import generate_transactions
+from timeseries import NEGATIVE_TOLERANCE, SERIES_MEASURES, DayTree, TimeSeriesIndex
+
+MEASURES = [("count", "", "")] + [("sum", column, "") for column in SERIES_MEASURES[1:]]
+
+
+def first_negative(daily, first_day):
+    running = np.cumsum(daily)
+    below = np.flatnonzero(running < -NEGATIVE_TOLERANCE)
+    return first_day + int(below[0]) if len(below) else None
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_day_tree_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    first_day = 19_700
+    daily = rng.normal(size=int(rng.integers(1, 60))).round(2)
+    tree = DayTree(first_day, daily.copy())
+    values = dict(zip(range(first_day, first_day + len(daily)), daily.tolist()))
+
+    for _ in range(300):
+        day = int(rng.integers(first_day - 90, first_day + 150))  # Some writes land outside the tree and regrow it
+        amount = round(float(rng.normal()), 2)
+        tree.add(day, amount)
+        values[day] = values.get(day, 0.0) + amount
+
+        low, high = sorted(int(day) for day in rng.integers(first_day - 120, first_day + 180, size=2))
+        assert tree.range_sum(low, high) == pytest.approx(sum(v for d, v in values.items() if low <= d <= high))
+
+    start = min(values)
+    brute = np.zeros(max(values) - start + 1)
+    brute[[day - start for day in values]] = list(values.values())
+    assert tree.total == pytest.approx(brute.sum())
+    assert tree.first_day <= start and tree.last_day >= max(values)
+    assert tree.first_negative_day() == first_negative(brute, start)
+
+
+def test_first_negative_day_edges():
+    assert DayTree(10, np.array([1.0, -1.0, 0.0])).first_negative_day() is None  # Touches zero, never below
+    assert DayTree(10, np.array([1.0, -1.0, -1e-9])).first_negative_day() is None  # Rounding noise
+    assert DayTree(10, np.array([-0.5])).first_negative_day() == 10
+    tree = DayTree(10, np.array([5.0, -3.0, -3.0, 4.0]))
+    assert tree.first_negative_day() == 12
+    tree.add(9, 1.0)  # Regrows to the left
+    assert tree.first_negative_day() is None
+    tree.add(40, -10.0)  # And to the right
+    assert tree.first_negative_day() == 40
+
+
+def expected_daily(live):
+    """The (Subsidiary, Sector, day) totals TimeSeriesIndex.export() should return, recomputed with pandas."""
+    frame = pd.DataFrame(list(live.values()))
+    grouped = frame.groupby(["Subsidiary", "Sector", "Date"])
+    daily = grouped[["Allocated_Budget", "Spent_Amount", "Remaining_Budget"]].sum().add_prefix("sum_")
+    daily["count"] = grouped.size()
+    return daily.reset_index().rename(columns={"Date": "day"})
+
+
+def test_index_tracks_random_writes():
+    records = list(generate_transactions(600, seed=2, days=90))
+    live = {record["Transaction_ID"]: record for record in records}
+    store = ColumnarTransactions()
+    store.load(records)
+    index = TimeSeriesIndex()
+    index.load(store.aggregate(("Subsidiary", "Sector", "day"), MEASURES))
+
+    rng = random.Random(3)
+    for step in range(1500):
+        choice = rng.random()
+        if choice < 0.35:
+            record = {**rng.choice(records), "Transaction_ID": f"N{step}",
+                      "Date": f"202{rng.choice([3, 4, 5])}-0{rng.randint(1, 9)}-2{rng.randint(0, 8)}",
+                      "Remaining_Budget": round(rng.uniform(-20_000, 5_000), 2)}
+            index.apply(record)
+            live[record["Transaction_ID"]] = record
+        elif choice < 0.7 and live:
+            old = live[rng.choice(list(live))]
+            new = {**old, "Sector": rng.choice(["HR", "IT", "Moved"]), "Spent_Amount": round(rng.uniform(0, 1e4), 2),
+                   "Date": f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}"}
+            index.replace(old, new)
+            live[old["Transaction_ID"]] = new
+        elif live:
+            record = live.pop(rng.choice(list(live)))
+            index.apply(record, sign=-1)
+    index.apply({"Subsidiary": "Nobody", "Sector": "HR", "Date": "2024-01-01"}, sign=-1)  # Unknown group: ignored
+
+    expected = expected_daily(live).sort_values(["Subsidiary", "Sector", "day"]).reset_index(drop=True)
+    exported = pd.DataFrame(index.export()).sort_values(["Subsidiary", "Sector", "day"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(exported[expected.columns], expected, check_dtype=False)
+
+    negatives = index.first_negative()
+    assert {row["first_negative_date"] is None for row in negatives} == {True, False}  # Both outcomes are exercised
+    for row in negatives:
+        group = expected[(expected["Subsidiary"] == row["Subsidiary"]) & (expected["Sector"] == row["Sector"])]
+        days = group["day"].map(to_day).to_numpy()
+        daily = np.zeros(days.max() - days.min() + 1)
+        daily[days - days.min()] = group["sum_Remaining_Budget"]
+        day = first_negative(daily, int(days.min()))
+        assert row["first_negative_date"] == (None if day is None else from_day(day))
+
+    rolling = pd.DataFrame(index.rolling(30, date_from="2024-03-01", date_to="2024-08-31"))
+    for row in rolling.sample(50, random_state=1).to_dict("records"):
+        start = from_day(to_day(row["Date"]) - 29)
+        window = expected[(expected["Subsidiary"] == row["Subsidiary"]) & (expected["Sector"] == row["Sector"])
+                          & (expected["day"] >= start) & (expected["day"] <= row["Date"])]
+        assert row["rolling_spent"] == pytest.approx(window["sum_Spent_Amount"].sum())
+
+    for row in index.burn("month", sector="HR"):
+        month = expected[(expected["Subsidiary"] == row["Subsidiary"]) & (expected["Sector"] == "HR")
+                         & (expected["day"].str[:7] == row["period"][:7])]
+        assert row["spent"] == pytest.approx(month["sum_Spent_Amount"].sum())
+        assert row["allocated"] == pytest.approx(month["sum_Allocated_Budget"].sum())
@@ -0,0 +1,109 @@
+import math
+
+import pandas as pd
+import pytest
+
+import upload_to_firebase
+from checkpoint import read_checkpoint
+from fake_firebase import FakeDatabase
+from firebase_store import TRANSACTIONS_PATH, transaction_key
+from synthetic import write_csv
+from upload_to_firebase import UploadManifest, upload_csv
+
+ROWS = 230
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "rows.csv"
+    write_csv(path, ROWS, seed=2)
+    frame = pd.read_csv(path, dtype=str)
+    frame.loc[0, "Transaction_ID"] = "T.1/#bad"  # Characters Firebase doesn't allow in keys
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+class InterruptedReference:
+    """Passes `allowed` updates through to `ref`, then fails every later one (a crash mid-upload)."""
+
+    def __init__(self, ref, allowed):
+        self.ref = ref
+        self.allowed = allowed
+        self.updates = 0
+
+    def update(self, batch):
+        self.updates += 1
+        if self.updates > self.allowed:
+            raise RuntimeError("interrupted")
+        self.ref.update(batch)
+
+
+def update_calls(database):
+    return database.stats.get("update", (0, 0))[0]
+
+
+def test_chunked_upload_writes_keyed_children(csv_file):
+    database = FakeDatabase()
+    stats = upload_csv(database.reference(TRANSACTIONS_PATH), csv_file, chunk_size=50, batch_size=20, workers=4)
+
+    tree = database.reference(TRANSACTIONS_PATH).get()
+    expected = pd.read_csv(csv_file, dtype=str)["Transaction_ID"]
+    assert stats["uploaded"] == ROWS
+    assert set(tree) == {transaction_key(transaction_id) for transaction_id in expected}
+    assert tree[transaction_key("T.1/#bad")]["Transaction_ID"] == "T.1/#bad"
+    assert all(key == transaction_key(record["Transaction_ID"]) for key, record in tree.items())
+    assert update_calls(database) == 3 * 4 + 2  # Four full chunks of 3 batches, then 30 rows in 2 batches
+
+
+def test_resume_skips_finished_chunks(csv_file, tmp_path):
+    database = FakeDatabase()
+    checkpoint = str(tmp_path / "upload.checkpoint.json")
+    interrupted = InterruptedReference(database.reference(TRANSACTIONS_PATH), allowed=5)
+    with pytest.raises(RuntimeError):
+        upload_csv(interrupted, csv_file, chunk_size=50, batch_size=25, workers=1, retries=0, checkpoint=checkpoint)
+
+    done = read_checkpoint(checkpoint, csv_file)
+    assert done > 0 and done % 50 == 0
+    before = update_calls(database)
+
+    stats = upload_csv(database.reference(TRANSACTIONS_PATH), csv_file, chunk_size=50, batch_size=25, workers=1,
+                       checkpoint=checkpoint)
+    assert stats["uploaded"] == ROWS - done
+    assert len(database.reference(TRANSACTIONS_PATH).get()) == ROWS
+    remaining = [min(50, ROWS - start) for start in range(done, ROWS, 50)]
+    assert update_calls(database) - before == sum(math.ceil(rows / 25) for rows in remaining)  # Finished chunks not re-sent
+
+
+def test_diff_sends_only_changed_rows(csv_file, tmp_path):
+    database = FakeDatabase()
+    ref = database.reference(TRANSACTIONS_PATH)
+    manifest = UploadManifest(str(tmp_path / "manifest.db"))
+    try:
+        assert upload_csv(ref, csv_file, chunk_size=100, manifest=manifest, diff=True)["uploaded"] == ROWS
+
+        frame = pd.read_csv(csv_file, dtype=str)
+        frame.loc[[3, 120, 229], "Spent_Amount"] = "1.5"
+        frame.to_csv(csv_file, index=False)
+        database.stats.clear()
+        stats = upload_csv(ref, csv_file, chunk_size=100, manifest=manifest, diff=True)
+    finally:
+        manifest.close()
+
+    assert (stats["uploaded"], stats["unchanged"]) == (3, ROWS - 3)
+    assert update_calls(database) == 3  # One single-row update per chunk; untouched rows aren't sent
+    changed = frame.loc[[3, 120, 229], "Transaction_ID"]
+    assert all(ref.child(transaction_key(transaction_id)).get()["Spent_Amount"] == 1.5 for transaction_id in changed)
+
+
+def test_transient_failures_are_retried_with_backoff(csv_file, monkeypatch):
+    delays = []
+    monkeypatch.setattr(upload_to_firebase.time, "sleep", delays.append)
+    database = FakeDatabase()
+    database.fail_next(3)
+
+    stats = upload_csv(database.reference(TRANSACTIONS_PATH), csv_file, chunk_size=100, batch_size=500, workers=1)
+
+    assert stats["uploaded"] == ROWS
+    assert len(database.reference(TRANSACTIONS_PATH).get()) == ROWS
+    assert len(delays) == 3
+    assert all(0.25 * 2 ** attempt <= delay < 0.75 * 2 ** attempt for attempt, delay in enumerate(delays))
@@ -0,0 +1,351 @@
+import calendar
+import threading
+from datetime import date
+
+import numpy as np
+from fastapi import HTTPException, Query
+
+from columnar import bucket_days, from_day, to_day
+from query import bucket_expr
+
+NEGATIVE_TOLERANCE = 1e-6  # Running totals are float sums; ignore rounding noise around zero
+SERIES_MEASURES = ("count", "Allocated_Budget", "Spent_Amount", "Remaining_Budget")
+
+
+def timeseries_params(
+    subsidiary: str = None,
+    sector: str = None,
+    date_from: date = None,
+    date_to: date = None,
+):
+    """FastAPI dependency shared by the /budget/timeseries endpoints."""
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    return {"subsidiary": subsidiary, "sector": sector,
+            "date_from": date_from.isoformat() if date_from else None,
+            "date_to": date_to.isoformat() if date_to else None}
+
+
+def bucket_length(period, bucket):
+    """Number of days in the week/month starting at `period` (a date or 'YYYY-MM-DD')."""
+    if bucket == "week":
+        return 7
+    year, month = int(str(period)[:4]), int(str(period)[5:7])
+    return calendar.monthrange(year, month)[1]
+
+
+def rolling_window(window: int = Query(30, ge=1, le=366)):
+    return window
+
+
+class DayTree:
+    """
+    Segment tree over consecutive day numbers for one measure of one group.
+
+    Point updates, range sums and "first day the running total drops below zero" are all O(log n).
+    The covered range grows (by rebuilding) when a write lands outside it.
+    """
+
+    def __init__(self, first_day, daily):
+        self.first_day = first_day
+        self.capacity = 1 << max(len(daily) - 1, 0).bit_length()
+        self._sums = np.zeros(2 * self.capacity)
+        self._min_prefix = np.zeros(2 * self.capacity)
+        self._sums[self.capacity:self.capacity + len(daily)] = daily
+        self._min_prefix[self.capacity:] = self._sums[self.capacity:]
+
+        # Build the inner nodes one level at a time
+        low = self.capacity
+        while low > 1:
+            parents = np.arange(low // 2, low)
+            left, right = 2 * parents, 2 * parents + 1
+            self._sums[parents] = self._sums[left] + self._sums[right]
+            self._min_prefix[parents] = np.minimum(self._min_prefix[left], self._sums[left] + self._min_prefix[right])
+            low //= 2
+
+    @property
+    def last_day(self):
+        return self.first_day + self.capacity - 1
+
+    @property
+    def total(self):
+        return float(self._sums[1])
+
+    def daily(self):
+        """Per-day values from first_day to last_day (a view)."""
+        return self._sums[self.capacity:]
+
+    def add(self, day, amount):
+        if day < self.first_day or day > self.last_day:
+            self._regrow(day)
+        node = self.capacity + day - self.first_day
+        self._sums[node] += amount
+        self._min_prefix[node] = self._sums[node]
+        node //= 2
+        while node:
+            left, right = 2 * node, 2 * node + 1
+            self._sums[node] = self._sums[left] + self._sums[right]
+            self._min_prefix[node] = min(self._min_prefix[left], self._sums[left] + self._min_prefix[right])
+            node //= 2
+
+    def _regrow(self, day):
+        first = min(self.first_day, day)
+        last = max(self.last_day, day)
+        daily = np.zeros(2 * (last - first + 1))  # Room to grow before the next rebuild
+        offset = self.first_day - first
+        daily[offset:offset + self.capacity] = self.daily()
+        self.__init__(first, daily)
+
+    def range_sum(self, first, last):
+        """Sum of the days first..last (inclusive)."""
+        low = max(first, self.first_day) - self.first_day + self.capacity
+        high = min(last, self.last_day) - self.first_day + self.capacity + 1
+        total = 0.0
+        while low < high:
+            if low & 1:
+                total += self._sums[low]
+                low += 1
+            if high & 1:
+                high -= 1
+                total += self._sums[high]
+            low //= 2
+            high //= 2
+        return float(total)
+
+    def first_negative_day(self):
+        """First day on which the running total is below zero, or None."""
+        if self._min_prefix[1] >= -NEGATIVE_TOLERANCE:
+            return None
+        node, offset = 1, 0.0
+        while node < self.capacity:
+            left = 2 * node
+            if offset + self._min_prefix[left] < -NEGATIVE_TOLERANCE:
+                node = left
+            else:
+                offset += self._sums[left]
+                node = left + 1
+        return self.first_day + node - self.capacity
+
+
+class TimeSeriesIndex:
+    """Per-(Subsidiary, Sector) day trees for the transaction count and amounts, kept in sync by every write."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = {}  # (subsidiary, sector) -> {measure: DayTree}
+
+    def load(self, daily_totals):
+        """
+        Rebuilds every group from ColumnarTransactions.aggregate rows grouped by
+        (Subsidiary, Sector, day) with count and sum:<amount> measures.
+        """
+        by_group = {}
+        for row in daily_totals:
+            by_group.setdefault((row["Subsidiary"], row["Sector"]), []).append(row)
+
+        groups = {}
+        for key, rows in by_group.items():
+            days = np.array([to_day(row["day"]) for row in rows])
+            first = int(days.min())
+            trees = {}
+            for measure in SERIES_MEASURES:
+                daily = np.zeros(int(days.max()) - first + 1)
+                daily[days - first] = [row["count" if measure == "count" else f"sum_{measure}"] for row in rows]
+                trees[measure] = DayTree(first, daily)
+            groups[key] = trees
+
+        with self._lock:
+            self._groups = groups
+
+    def export(self):
+        """The per-day totals in the row format load() takes (days without transactions are skipped)."""
+        with self._lock:
+            rows = []
+            for (subsidiary, sector), trees in self._groups.items():
+                daily = {measure: tree.daily() for measure, tree in trees.items()}
+                for offset in np.flatnonzero(daily["count"] > 0.5).tolist():
+                    row = {"Subsidiary": subsidiary, "Sector": sector,
+                           "day": from_day(trees["count"].first_day + offset), "count": int(round(daily["count"][offset]))}
+                    row.update({f"sum_{measure}": float(daily[measure][offset]) for measure in SERIES_MEASURES[1:]})
+                    rows.append(row)
+            return rows
+
+    def apply(self, record, sign=1):
+        """Adds (sign=1) or subtracts (sign=-1) one transaction: O(log n) per measure."""
+        self.apply_many([record], sign)
+
+    def apply_many(self, records, sign=1):
+        """apply() for a batch of transactions under a single lock acquisition."""
+        with self._lock:
+            self._apply_many(records, sign)
+
+    def replace(self, old, new):
+        """Moves an updated transaction out of its old (group, day) and into its new one, atomically for readers."""
+        with self._lock:
+            self._apply_many([old], -1)
+            self._apply_many([new], 1)
+
+    def _apply_many(self, records, sign):
+        for record in records:
+            key = (record.get("Subsidiary"), record.get("Sector"))
+            day = to_day(record.get("Date"))
+            trees = self._groups.get(key)
+            if trees is None:
+                if sign < 0:
+                    continue
+                trees = self._groups[key] = {measure: DayTree(day, np.zeros(1)) for measure in SERIES_MEASURES}
+            for measure, tree in trees.items():
+                tree.add(day, sign * (1 if measure == "count" else record.get(measure) or 0))
+
+    def _selected(self, subsidiary, sector):
+        return sorted((key, trees) for key, trees in self._groups.items()
+                      if (subsidiary is None or key[0] == subsidiary) and (sector is None or key[1] == sector)
+                      and trees["count"].total > 0.5)  # Skip groups whose rows were all deleted
+
+    @staticmethod
+    def _active_days(trees, date_from, date_to):
+        """Day numbers in range on which the group has at least one transaction."""
+        counts = trees["count"]
+        days = np.flatnonzero(counts.daily() > 0.5) + counts.first_day
+        if date_from:
+            days = days[days >= to_day(date_from)]
+        if date_to:
+            days = days[days <= to_day(date_to)]
+        return days
+
+    def burn(self, bucket, subsidiary=None, sector=None, date_from=None, date_to=None):
+        """Spend and allocation per week/month bucket, plus the average spend per day of the bucket."""
+        results = []
+        with self._lock:
+            for (sub, sec), trees in self._selected(subsidiary, sector):
+                days = self._active_days(trees, date_from, date_to)
+                for start in np.unique(bucket_days(days.astype(np.int32), bucket)).tolist():
+                    period = from_day(start)
+                    end = start + bucket_length(period, bucket) - 1
+                    first = max(start, to_day(date_from)) if date_from else start
+                    last = min(end, to_day(date_to)) if date_to else end
+                    spent = trees["Spent_Amount"].range_sum(first, last)
+                    results.append({
+                        "Subsidiary": sub, "Sector": sec, "period": period,
+                        "spent": spent,
+                        "allocated": trees["Allocated_Budget"].range_sum(first, last),
+                        "burn_per_day": spent / bucket_length(period, bucket),
+                    })
+        return results
+
+    def cumulative(self, subsidiary=None, sector=None, date_from=None, date_to=None):
+        """Running spend and allocation since each group's first transaction, on every active day in range."""
+        results = []
+        with self._lock:
+            for (sub, sec), trees in self._selected(subsidiary, sector):
+                days = self._active_days(trees, date_from, date_to)
+                spent = np.cumsum(trees["Spent_Amount"].daily())
+                allocated = np.cumsum(trees["Allocated_Budget"].daily())
+                offsets = days - trees["count"].first_day
+                for day, total_spent, total_allocated in zip(days.tolist(), spent[offsets].tolist(),
+                                                             allocated[offsets].tolist()):
+                    results.append({"Subsidiary": sub, "Sector": sec, "Date": from_day(day),
+                                    "cumulative_spent": total_spent, "cumulative_allocated": total_allocated})
+        return results
+
+    def rolling(self, window, subsidiary=None, sector=None, date_from=None, date_to=None):
+        """Spend over the `window` days ending on each active day in range (prefix-sum differences)."""
+        results = []
+        with self._lock:
+            for (sub, sec), trees in self._selected(subsidiary, sector):
+                days = self._active_days(trees, date_from, date_to)
+                prefix = np.concatenate(([0.0], np.cumsum(trees["Spent_Amount"].daily())))
+                offsets = days - trees["count"].first_day
+                totals = prefix[offsets + 1] - prefix[np.maximum(offsets + 1 - window, 0)]
+                for day, total in zip(days.tolist(), totals.tolist()):
+                    results.append({"Subsidiary": sub, "Sector": sec, "Date": from_day(day), "rolling_spent": total})
+        return results
+
+    def first_negative(self, subsidiary=None, sector=None):
+        """First date each group's running Remaining_Budget total goes below zero (None if it never does)."""
+        with self._lock:
+            results = []
+            for (sub, sec), trees in self._selected(subsidiary, sector):
+                day = trees["Remaining_Budget"].first_negative_day()
+                results.append({"Subsidiary": sub, "Sector": sec,
+                                "first_negative_date": None if day is None else from_day(day)})
+        return results
+
+
+# 🔹 SQL equivalents over the budget_daily rollup (see migrations/0005)
+
+def _daily_conditions(params, with_dates=True):
+    conditions, values = [], {}
+    for column in ("subsidiary", "sector"):
+        if params[column] is not None:
+            conditions.append(f"{column.capitalize()} = :{column}")
+            values[column] = params[column]
+    if with_dates:
+        for column, operator in (("date_from", ">="), ("date_to", "<=")):
+            if params[column]:
+                conditions.append(f"Day {operator} :{column}")
+                values[column] = params[column]
+    return conditions, values
+
+
+def _where(conditions):
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def burn_sql(dialect, bucket, params):
+    conditions, values = _daily_conditions(params)
+    return f"""
+        SELECT Subsidiary, Sector, {bucket_expr(dialect, bucket, "Day")} AS period,
+            SUM(total_spent) AS spent, SUM(total_allocated) AS allocated
+        FROM budget_daily {_where(conditions)}
+        GROUP BY Subsidiary, Sector, period
+        ORDER BY Subsidiary, Sector, period
+    """, values
+
+
+def cumulative_sql(params):
+    # Running totals start at each group's first transaction, so the date range filters the outer query only
+    group_conditions, values = _daily_conditions(params, with_dates=False)
+    date_conditions, date_values = _daily_conditions({**params, "subsidiary": None, "sector": None})
+    return f"""
+        SELECT Subsidiary, Sector, Day AS Date, cumulative_spent, cumulative_allocated FROM (
+            SELECT Subsidiary, Sector, Day,
+                SUM(total_spent) OVER (PARTITION BY Subsidiary, Sector ORDER BY Day) AS cumulative_spent,
+                SUM(total_allocated) OVER (PARTITION BY Subsidiary, Sector ORDER BY Day) AS cumulative_allocated
+            FROM budget_daily {_where(group_conditions)}
+        ) running {_where(date_conditions)}
+        ORDER BY Subsidiary, Sector, Date
+    """, {**values, **date_values}
+
+
+def rolling_sql(dialect, window, params):
+    group_conditions, values = _daily_conditions(params, with_dates=False)
+    date_conditions, date_values = _daily_conditions({**params, "subsidiary": None, "sector": None})
+    # `window` is a validated int; frame offsets can't be bound parameters
+    if dialect == "mysql":
+        frame = f"ORDER BY Day RANGE BETWEEN INTERVAL {int(window) - 1} DAY PRECEDING AND CURRENT ROW"
+    else:
+        frame = f"ORDER BY julianday(Day) RANGE BETWEEN {int(window) - 1} PRECEDING AND CURRENT ROW"
+    return f"""
+        SELECT Subsidiary, Sector, Day AS Date, rolling_spent FROM (
+            SELECT Subsidiary, Sector, Day,
+                SUM(total_spent) OVER (PARTITION BY Subsidiary, Sector {frame}) AS rolling_spent
+            FROM budget_daily {_where(group_conditions)}
+        ) windowed {_where(date_conditions)}
+        ORDER BY Subsidiary, Sector, Date
+    """, {**values, **date_values}
+
+
+def first_negative_sql(params):
+    conditions, values = _daily_conditions(params, with_dates=False)
+    return f"""
+        SELECT Subsidiary, Sector,
+            MIN(CASE WHEN running_remaining < -{NEGATIVE_TOLERANCE} THEN Day END) AS first_negative_date
+        FROM (
+            SELECT Subsidiary, Sector, Day,
+                SUM(total_remaining) OVER (PARTITION BY Subsidiary, Sector ORDER BY Day) AS running_remaining
+            FROM budget_daily {_where(conditions)}
+        ) running
+        GROUP BY Subsidiary, Sector
+        ORDER BY Subsidiary, Sector
+    """, values
@@ -1,24 +1,184 @@
 #https://budgetdb-7d811-default-rtdb.firebaseio.com/
 
-import firebase_admin
-from firebase_admin import credentials, db
+import argparse
+import hashlib
+import json
+import random
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import pandas as pd
 
-# Load Firebase credentials
-cred = credentials.Certificate("firebase-adminsdk.json")  # Ensure this file is in your project folder
-firebase_admin.initialize_app(cred, {
-    'databaseURL': 'https://budgetdb-7d811-default-rtdb.firebaseio.com/'  # Replace with your actual URL
-})
+from checkpoint import clear_checkpoint, read_checkpoint, write_checkpoint
+from firebase_store import TRANSACTIONS_PATH, transaction_key
+from schema import clean_frame
+
+# Streams the CSV into /budget_transactions/<Transaction_ID> as concurrent multi-path updates.
+# Every write is keyed, so retrying or resuming a batch can never duplicate rows.
+
+
+def row_digest(record):
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class UploadManifest:
+    """Digest of every row as last uploaded, kept in SQLite so --diff works on exports larger than memory."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS uploaded (key TEXT PRIMARY KEY, digest TEXT NOT NULL)")
+
+    def changed(self, digests):
+        """Returns the keys whose digest differs from the last successful upload."""
+        keys = list(digests)
+        known = {}
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, digest FROM uploaded WHERE key IN ({', '.join('?' * len(part))})", part
+            )
+            known.update(rows)
+        return [key for key in keys if known.get(key) != digests[key]]
+
+    def record(self, digests):
+        self.conn.executemany("INSERT OR REPLACE INTO uploaded (key, digest) VALUES (?, ?)", digests.items())
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def upload_batch(ref, batch, retries=5, backoff=0.5):
+    """Writes one multi-path update, retrying with exponential backoff and jitter."""
+    for attempt in range(retries + 1):
+        try:
+            ref.update(batch)
+            return len(batch)
+        except Exception as exc:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt * (0.5 + random.random())
+            print(f"⚠️ Batch of {len(batch)} failed ({exc}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def upload_csv(ref, csv_file, chunk_size=20_000, batch_size=500, workers=8, retries=5,
+               checkpoint=None, manifest=None, diff=False):
+    """
+    Uploads csv_file under `ref` and returns counters for the run.
+
+    Chunks are read one at a time; their batches run on a bounded thread pool with at most
+    2 * workers batches in flight. The checkpoint (and manifest) only advance past a chunk once
+    it and every chunk before it are fully written, so resuming re-sends at most the in-flight window.
+    """
+    rows_done = read_checkpoint(checkpoint, csv_file)
+    if rows_done:
+        print(f"↪️ Resuming after {rows_done} rows.")
+
+    stats = {"uploaded": 0, "unchanged": 0, "rejected": 0}
+    started = time.perf_counter()
+    pending = {}                 # future -> chunk number
+    batches_left = {}            # chunk number -> batches still in flight
+    chunk_ends, chunk_digests = {}, {}
+    next_chunk = 0
+
+    def settle(futures):
+        nonlocal next_chunk
+        for future in futures:
+            chunk_no = pending.pop(future)
+            stats["uploaded"] += future.result()  # Re-raises once retries are exhausted
+            batches_left[chunk_no] -= 1
+
+        while batches_left.get(next_chunk) == 0:
+            del batches_left[next_chunk]
+            digests = chunk_digests.pop(next_chunk)
+            if manifest:
+                manifest.record(digests)
+            if checkpoint:
+                write_checkpoint(checkpoint, csv_file, chunk_ends.pop(next_chunk))
+            next_chunk += 1
+
+    chunks = pd.read_csv(csv_file, dtype=str, keep_default_na=False, chunksize=chunk_size,
+                         skiprows=lambda i: 0 < i <= rows_done)  # Line 0 is the header
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for chunk_no, chunk in enumerate(chunks):
+                valid, bad = clean_frame(chunk)
+                stats["rejected"] += len(bad)
+
+                rows = {transaction_key(record["Transaction_ID"]): record for record in valid.to_dict("records")}
+                digests = {key: row_digest(record) for key, record in rows.items()}
+                if diff and manifest:
+                    changed = manifest.changed(digests)
+                    stats["unchanged"] += len(rows) - len(changed)
+                    rows = {key: rows[key] for key in changed}
+                    digests = {key: digests[key] for key in changed}
+
+                keys = list(rows)
+                rows_done += len(chunk)
+                chunk_ends[chunk_no], chunk_digests[chunk_no] = rows_done, digests
+                batches_left[chunk_no] = 0
+
+                for start in range(0, len(keys), batch_size):
+                    batch = {key: rows[key] for key in keys[start:start + batch_size]}
+                    batches_left[chunk_no] += 1  # Counted first, so settle() can't close a chunk still being split
+                    while len(pending) >= 2 * workers:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        settle(done)
+                    pending[pool.submit(upload_batch, ref, batch, retries)] = chunk_no
+
+                settle([])
+                elapsed = time.perf_counter() - started
+                print(f"⏳ {rows_done} rows read, {stats['uploaded']} uploaded, {stats['unchanged']} unchanged, "
+                      f"{stats['rejected']} rejected ({stats['uploaded'] / elapsed:,.0f} rows/sec)")
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                settle(done)
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload a budget CSV to Firebase (parallel, resumable).")
+    parser.add_argument("csv_file", nargs="?", default="dataset_company_budget_allocation_dashboard.csv")
+    parser.add_argument("--chunk-size", type=int, default=20_000, help="rows read from the CSV at a time")
+    parser.add_argument("--batch-size", type=int, default=500, help="rows per multi-path update")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent update requests")
+    parser.add_argument("--retries", type=int, default=5, help="attempts per batch before giving up")
+    parser.add_argument("--checkpoint", help="progress file (default: <csv_file>.upload.checkpoint.json)")
+    parser.add_argument("--manifest", default="upload_manifest.db", help="digests of the last upload, for --diff")
+    parser.add_argument("--diff", action="store_true", help="only send rows that changed since the last upload")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    args = parser.parse_args()
+
+    import firebase_admin
+    from firebase_admin import credentials, db
 
-# Read CSV File
-csv_file = "dataset_company_budget_allocation_dashboard.csv"  # Ensure this file is in the same folder
-df = pd.read_csv(csv_file)
+    # Load Firebase credentials
+    cred = credentials.Certificate("firebase-adminsdk.json")  # Ensure this file is in your project folder
+    firebase_admin.initialize_app(cred, {
+        'databaseURL': 'https://budgetdb-7d811-default-rtdb.firebaseio.com/'  # Replace with your actual URL
+    })
 
-# Convert DataFrame to dictionary
-budget_data = df.to_dict(orient="records")
+    checkpoint = args.checkpoint or args.csv_file + ".upload.checkpoint.json"
+    if args.restart:
+        clear_checkpoint(checkpoint)
 
-# Push data to Firebase
-ref = db.reference("/budget_transactions")  # Firebase path
-ref.set(budget_data)
+    manifest = UploadManifest(args.manifest)
+    try:
+        stats = upload_csv(db.reference(TRANSACTIONS_PATH), args.csv_file, args.chunk_size, args.batch_size,
+                           args.workers, args.retries, checkpoint, manifest, args.diff)
+    finally:
+        manifest.close()
+    clear_checkpoint(checkpoint)
 
-print("✅ Data uploaded successfully to Firebase!")
+    print(f"✅ Uploaded {stats['uploaded']} rows to Firebase ({stats['unchanged']} unchanged, "
+          f"{stats['rejected']} rejected) in {stats['seconds']:.1f}s.")